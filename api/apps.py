@@ -23,3 +23,15 @@ class ApiConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        """
+        Podłącza przebudowę gotowych odpowiedzi skanowania oraz zapełnianie
+        cache najczęściej skanowanymi kodami do sygnału synchronizacji rejestru.
+        """
+        from sync_rpl.signals import registry_synced
+        from .documents import materialize_scan_documents
+        from .scan_events import warm_after_sync
+
+        registry_synced.connect(materialize_scan_documents, dispatch_uid='api.materialize_scan_documents')
+        registry_synced.connect(warm_after_sync, dispatch_uid='api.warm_after_sync')
@@ -0,0 +1,397 @@
+"""
+Moduł wielopoziomowej pamięci podręcznej dla wyników wyszukiwania leków.
+
+Udostępnia dwa poziomy cache:
+- lokalny, ograniczony rozmiarem cache LRU z czasem życia wpisów (TTL),
+  przechowywany w pamięci pojedynczego procesu,
+- współdzielony cache Django (alias z ustawienia RPL_CACHE['SHARED_ALIAS']),
+  widoczny dla wszystkich workerów.
+
+Oba poziomy obsługują buforowanie negatywne: informacja o tym, że kod nie
+został znaleziony, jest przechowywana z osobnym, krótszym TTL. Wpisy
+pozytywne po utracie świeżości pozostają jeszcze przez pewien czas we
+współdzielonym cache, aby można było je zwrócić, gdy API rejestru jest
+niedostępne.
+
+Każdy wpis przechowuje czas zapisania, czyli czas pobrania danych z API
+rejestru, aby wynik zwrócony z cache nie był traktowany jak świeżo pobrany.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Znacznik zapisywany w cache dla kodów, które nie zostały znalezione
+NOT_FOUND = '__not_found__'
+
+DEFAULT_CACHE_SETTINGS = {
+    'LOCAL_MAXSIZE': 4096,
+    'LOCAL_TTL': 300,
+    'SHARED_TTL': 60 * 60 * 24,
+    'NEGATIVE_TTL': 60 * 60,
+    'STALE_TTL': 60 * 60 * 24 * 7,
+    'SHARED_ALIAS': 'rpl',
+}
+
+
+def get_cache_settings() -> dict:
+    """
+    Zwraca ustawienia cache uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z RPL_CACHE nałożone na DEFAULT_CACHE_SETTINGS
+    """
+    return {**DEFAULT_CACHE_SETTINGS, **getattr(settings, 'RPL_CACHE', {})}
+
+
+class LocalTTLCache:
+    """
+    Ograniczony rozmiarem cache LRU z czasem życia wpisów.
+
+    Bezpieczny wątkowo. Po przekroczeniu maksymalnego rozmiaru usuwany jest
+    najdawniej używany wpis, a wpisy starsze niż ich TTL są traktowane
+    jak nieobecne.
+
+    Attributes:
+        maxsize (int): Maksymalna liczba wpisów
+        ttl (float): Domyślny czas życia wpisu w sekundach
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Inicjalizuje pusty cache.
+
+        Args:
+            maxsize (int): Maksymalna liczba wpisów
+            ttl (float): Domyślny czas życia wpisu w sekundach
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Pobiera wpis z cache.
+
+        Args:
+            key (str): Klucz wpisu
+
+        Returns:
+            Tuple[bool, Any]: Para (czy trafienie, wartość)
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Zapisuje wpis w cache, usuwając w razie potrzeby najdawniej używany.
+
+        Args:
+            key (str): Klucz wpisu
+            value (Any): Wartość do zapisania
+            ttl (Optional[float]): Czas życia wpisu, domyślnie self.ttl
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """
+        Usuwa wpis z cache, jeśli istnieje.
+
+        Args:
+            key (str): Klucz wpisu
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Usuwa wszystkie wpisy z cache.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    """
+    Dwupoziomowy cache: lokalny LRU procesu oraz współdzielony cache Django.
+
+    Odczyt sprawdza najpierw poziom lokalny, a następnie współdzielony
+    (trafienie we współdzielonym poziomie jest kopiowane do lokalnego).
+    Błędy współdzielonego backendu są logowane i traktowane jak brak
+    trafienia, aby awaria cache nie blokowała wyszukiwania.
+
+    Attributes:
+        prefix (str): Prefiks kluczy we współdzielonym cache
+        local (LocalTTLCache): Lokalny poziom cache
+        shared_alias (str): Alias współdzielonego cache w ustawieniu CACHES
+        shared_ttl (int): Czas życia wpisów pozytywnych we współdzielonym cache
+        negative_ttl (int): Czas życia wpisów negatywnych w obu poziomach
+        stale_ttl (int): Czas, przez jaki wpis pozytywny po utracie świeżości
+            może jeszcze zostać zwrócony przez get_stale
+    """
+    def __init__(
+        self,
+        prefix: str,
+        local_maxsize: int,
+        local_ttl: float,
+        shared_ttl: int,
+        negative_ttl: int,
+        shared_alias: str,
+        stale_ttl: int = 0
+    ):
+        """
+        Inicjalizuje cache.
+
+        Args:
+            prefix (str): Prefiks kluczy we współdzielonym cache
+            local_maxsize (int): Maksymalna liczba wpisów w poziomie lokalnym
+            local_ttl (float): Czas życia wpisów w poziomie lokalnym
+            shared_ttl (int): Czas życia wpisów pozytywnych we współdzielonym cache
+            negative_ttl (int): Czas życia wpisów negatywnych
+            shared_alias (str): Alias współdzielonego cache w ustawieniu CACHES
+            stale_ttl (int): Czas przechowywania wpisów po utracie świeżości
+        """
+        self.prefix = prefix
+        self.local = LocalTTLCache(local_maxsize, local_ttl)
+        self.shared_alias = shared_alias
+        self.shared_ttl = shared_ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+
+    @classmethod
+    def from_settings(cls, prefix: str) -> 'TieredCache':
+        """
+        Tworzy cache na podstawie ustawienia RPL_CACHE.
+
+        Args:
+            prefix (str): Prefiks kluczy we współdzielonym cache
+
+        Returns:
+            TieredCache: Skonfigurowany cache
+        """
+        config = get_cache_settings()
+        return cls(
+            prefix=prefix,
+            local_maxsize=config['LOCAL_MAXSIZE'],
+            local_ttl=config['LOCAL_TTL'],
+            shared_ttl=config['SHARED_TTL'],
+            negative_ttl=config['NEGATIVE_TTL'],
+            shared_alias=config['SHARED_ALIAS'],
+            stale_ttl=config['STALE_TTL'],
+        )
+
+    @property
+    def shared(self):
+        """
+        Zwraca współdzielony backend cache Django.
+        """
+        return caches[self.shared_alias]
+
+    def shared_key(self, key: str) -> str:
+        """
+        Buduje klucz wpisu we współdzielonym cache.
+
+        Args:
+            key (str): Klucz wpisu
+
+        Returns:
+            str: Klucz z prefiksem
+        """
+        return f"{self.prefix}:{key}"
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Pobiera świeży wpis z cache.
+
+        Args:
+            key (str): Klucz wpisu
+
+        Returns:
+            Tuple[bool, Any]: Para (czy trafienie, wartość). Dla wpisów
+                negatywnych zwracane jest (True, None).
+        """
+        hit, value = self.local.get(key)
+        if hit:
+            return True, self._value(value[1])
+
+        try:
+            entry = self.shared.get(self.shared_key(key))
+        except Exception as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            return False, None
+        return self._unwrap(key, entry, allow_stale=False)
+
+    def get_stale(self, key: str) -> Tuple[bool, Any]:
+        """
+        Pobiera wpis ze współdzielonego cache, również po upływie jego
+        świeżości (w okresie STALE_TTL).
+
+        Służy do obsługi zapytań, gdy API rejestru jest niedostępne.
+
+        Args:
+            key (str): Klucz wpisu
+
+        Returns:
+            Tuple[bool, Any]: Para (czy trafienie, wartość)
+        """
+        try:
+            entry = self.shared.get(self.shared_key(key))
+        except Exception as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            return False, None
+        return self._unwrap(key, entry, allow_stale=True)
+
+    def stored_at(self, key: str) -> Optional[float]:
+        """
+        Zwraca czas zapisania wpisu, który get lub aget właśnie zwróciło.
+
+        Odczyt współdzielonego poziomu kopiuje wpis do poziomu lokalnego
+        razem z czasem zapisania, dlatego sprawdzany jest tylko poziom lokalny.
+
+        Args:
+            key (str): Klucz wpisu
+
+        Returns:
+            Optional[float]: Czas zapisania (time.time()) lub None, gdy
+                wpisu nie ma w poziomie lokalnym
+        """
+        hit, value = self.local.get(key)
+        return value[0] if hit else None
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Zapisuje wpis w obu poziomach cache.
+
+        Wartość None jest zapisywana jako wpis negatywny z krótszym TTL.
+        Wpisy pozytywne pozostają we współdzielonym cache jeszcze przez
+        STALE_TTL po utracie świeżości.
+
+        Args:
+            key (str): Klucz wpisu
+            value (Any): Wartość do zapisania lub None dla braku wyniku
+        """
+        stored = NOT_FOUND if value is None else value
+        stored_at = time.time()
+        self.local.set(key, (stored_at, stored), self._local_ttl(stored))
+        try:
+            self.shared.set(self.shared_key(key), *self._wrap(stored, stored_at))
+        except Exception as e:
+            logger.warning(f"Shared cache write failed: {e}")
+
+    async def aget(self, key: str) -> Tuple[bool, Any]:
+        """
+        Asynchroniczna wersja get, nieblokująca pętli zdarzeń przy odczycie
+        współdzielonego cache.
+
+        Args:
+            key (str): Klucz wpisu
+
+        Returns:
+            Tuple[bool, Any]: Para (czy trafienie, wartość)
+        """
+        hit, value = self.local.get(key)
+        if hit:
+            return True, self._value(value[1])
+
+        try:
+            entry = await self.shared.aget(self.shared_key(key))
+        except Exception as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            return False, None
+        return self._unwrap(key, entry, allow_stale=False)
+
+    async def aget_stale(self, key: str) -> Tuple[bool, Any]:
+        """
+        Asynchroniczna wersja get_stale.
+
+        Args:
+            key (str): Klucz wpisu
+
+        Returns:
+            Tuple[bool, Any]: Para (czy trafienie, wartość)
+        """
+        try:
+            entry = await self.shared.aget(self.shared_key(key))
+        except Exception as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            return False, None
+        return self._unwrap(key, entry, allow_stale=True)
+
+    async def aset(self, key: str, value: Any) -> None:
+        """
+        Asynchroniczna wersja set.
+
+        Args:
+            key (str): Klucz wpisu
+            value (Any): Wartość do zapisania lub None dla braku wyniku
+        """
+        stored = NOT_FOUND if value is None else value
+        stored_at = time.time()
+        self.local.set(key, (stored_at, stored), self._local_ttl(stored))
+        try:
+            await self.shared.aset(self.shared_key(key), *self._wrap(stored, stored_at))
+        except Exception as e:
+            logger.warning(f"Shared cache write failed: {e}")
+
+    def delete(self, key: str) -> None:
+        """
+        Usuwa wpis z obu poziomów cache.
+
+        Args:
+            key (str): Klucz wpisu
+        """
+        self.local.delete(key)
+        try:
+            self.shared.delete(self.shared_key(key))
+        except Exception as e:
+            logger.warning(f"Shared cache delete failed: {e}")
+
+    def _wrap(self, stored: Any, stored_at: float) -> Tuple[Tuple[float, float, Any], int]:
+        # Wpis współdzielony to trójka (świeży do, czas zapisania, wartość)
+        # oraz czas życia w backendzie obejmujący okres, w którym wpis może
+        # być użyty jako nieaktualny
+        if stored == NOT_FOUND:
+            return (stored_at + self.negative_ttl, stored_at, stored), self.negative_ttl
+        return (stored_at + self.shared_ttl, stored_at, stored), self.shared_ttl + self.stale_ttl
+
+    def _unwrap(self, key: str, entry: Any, allow_stale: bool) -> Tuple[bool, Any]:
+        if not isinstance(entry, tuple) or len(entry) != 3:
+            return False, None
+        fresh_until, stored_at, stored = entry
+        if fresh_until < time.time():
+            if not allow_stale:
+                return False, None
+        else:
+            self.local.set(key, (stored_at, stored), self._local_ttl(stored))
+        return True, self._value(stored)
+
+    @staticmethod
+    def _value(stored: Any) -> Any:
+        return None if stored == NOT_FOUND else stored
+
+    def _local_ttl(self, stored: Any) -> float:
+        if stored == NOT_FOUND:
+            return min(self.local.ttl, self.negative_ttl)
+        return self.local.ttl
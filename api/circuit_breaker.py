@@ -0,0 +1,162 @@
+"""
+Moduł wyłącznika awaryjnego (circuit breaker) dla API rejestru.
+
+Po serii kolejnych błędów lub przekroczeń czasu wyłącznik przechodzi w stan
+otwarty i przez określony czas odrzuca zapytania natychmiast, zamiast
+blokować workery w oczekiwaniu na niedostępne API. Po tym czasie przepuszcza
+pojedyncze zapytanie próbne; jego powodzenie zamyka wyłącznik i uruchamia
+zarejestrowane akcje powrotu (np. odświeżenie nieaktualnych wpisów cache).
+"""
+import logging
+import threading
+import time
+from typing import Callable, List
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CIRCUIT_BREAKER_SETTINGS = {
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 30,
+}
+
+
+class CircuitOpenError(Exception):
+    """
+    Wyjątek zgłaszany, gdy wyłącznik jest otwarty i zapytanie zostało
+    odrzucone bez kontaktu z API.
+    """
+
+
+class CircuitBreaker:
+    """
+    Wyłącznik awaryjny o stanach zamknięty, otwarty i półotwarty.
+
+    Stan jest przechowywany w pamięci procesu i chroniony blokadą,
+    więc każdy worker ma własny wyłącznik.
+
+    Attributes:
+        name (str): Nazwa chronionej usługi (do logów)
+        failure_threshold (int): Liczba kolejnych błędów otwierająca wyłącznik
+        reset_timeout (float): Czas w sekundach, po którym otwarty wyłącznik
+            przepuszcza zapytanie próbne
+        state (str): Bieżący stan wyłącznika
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        """
+        Inicjalizuje zamknięty wyłącznik.
+
+        Args:
+            name (str): Nazwa chronionej usługi
+            failure_threshold (int): Liczba kolejnych błędów otwierająca wyłącznik
+            reset_timeout (float): Czas do zapytania próbnego w sekundach
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._recovery_callbacks: List[Callable[[], None]] = []
+
+    @classmethod
+    def from_settings(cls, name: str) -> 'CircuitBreaker':
+        """
+        Tworzy wyłącznik na podstawie ustawienia RPL_CIRCUIT_BREAKER.
+
+        Args:
+            name (str): Nazwa chronionej usługi
+
+        Returns:
+            CircuitBreaker: Skonfigurowany wyłącznik
+        """
+        config = {**DEFAULT_CIRCUIT_BREAKER_SETTINGS, **getattr(settings, 'RPL_CIRCUIT_BREAKER', {})}
+        return cls(name, config['FAILURE_THRESHOLD'], config['RESET_TIMEOUT'])
+
+    def on_recovery(self, callback: Callable[[], None]) -> None:
+        """
+        Rejestruje funkcję wywoływaną po ponownym zamknięciu wyłącznika.
+
+        Args:
+            callback (Callable[[], None]): Funkcja bez argumentów
+        """
+        self._recovery_callbacks.append(callback)
+
+    def allow_request(self) -> bool:
+        """
+        Sprawdza, czy zapytanie może zostać wysłane.
+
+        W stanie półotwartym przepuszczane jest tylko jedno zapytanie próbne.
+
+        Returns:
+            bool: True, jeśli zapytanie może zostać wysłane
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def check(self) -> None:
+        """
+        Zgłasza wyjątek, jeśli zapytanie nie może zostać wysłane.
+
+        Raises:
+            CircuitOpenError: Gdy wyłącznik jest otwarty
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit breaker '{self.name}' is open")
+
+    def record_success(self) -> None:
+        """
+        Rejestruje udane zapytanie, zamykając wyłącznik.
+        """
+        with self._lock:
+            recovered = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+        if recovered:
+            logger.info(f"Circuit breaker '{self.name}' closed")
+            for callback in self._recovery_callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"Circuit breaker recovery callback failed: {e}")
+
+    def release(self) -> None:
+        """
+        Rejestruje zapytanie, które nie zostało wysłane do API (np. z powodu
+        lokalnego limitu), bez zmiany stanu wyłącznika.
+
+        W stanie półotwartym pozwala to wysłać kolejne zapytanie próbne.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """
+        Rejestruje nieudane zapytanie, otwierając wyłącznik po przekroczeniu
+        progu błędów lub po nieudanym zapytaniu próbnym.
+        """
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit breaker '{self.name}' opened")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
@@ -0,0 +1,287 @@
+"""
+Moduł rozpoznawania i normalizacji zeskanowanych kodów leków.
+
+Obsługuje kody kreskowe GTIN (EAN-8, UPC-A, EAN-13, GTIN-14, również
+z zerami wiodącymi) oraz ciągi elementów GS1 odczytywane z kodów
+DataMatrix umieszczanych na opakowaniach leków (identyfikatory
+zastosowania 01, 10, 11, 17 i 21; pozostałe, np. 240, 712 czy 714, są
+pomijane). Każdy poprawny kod jest sprowadzany
+do jednego, 14-cyfrowego klucza GTIN, a kody z błędną cyfrą kontrolną
+są odrzucane bez odpytywania rejestru.
+"""
+import re
+from datetime import date
+from typing import Dict, Optional
+
+from sync_rpl.packaging import canonical_gtin
+
+# Separator pól o zmiennej długości w ciągu GS1 (znak FNC1 / GS)
+GS1_SEPARATOR = '\x1d'
+
+# Prefiksy identyfikatorów symbologii dodawane przez niektóre skanery
+SYMBOLOGY_PREFIXES = (']d2', ']C1', ']Q3', ']e0')
+
+# Identyfikatory zastosowania GS1: (nazwa pola, stała długość lub None
+# dla pól o zmiennej długości, maksymalna długość)
+GS1_AIS = {
+    '01': ('gtin', 14, 14),
+    '10': ('lot', None, 20),
+    '11': ('production_date', 6, 6),
+    '17': ('expiry', 6, 6),
+    '21': ('serial', None, 20),
+}
+
+# Długość identyfikatora zastosowania według jego dwóch pierwszych cyfr
+# (pozostałe identyfikatory są dwucyfrowe)
+GS1_AI_LENGTHS = {
+    '23': 3, '24': 3, '25': 3, '31': 4, '32': 4, '33': 4, '34': 4, '35': 4, '36': 4,
+    '39': 4, '40': 3, '41': 3, '42': 3, '43': 4, '70': 4, '71': 3, '72': 4,
+    '80': 4, '81': 4, '82': 4,
+}
+
+# Stała długość danych identyfikatorów zastosowania według dwóch pierwszych
+# cyfr (tabela pól o predefiniowanej długości GS1); pozostałe pola mają
+# zmienną długość i są zakończone znakiem GS
+GS1_FIXED_LENGTHS = {
+    '00': 18, '01': 14, '02': 14, '03': 14, '04': 16,
+    '11': 6, '12': 6, '13': 6, '14': 6, '15': 6, '16': 6, '17': 6, '18': 6, '19': 6,
+    '20': 2, '31': 6, '32': 6, '33': 6, '34': 6, '35': 6, '36': 6, '41': 13,
+}
+
+# Maksymalna długość danych pola GS1 o zmiennej długości
+GS1_MAX_LENGTH = 90
+
+GS1_BRACKETED_PATTERN = re.compile(r'\((\d{2,4})\)([^()]*)')
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+
+class ScannedCode:
+    """
+    Wynik analizy zeskanowanego kodu.
+
+    Attributes:
+        raw (str): Kod w postaci otrzymanej od klienta
+        code_type (str): Typ kodu zgodny z DrugCode.CODE_TYPES ('GTIN' lub 'OTHER')
+        gtin (Optional[str]): Kanoniczny, 14-cyfrowy kod GTIN
+        lot (Optional[str]): Numer serii (AI 10)
+        expiry (Optional[str]): Data ważności w formacie ISO (AI 17)
+        serial (Optional[str]): Numer seryjny opakowania (AI 21)
+        is_gs1 (bool): Czy kod był ciągiem elementów GS1 (DataMatrix)
+        error (Optional[str]): Powód odrzucenia kodu
+    """
+    def __init__(self, raw: str, code_type: str, gtin: Optional[str] = None,
+                 lot: Optional[str] = None, expiry: Optional[str] = None,
+                 serial: Optional[str] = None, is_gs1: bool = False,
+                 error: Optional[str] = None):
+        """
+        Inicjalizuje wynik analizy kodu.
+
+        Args:
+            raw (str): Kod w postaci otrzymanej od klienta
+            code_type (str): Typ kodu
+            gtin (Optional[str]): Kanoniczny kod GTIN
+            lot (Optional[str]): Numer serii
+            expiry (Optional[str]): Data ważności w formacie ISO
+            serial (Optional[str]): Numer seryjny
+            is_gs1 (bool): Czy kod był ciągiem elementów GS1
+            error (Optional[str]): Powód odrzucenia kodu
+        """
+        self.raw = raw
+        self.code_type = code_type
+        self.gtin = gtin
+        self.lot = lot
+        self.expiry = expiry
+        self.serial = serial
+        self.is_gs1 = is_gs1
+        self.error = error
+
+    @property
+    def is_valid(self) -> bool:
+        """
+        Czy kod zawiera poprawny GTIN, po którym można wyszukać lek.
+        """
+        return self.gtin is not None and self.error is None
+
+    def gs1_info(self) -> Dict[str, Optional[str]]:
+        """
+        Zwraca dane opakowania odczytane z kodu GS1.
+
+        Returns:
+            Dict[str, Optional[str]]: Seria, data ważności i numer seryjny
+        """
+        return {
+            'lot': self.lot,
+            'expiry': self.expiry,
+            'serial': self.serial,
+        }
+
+
+def gtin_check_digit(body: str) -> int:
+    """
+    Oblicza cyfrę kontrolną GTIN (algorytm modulo 10 GS1).
+
+    Args:
+        body (str): Cyfry kodu bez cyfry kontrolnej
+
+    Returns:
+        int: Cyfra kontrolna
+    """
+    total = sum(
+        int(digit) * (3 if position % 2 == 0 else 1)
+        for position, digit in enumerate(reversed(body))
+    )
+    return (10 - total % 10) % 10
+
+
+def normalize_gtin(code: str) -> Optional[str]:
+    """
+    Sprowadza kod GTIN do kanonicznej, 14-cyfrowej postaci z weryfikacją
+    cyfry kontrolnej.
+
+    Args:
+        code (str): Kod EAN-8, UPC-A, EAN-13 lub GTIN-14
+
+    Returns:
+        Optional[str]: Kanoniczny kod GTIN lub None, gdy kod ma nieprawidłową
+            długość lub cyfrę kontrolną
+
+    Example:
+        >>> normalize_gtin("5909990840229")
+        '05909990840229'
+    """
+    code = (code or '').strip()
+    if len(code) not in GTIN_LENGTHS:
+        return None
+    gtin = canonical_gtin(code)
+    if not gtin or gtin_check_digit(gtin[:-1]) != int(gtin[-1]):
+        return None
+    return gtin
+
+
+def parse_gs1_date(value: str) -> Optional[str]:
+    """
+    Zamienia datę GS1 w formacie RRMMDD na datę ISO.
+
+    Dzień 00 oznacza ostatni dzień miesiąca.
+
+    Args:
+        value (str): Data w formacie RRMMDD
+
+    Returns:
+        Optional[str]: Data w formacie RRRR-MM-DD lub None dla błędnej daty
+    """
+    try:
+        year, month, day = 2000 + int(value[:2]), int(value[2:4]), int(value[4:6])
+        if day == 0:
+            next_month = date(year + month // 12, month % 12 + 1, 1)
+            return date.fromordinal(next_month.toordinal() - 1).isoformat()
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def parse_gs1(data: str) -> Optional[Dict[str, str]]:
+    """
+    Rozbija ciąg elementów GS1 na pola.
+
+    Obsługuje postać surową (pola zmiennej długości zakończone znakiem GS)
+    oraz postać czytelną z identyfikatorami w nawiasach, np.
+    "(01)05909990840229(17)260131(10)AB123(21)XYZ". Zwracane są pola
+    identyfikatorów z GS1_AIS; pozostałe identyfikatory zastosowania są
+    pomijane (w postaci surowej ich długość wyznaczają tabele
+    GS1_AI_LENGTHS i GS1_FIXED_LENGTHS).
+
+    Args:
+        data (str): Ciąg elementów GS1 bez identyfikatora symbologii
+
+    Returns:
+        Optional[Dict[str, str]]: Słownik pól lub None, gdy ciąg jest
+            niepoprawny albo pole ma nieprawidłową długość
+    """
+    fields = {}
+    if data.startswith('('):
+        for ai, value in GS1_BRACKETED_PATTERN.findall(data):
+            if ai not in GS1_AIS:
+                continue
+            name, fixed_length, max_length = GS1_AIS[ai]
+            if fixed_length and len(value) != fixed_length:
+                return None
+            if not value or len(value) > max_length:
+                return None
+            fields[name] = value
+        return fields or None
+
+    position = 0
+    while position < len(data):
+        if data[position] == GS1_SEPARATOR:
+            position += 1
+            continue
+        ai = data[position:position + GS1_AI_LENGTHS.get(data[position:position + 2], 2)]
+        if not ai.isdigit() or len(ai) < 2:
+            return None
+        if ai in GS1_AIS:
+            name, fixed_length, max_length = GS1_AIS[ai]
+        else:
+            name, fixed_length, max_length = None, GS1_FIXED_LENGTHS.get(ai[:2]), GS1_MAX_LENGTH
+        position += len(ai)
+        if fixed_length:
+            value = data[position:position + fixed_length]
+            if len(value) != fixed_length:
+                return None
+            position += fixed_length
+        else:
+            end = data.find(GS1_SEPARATOR, position)
+            end = len(data) if end == -1 else end
+            value = data[position:end]
+            if not value or len(value) > max_length:
+                return None
+            position = end
+        if name:
+            fields[name] = value
+    return fields or None
+
+
+def parse_code(raw: str) -> ScannedCode:
+    """
+    Rozpoznaje i normalizuje zeskanowany kod.
+
+    Args:
+        raw (str): Kod w postaci otrzymanej od klienta
+
+    Returns:
+        ScannedCode: Wynik analizy kodu; dla kodów odrzuconych pole error
+            zawiera powód odrzucenia
+
+    Example:
+        >>> parse_code("0105909990840229172601311012345").gtin
+        '05909990840229'
+    """
+    code = raw.strip()
+    for prefix in SYMBOLOGY_PREFIXES:
+        if code.startswith(prefix):
+            code = code[len(prefix):]
+            break
+
+    if code.isdigit() and len(code) <= 14:
+        gtin = normalize_gtin(code)
+        if not gtin:
+            return ScannedCode(raw, 'OTHER', error='Nieprawidłowy kod GTIN')
+        return ScannedCode(raw, 'GTIN', gtin=gtin)
+
+    fields = parse_gs1(code)
+    if not fields or 'gtin' not in fields:
+        return ScannedCode(raw, 'OTHER', error='Nierozpoznany format kodu')
+
+    gtin = normalize_gtin(fields['gtin'])
+    if not gtin:
+        return ScannedCode(raw, 'OTHER', is_gs1=True, error='Nieprawidłowy kod GTIN')
+    return ScannedCode(
+        raw,
+        'GTIN',
+        gtin=gtin,
+        lot=fields.get('lot'),
+        expiry=parse_gs1_date(fields['expiry']) if 'expiry' in fields else None,
+        serial=fields.get('serial'),
+        is_gs1=True,
+    )
@@ -0,0 +1,101 @@
+"""
+Moduł gotowych dokumentów odpowiedzi endpointu skanowania.
+
+Po każdej synchronizacji lokalnego rejestru dla każdego opakowania budowana
+jest kompletna odpowiedź JSON endpointu /api/scan/, zapisywana jako blob
+z kluczem na kanonicznym kodzie GTIN. Trafienie w rejestrze sprowadza się
+wtedy do jednego zapytania po kluczu głównym i wysłania gotowych bajtów,
+bez budowania obiektów ORM, słowników i renderowania przez DRF.
+"""
+import json
+from typing import Optional
+
+from django.db import transaction
+
+from sync_rpl.models import MedicinePackage
+from .models import ScanDocument
+from .scan import drug_from_medicine
+
+DOCUMENT_BATCH_SIZE = 5000
+
+
+def encode_document(body: dict) -> bytes:
+    """
+    Koduje treść odpowiedzi tak samo jak JSONRenderer frameworka DRF.
+
+    Args:
+        body (dict): Treść odpowiedzi
+
+    Returns:
+        bytes: Dokument JSON w UTF-8
+    """
+    return json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def build_scan_document(package: MedicinePackage) -> bytes:
+    """
+    Buduje odpowiedź endpointu skanowania dla opakowania z rejestru.
+
+    Args:
+        package (MedicinePackage): Opakowanie wraz z powiązanym lekiem
+
+    Returns:
+        bytes: Dokument JSON odpowiedzi
+    """
+    return encode_document({
+        'found': True,
+        'drug': drug_from_medicine(package.medicine, package.gtin, 'GTIN', package)
+    })
+
+
+def materialize_scan_documents(**kwargs) -> int:
+    """
+    Przebudowuje dokumenty odpowiedzi dla wszystkich opakowań z rejestru.
+
+    Stare dokumenty są zastępowane w jednej transakcji, więc w trakcie
+    przebudowy widoczny jest poprzedni komplet. Funkcja jest podłączona
+    do sygnału sync_rpl.signals.registry_synced.
+
+    Returns:
+        int: Liczba zapisanych dokumentów
+    """
+    packages = MedicinePackage.objects.select_related('medicine').defer('medicine__search_document').order_by('gtin')
+    count = 0
+    with transaction.atomic():
+        ScanDocument.objects.all().delete()
+        batch = []
+        for package in packages.iterator(chunk_size=DOCUMENT_BATCH_SIZE):
+            batch.append(ScanDocument(gtin=package.gtin, document=build_scan_document(package)))
+            if len(batch) >= DOCUMENT_BATCH_SIZE:
+                ScanDocument.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        ScanDocument.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def find_scan_document(gtin: str) -> Optional[bytes]:
+    """
+    Pobiera gotowy dokument odpowiedzi dla kodu GTIN.
+
+    Args:
+        gtin (str): Kanoniczny kod GTIN
+
+    Returns:
+        Optional[bytes]: Dokument JSON lub None, gdy kodu nie ma w rejestrze
+    """
+    return ScanDocument.objects.filter(gtin=gtin).values_list('document', flat=True).first()
+
+
+async def afind_scan_document(gtin: str) -> Optional[bytes]:
+    """
+    Asynchroniczna wersja find_scan_document.
+
+    Args:
+        gtin (str): Kanoniczny kod GTIN
+
+    Returns:
+        Optional[bytes]: Dokument JSON lub None
+    """
+    return await ScanDocument.objects.filter(gtin=gtin).values_list('document', flat=True).afirst()
@@ -3,12 +3,109 @@ Moduł dostępu do API Rejestru Produktów Leczniczych.
 
 Moduł zapewnia interfejs do komunikacji z oficjalnym API Rejestru Produktów
 Leczniczych prowadzonym przez eZdrowie, umożliwiając wyszukiwanie leków
-po kodach GTIN/EAN.
+po kodach GTIN/EAN. Wyniki wyszukiwania są buforowane w dwupoziomowym
+cache (lokalny LRU procesu oraz cache współdzielony przez workery).
+
+Zapytania do API są chronione wyłącznikiem awaryjnym. Gdy API jest
+niedostępne, zwracane są nieaktualne wpisy z cache, a po powrocie API
+są one odświeżane w tle. Zbyt długo oczekujące zapytania są zabezpieczane
+drugim, identycznym zapytaniem (patrz api.hedging), a liczbę i tempo
+zapytań wszystkich workerów ogranicza wspólny ogranicznik (patrz
+api.governor).
 """
 
 # api/drug_api.py
-import requests
-from typing import Optional, Dict, Any
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional, Dict, Any, Tuple
+
+from django.db import connections
+
+from .cache import TieredCache
+from .circuit_breaker import CircuitBreaker
+from .governor import GovernorTimeout, UpstreamGovernor
+from .hedging import Hedger
+from .http_client import get_async_client, get_http_settings, get_session, get_timeout
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Cache wyników wyszukiwania, wspólny dla wszystkich wywołań w procesie
+drug_cache = TieredCache.from_settings('rpl:drug')
+
+# Łączenie współbieżnych zapytań o ten sam kod
+drug_flight = SingleFlight.from_settings('rpl:drug:lock')
+
+# Wyłącznik awaryjny dla API rejestru
+rpl_breaker = CircuitBreaker.from_settings('rpl')
+
+# Zapytania zabezpieczające dla API rejestru
+rpl_hedger = Hedger.from_settings('rpl')
+
+# Wspólny dla workerów limit zapytań w toku i tempa zapytań do API rejestru
+rpl_governor = UpstreamGovernor.from_settings('rpl')
+
+# Pobieranie eksportu CSV: jeden slot poza pulą zapytań o leki, żetony
+# z tego samego wiadra co zapytania o leki
+rpl_download_governor = rpl_governor.pool('download', 1)
+
+# Kody zwrócone z nieaktualnego cache, odświeżane po powrocie API
+MAX_PENDING_REFRESH = 1000
+_pending_refresh = set()
+_pending_refresh_lock = threading.Lock()
+
+
+class RegistryUnavailableError(Exception):
+    """
+    Wyjątek zgłaszany, gdy API rejestru jest niedostępne, a cache nie
+    zawiera nawet nieaktualnych danych dla szukanego kodu.
+    """
+
+
+def schedule_refresh(code: str) -> None:
+    """
+    Dodaje kod do kolejki odświeżenia po powrocie API rejestru.
+
+    Args:
+        code (str): Kod GTIN/EAN zwrócony z nieaktualnego cache
+    """
+    with _pending_refresh_lock:
+        if len(_pending_refresh) < MAX_PENDING_REFRESH:
+            _pending_refresh.add(code)
+
+
+def refresh_pending() -> None:
+    """
+    Uruchamia w tle odświeżenie kodów zwróconych z nieaktualnego cache.
+
+    Wywoływana po ponownym zamknięciu wyłącznika awaryjnego.
+    """
+    with _pending_refresh_lock:
+        codes = list(_pending_refresh)
+        _pending_refresh.clear()
+    if codes:
+        threading.Thread(target=_refresh_codes, args=(codes,), daemon=True).start()
+
+
+def _refresh_codes(codes) -> None:
+    try:
+        for index, code in enumerate(codes):
+            try:
+                PolishMedicinesAPI.refresh(code)
+            except Exception as e:
+                logger.warning(f"Drug refresh failed: {e}")
+                # API znów niedostępne - pozostałe kody wracają do kolejki
+                for pending in codes[index:]:
+                    schedule_refresh(pending)
+                return
+    finally:
+        connections.close_all()
+
+
+rpl_breaker.on_recovery(refresh_pending)
+
 
 class PolishMedicinesAPI:
     """
@@ -28,8 +125,13 @@ class PolishMedicinesAPI:
         """
         Wyszukuje lek w rejestrze na podstawie kodu GTIN/EAN.
 
-        Metoda wysyła zapytanie GET do API rejestru produktów leczniczych,
-        próbując znaleźć informacje o leku na podstawie podanego kodu.
+        Metoda sprawdza najpierw cache wyników, a w przypadku braku trafienia
+        wysyła zapytanie GET do API rejestru produktów leczniczych. Zarówno
+        znalezione leki, jak i kody nieznalezione w rejestrze są zapisywane
+        w cache (te drugie z krótszym czasem życia). Błędy komunikacji
+        nie są buforowane. Współbieżne wyszukiwania tego samego kodu są
+        łączone w jedno zapytanie do API (patrz api.singleflight). Podczas
+        awarii API zwracane są nieaktualne dane z cache (patrz lookup).
 
         Args:
             code (str): Kod GTIN/EAN leku do wyszukania
@@ -47,15 +149,246 @@ class PolishMedicinesAPI:
             ...     print("Nie znaleziono leku")
         """
         try:
-            # Wyszukiwanie po kodzie GTIN/EAN metodą GET
-            response = requests.get(f"{PolishMedicinesAPI.BASE_URL}", params={
-                'eanGtin': code
-            })
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data
+            return PolishMedicinesAPI.lookup(code)[0]
+        except RegistryUnavailableError as e:
+            logger.warning(f"Drug lookup failed: {e}")
+            return None
+
+    @staticmethod
+    def lookup(code: str) -> Tuple[Optional[Dict[Any, Any]], str]:
+        """
+        Wyszukuje lek w rejestrze, informując o źródle wyniku.
+
+        Gdy API rejestru jest niedostępne (błąd, przekroczenie czasu lub
+        otwarty wyłącznik awaryjny), zwracany jest nieaktualny wpis cache,
+        a kod jest kolejkowany do odświeżenia po powrocie API.
+
+        Args:
+            code (str): Kod GTIN/EAN leku do wyszukania
+
+        Returns:
+            Tuple[Optional[Dict[Any, Any]], str]: Dane o leku (None, gdy lek
+                nie istnieje) oraz źródło wyniku: 'cache', 'upstream'
+                lub 'stale'
+
+        Raises:
+            RegistryUnavailableError: Gdy API jest niedostępne, a cache nie
+                zawiera danych dla kodu
+        """
+        code = code.strip()
+        hit, data = drug_cache.get(code)
+        if hit:
+            return data, 'cache'
+
+        try:
+            return drug_flight.do(
+                code,
+                lambda: PolishMedicinesAPI._fetch_and_cache(code),
+                lambda: drug_cache.get(code)
+            ), 'upstream'
+        except Exception as e:
+            hit, data = drug_cache.get_stale(code)
+            if hit:
+                schedule_refresh(code)
+                return data, 'stale'
+            raise RegistryUnavailableError(str(e)) from e
+
+    @staticmethod
+    def refresh(code: str) -> Optional[Dict[Any, Any]]:
+        """
+        Pobiera aktualne dane leku z API rejestru i zapisuje je w cache.
+
+        Zapytanie pomija cache, ale przechodzi przez wyłącznik awaryjny
+        i wspólny ogranicznik zapytań. Używane do odświeżania nieaktualnych
+        wpisów cache i leków zapisanych z API (patrz api.drug_store).
+
+        Args:
+            code (str): Kod GTIN/EAN leku
+
+        Returns:
+            Optional[Dict[Any, Any]]: Dane o leku lub None, gdy lek nie istnieje
+
+        Raises:
+            Exception: Gdy API jest niedostępne lub wyłącznik awaryjny jest otwarty
+        """
+        return PolishMedicinesAPI._fetch_and_cache(code.strip())
+
+    @staticmethod
+    def _fetch_and_cache(code: str) -> Optional[Dict[Any, Any]]:
+        rpl_breaker.check()
+        try:
+            data = PolishMedicinesAPI.fetch_drug(code)
+        except GovernorTimeout:
+            # Przepełniona kolejka nie świadczy o awarii API
+            rpl_breaker.release()
+            raise
+        except Exception:
+            rpl_breaker.record_failure()
+            raise
+        rpl_breaker.record_success()
+
+        if not data or not data.get('content'):
+            data = None
+        drug_cache.set(code, data)
+        return data
+
+    @staticmethod
+    def fetch_drug(code: str) -> Optional[Dict[Any, Any]]:
+        """
+        Wysyła zapytanie o lek bezpośrednio do API rejestru, z pominięciem cache.
+
+        Zapytanie korzysta ze współdzielonej sesji HTTP z pulą połączeń,
+        limitami czasu i ponowieniami (patrz api.http_client). Gdy odpowiedź
+        się opóźnia, wysyłane jest zapytanie zabezpieczające (patrz api.hedging).
+        Każda próba (także ponowienie po odpowiedzi ze statusem
+        z RPL_HTTP['RETRY_STATUSES']) czeka w kolejce na slot i żeton
+        wspólnego ogranicznika (patrz api.governor).
+
+        Args:
+            code (str): Kod GTIN/EAN leku do wyszukania
+
+        Returns:
+            Optional[Dict[Any, Any]]: Odpowiedź API lub None, gdy API zwróciło
+                status 404
+
+        Raises:
+            requests.RequestException: W przypadku błędu komunikacji lub
+                odpowiedzi z kodem błędu innym niż 404
+            GovernorTimeout: Gdy ogranicznik nie przydzielił slotu w czasie
+                RPL_GOVERNOR['QUEUE_TIMEOUT']
+        """
+        return rpl_hedger.run(lambda: PolishMedicinesAPI._request_drug(code))
+
+    @staticmethod
+    def _request_drug(code: str) -> Optional[Dict[Any, Any]]:
+        # Wyszukiwanie po kodzie GTIN/EAN metodą GET; każda próba zajmuje
+        # osobny slot i żeton ogranicznika
+        config = get_http_settings()
+        for attempt in range(config['RETRIES'] + 1):
+            with rpl_governor.slot():
+                response = get_session().get(f"{PolishMedicinesAPI.BASE_URL}", params={
+                    'eanGtin': code
+                }, timeout=get_timeout())
+            if response.status_code not in config['RETRY_STATUSES'] or attempt == config['RETRIES']:
+                break
+            time.sleep(config['BACKOFF_FACTOR'] * (2 ** attempt))
+
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    async def asearch_drug(code: str) -> Optional[Dict[Any, Any]]:
+        """
+        Asynchroniczna wersja search_drug dla widoków uruchamianych pod ASGI.
+
+        Korzysta z tego samego cache co search_drug i łączy współbieżne
+        zapytania o ten sam kod, nie blokując pętli zdarzeń podczas
+        oczekiwania na API rejestru.
+
+        Args:
+            code (str): Kod GTIN/EAN leku do wyszukania
+
+        Returns:
+            Optional[Dict[Any, Any]]: Słownik zawierający dane o leku w przypadku
+                znalezienia, None w przypadku błędu lub braku wyników
+        """
+        try:
+            return (await PolishMedicinesAPI.alookup(code))[0]
+        except RegistryUnavailableError as e:
+            logger.warning(f"Drug lookup failed: {e}")
             return None
+
+    @staticmethod
+    async def alookup(code: str) -> Tuple[Optional[Dict[Any, Any]], str]:
+        """
+        Asynchroniczna wersja lookup.
+
+        Args:
+            code (str): Kod GTIN/EAN leku do wyszukania
+
+        Returns:
+            Tuple[Optional[Dict[Any, Any]], str]: Dane o leku oraz źródło wyniku
+
+        Raises:
+            RegistryUnavailableError: Gdy API jest niedostępne, a cache nie
+                zawiera danych dla kodu
+        """
+        code = code.strip()
+        hit, data = await drug_cache.aget(code)
+        if hit:
+            return data, 'cache'
+
+        try:
+            return await drug_flight.ado(
+                code,
+                lambda: PolishMedicinesAPI._afetch_and_cache(code),
+                lambda: drug_cache.aget(code)
+            ), 'upstream'
         except Exception as e:
-            print(f"Błąd podczas wyszukiwania leku: {e}")
-            return None
\ No newline at end of file
+            hit, data = await drug_cache.aget_stale(code)
+            if hit:
+                schedule_refresh(code)
+                return data, 'stale'
+            raise RegistryUnavailableError(str(e)) from e
+
+    @staticmethod
+    async def _afetch_and_cache(code: str) -> Optional[Dict[Any, Any]]:
+        rpl_breaker.check()
+        try:
+            data = await PolishMedicinesAPI.afetch_drug(code)
+        except GovernorTimeout:
+            rpl_breaker.release()
+            raise
+        except Exception:
+            rpl_breaker.record_failure()
+            raise
+        rpl_breaker.record_success()
+
+        if not data or not data.get('content'):
+            data = None
+        await drug_cache.aset(code, data)
+        return data
+
+    @staticmethod
+    async def afetch_drug(code: str) -> Optional[Dict[Any, Any]]:
+        """
+        Asynchroniczna wersja fetch_drug.
+
+        Odpowiedzi ze statusem z RPL_HTTP['RETRY_STATUSES'] są ponawiane
+        z wykładniczym opóźnieniem, analogicznie do sesji synchronicznej.
+        Gdy odpowiedź się opóźnia, wysyłane jest zapytanie zabezpieczające,
+        a przegrane zapytanie jest anulowane.
+
+        Args:
+            code (str): Kod GTIN/EAN leku do wyszukania
+
+        Returns:
+            Optional[Dict[Any, Any]]: Odpowiedź API lub None, gdy API zwróciło
+                status 404
+
+        Raises:
+            httpx.HTTPError: W przypadku błędu komunikacji lub odpowiedzi
+                z kodem błędu innym niż 404
+            GovernorTimeout: Gdy ogranicznik nie przydzielił slotu w czasie
+        """
+        return await rpl_hedger.arun(lambda: PolishMedicinesAPI._arequest_drug(code))
+
+    @staticmethod
+    async def _arequest_drug(code: str) -> Optional[Dict[Any, Any]]:
+        config = get_http_settings()
+        client = get_async_client()
+        for attempt in range(config['RETRIES'] + 1):
+            async with rpl_governor.aslot():
+                response = await client.get(PolishMedicinesAPI.BASE_URL, params={
+                    'eanGtin': code
+                })
+            if response.status_code not in config['RETRY_STATUSES'] or attempt == config['RETRIES']:
+                break
+            await asyncio.sleep(config['BACKOFF_FACTOR'] * (2 ** attempt))
+
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
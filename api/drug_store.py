@@ -0,0 +1,241 @@
+"""
+Moduł trwałego przechowywania wyników wyszukiwania leków w API rejestru.
+
+Każdy lek znaleziony w API Rejestru Produktów Leczniczych jest zapisywany
+(lub aktualizowany) w tabelach Drug i DrugCode. Kolejne skany tego samego
+kodu są obsługiwane z bazy, dopóki dane są świeże (ustawienie
+DRUG_STORE['FRESHNESS']); nieaktualne wpisy są odświeżane przez zadanie
+refresh_stale_drugs (komenda manage.py refresh_drugs).
+"""
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .drug_api import PolishMedicinesAPI, drug_cache
+from .models import Drug, DrugCode
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DRUG_STORE_SETTINGS = {
+    'FRESHNESS': 60 * 60 * 24 * 7,
+    'REFRESH_BATCH': 500,
+}
+
+
+def get_drug_store_settings() -> dict:
+    """
+    Zwraca ustawienia przechowywania leków uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z DRUG_STORE nałożone na DEFAULT_DRUG_STORE_SETTINGS
+    """
+    return {**DEFAULT_DRUG_STORE_SETTINGS, **getattr(settings, 'DRUG_STORE', {})}
+
+
+def is_fresh(drug: Drug) -> bool:
+    """
+    Sprawdza, czy dane leku pobrane z API rejestru są nadal świeże.
+
+    Args:
+        drug (Drug): Zapisany lek
+
+    Returns:
+        bool: True, jeśli dane zostały pobrane w oknie DRUG_STORE['FRESHNESS']
+    """
+    if drug.fetched_at is None:
+        return False
+    freshness = timedelta(seconds=get_drug_store_settings()['FRESHNESS'])
+    return drug.fetched_at >= timezone.now() - freshness
+
+
+def stored_codes(gtins: Iterable[str]):
+    """
+    Buduje zapytanie o kody GTIN leków zapisanych z API rejestru.
+
+    Args:
+        gtins (Iterable[str]): Kanoniczne kody GTIN
+
+    Returns:
+        QuerySet: Kody wraz z powiązanymi lekami
+    """
+    return DrugCode.objects.select_related('drug').filter(
+        code_type='GTIN',
+        value__in=list(gtins),
+        drug__rpl_data__isnull=False
+    )
+
+
+def find_stored_drug(gtin: str) -> Optional[Drug]:
+    """
+    Wyszukuje lek zapisany z API rejestru po kodzie GTIN.
+
+    Args:
+        gtin (str): Kanoniczny kod GTIN
+
+    Returns:
+        Optional[Drug]: Zapisany lek lub None
+    """
+    code = stored_codes([gtin]).first()
+    return code.drug if code else None
+
+
+async def afind_stored_drug(gtin: str) -> Optional[Drug]:
+    """
+    Asynchroniczna wersja find_stored_drug.
+
+    Args:
+        gtin (str): Kanoniczny kod GTIN
+
+    Returns:
+        Optional[Drug]: Zapisany lek lub None
+    """
+    code = await stored_codes([gtin]).afirst()
+    return code.drug if code else None
+
+
+def find_stored_drugs(gtins: Iterable[str]) -> Dict[str, Drug]:
+    """
+    Wyszukuje jednym zapytaniem leki zapisane z API rejestru.
+
+    Args:
+        gtins (Iterable[str]): Kanoniczne kody GTIN
+
+    Returns:
+        Dict[str, Drug]: Zapisane leki według kodu GTIN
+    """
+    return {code.value: code.drug for code in stored_codes(gtins)}
+
+
+def drug_fields(product: Dict[str, Any], fetched_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Mapuje produkt zwrócony przez API rejestru na pola modelu Drug.
+
+    Args:
+        product (Dict[str, Any]): Pojedynczy element listy 'content' z odpowiedzi API
+        fetched_at (Optional[datetime]): Czas pobrania danych z API,
+            domyślnie bieżący czas
+
+    Returns:
+        Dict[str, Any]: Wartości pól modelu Drug
+    """
+    substance = product.get('activeSubstanceName')
+    return {
+        'name': (product.get('medicinalProductName') or '')[:200],
+        'manufacturer': (product.get('subjectMedicinalProductName') or '')[:200],
+        'active_ingredients': {substance: product.get('medicinalProductPower')} if substance else {},
+        'dosage_form': (product.get('pharmaceuticalFormName') or '')[:100],
+        'rpl_data': product,
+        'fetched_at': fetched_at or timezone.now(),
+    }
+
+
+def store_drug(gtin: str, product: Dict[str, Any], fetched_at: Optional[datetime] = None) -> None:
+    """
+    Zapisuje lub aktualizuje lek znaleziony w API rejestru.
+
+    Wpis jest identyfikowany unikalną parą (typ kodu, wartość) modelu
+    DrugCode. Przy współbieżnym zapisie tego samego kodu druga transakcja
+    aktualizuje rekord utworzony przez pierwszą.
+
+    Args:
+        gtin (str): Kanoniczny kod GTIN
+        product (Dict[str, Any]): Pojedynczy element listy 'content' z odpowiedzi API
+        fetched_at (Optional[datetime]): Czas pobrania danych z API,
+            domyślnie bieżący czas
+    """
+    fields = drug_fields(product, fetched_at)
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                updated = Drug.objects.filter(
+                    codes__code_type='GTIN', codes__value=gtin
+                ).update(updated_at=fields['fetched_at'], **fields)
+                if not updated:
+                    drug = Drug.objects.create(**fields)
+                    DrugCode.objects.create(drug=drug, code_type='GTIN', value=gtin)
+            return
+        except IntegrityError:
+            continue
+
+
+def persist_upstream_result(
+    gtin: str,
+    drug_data: Optional[Dict[str, Any]],
+    source: str = 'upstream',
+    stored: Optional[Drug] = None
+) -> None:
+    """
+    Zapisuje wynik wyszukiwania w API rejestru, jeśli lek został znaleziony.
+
+    Wynik zwrócony z cache wyników jest zapisywany z czasem pobrania wpisu
+    cache, a nie z bieżącym czasem - inaczej dane mogłyby pozostawać w bazie
+    uznawane za świeże dłużej niż okno świeżości. Jeśli zapisany lek jest
+    co najmniej tak aktualny jak wpis cache, zapis jest pomijany. Wyniki
+    nieaktualne ('stale') nie są zapisywane.
+
+    Błędy zapisu są logowane i nie przerywają obsługi skanu.
+
+    Args:
+        gtin (str): Kanoniczny kod GTIN
+        drug_data (Optional[Dict[str, Any]]): Odpowiedź API rejestru
+        source (str): Źródło wyniku zwrócone przez PolishMedicinesAPI.lookup
+        stored (Optional[Drug]): Lek zapisany wcześniej z API, jeśli istnieje
+    """
+    if source == 'stale' or not drug_data or not drug_data.get('content'):
+        return
+    fetched_at = None
+    if source == 'cache':
+        stored_at = drug_cache.stored_at(gtin)
+        if stored_at is None:
+            return
+        fetched_at = datetime.fromtimestamp(stored_at, tz=dt_timezone.utc)
+        if stored and stored.fetched_at and stored.fetched_at >= fetched_at:
+            return
+    try:
+        store_drug(gtin, drug_data['content'][0], fetched_at)
+    except Exception as e:
+        logger.error(f"Saving drug {gtin} failed: {e}")
+
+
+def refresh_stale_drugs(limit: Optional[int] = None) -> Dict[str, int]:
+    """
+    Odświeża dane leków pobrane z API rejestru przed upływem okna świeżości.
+
+    Leki, których kod nie występuje już w rejestrze, są usuwane. Odświeżanie
+    jest przerywane przy pierwszym błędzie komunikacji z API (np. otwartym
+    wyłączniku awaryjnym) i zostanie wznowione przy kolejnym uruchomieniu.
+
+    Args:
+        limit (Optional[int]): Maksymalna liczba odświeżanych leków,
+            domyślnie DRUG_STORE['REFRESH_BATCH']
+
+    Returns:
+        Dict[str, int]: Liczba odświeżonych ('refreshed') i usuniętych
+            ('removed') leków
+    """
+    config = get_drug_store_settings()
+    cutoff = timezone.now() - timedelta(seconds=config['FRESHNESS'])
+    stale = (
+        DrugCode.objects.select_related('drug')
+        .filter(code_type='GTIN', drug__rpl_data__isnull=False, drug__fetched_at__lt=cutoff)
+        .order_by('drug__fetched_at')[:limit or config['REFRESH_BATCH']]
+    )
+
+    stats = {'refreshed': 0, 'removed': 0}
+    for code in stale:
+        try:
+            data = PolishMedicinesAPI.refresh(code.value)
+        except Exception as e:
+            logger.warning(f"Drug refresh stopped: {e}")
+            break
+        if data:
+            store_drug(code.value, data['content'][0])
+            stats['refreshed'] += 1
+        else:
+            code.drug.delete()
+            stats['removed'] += 1
+    return stats
@@ -0,0 +1,274 @@
+"""
+Moduł wspólnego dla workerów ogranicznika zapytań do API rejestru.
+
+Wszystkie procesy (workery gunicorna, zadania synchronizacji) na danym
+serwerze dzielą:
+- limit zapytań w toku: RPL_GOVERNOR['MAX_IN_FLIGHT'] plików-slotów
+  blokowanych przez flock; blokadę zwalnia system operacyjny także po
+  nagłym zakończeniu procesu,
+- limit tempa zapytań: wiadro żetonów (RATE żetonów na sekundę, najwyżej
+  BURST naraz) przechowywane w pliku stanu modyfikowanym pod blokadą.
+
+Wywołujący czekają na wolny slot i żeton najwyżej do upływu terminu,
+zamiast jednocześnie odpytywać API. Długie transfery (pobieranie eksportu
+CSV) korzystają z osobnej puli slotów (UpstreamGovernor.pool) i wspólnego
+wiadra żetonów, aby nie zajmować slotów krótkich zapytań. Na systemach bez modułu fcntl
+(Windows) ogranicznik jest wyłączony.
+"""
+import asyncio
+import logging
+import os
+import struct
+import tempfile
+import time
+from copy import copy
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GOVERNOR_SETTINGS = {
+    'ENABLED': True,
+    'STATE_DIR': os.path.join(tempfile.gettempdir(), 'eskulia-rpl-governor'),
+    'MAX_IN_FLIGHT': 8,
+    'RATE': 20,
+    'BURST': 20,
+    'QUEUE_TIMEOUT': 5,
+    'POLL_INTERVAL': 0.02,
+}
+
+# Liczba żetonów i czas ostatniego uzupełnienia wiadra
+BUCKET_STATE = struct.Struct('<dd')
+
+
+def get_governor_settings() -> dict:
+    """
+    Zwraca ustawienia ogranicznika uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z RPL_GOVERNOR nałożone na DEFAULT_GOVERNOR_SETTINGS
+    """
+    return {**DEFAULT_GOVERNOR_SETTINGS, **getattr(settings, 'RPL_GOVERNOR', {})}
+
+
+class GovernorTimeout(Exception):
+    """
+    Wyjątek zgłaszany, gdy w wyznaczonym czasie nie udało się uzyskać
+    slotu lub żetonu na zapytanie.
+    """
+
+
+class UpstreamGovernor:
+    """
+    Ogranicznik liczby i tempa zapytań współdzielony przez procesy serwera.
+
+    Attributes:
+        name (str): Nazwa chronionej usługi (prefiks plików stanu)
+        enabled (bool): Czy ogranicznik jest aktywny
+        state_dir (str): Katalog plików slotów i stanu wiadra żetonów
+        max_in_flight (int): Maksymalna liczba zapytań w toku
+        rate (float): Liczba żetonów dodawanych na sekundę
+        burst (float): Maksymalna liczba zgromadzonych żetonów
+        queue_timeout (float): Domyślny czas oczekiwania na slot i żeton
+        poll_interval (float): Odstęp między próbami uzyskania slotu
+        slot_pool (str): Nazwa puli slotów (pusta dla puli podstawowej)
+    """
+    def __init__(self, name: str, enabled: bool, state_dir: str, max_in_flight: int,
+                 rate: float, burst: float, queue_timeout: float, poll_interval: float):
+        """
+        Inicjalizuje ogranicznik.
+
+        Args:
+            name (str): Nazwa chronionej usługi
+            enabled (bool): Czy ogranicznik jest aktywny
+            state_dir (str): Katalog plików stanu
+            max_in_flight (int): Maksymalna liczba zapytań w toku
+            rate (float): Liczba żetonów dodawanych na sekundę
+            burst (float): Maksymalna liczba zgromadzonych żetonów
+            queue_timeout (float): Domyślny czas oczekiwania w sekundach
+            poll_interval (float): Odstęp między próbami w sekundach
+        """
+        self.name = name
+        self.enabled = enabled and fcntl is not None
+        self.state_dir = state_dir
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+        self.slot_pool = ''
+        if enabled and fcntl is None:
+            logger.warning("fcntl is not available, upstream governor is disabled")
+
+    @classmethod
+    def from_settings(cls, name: str) -> 'UpstreamGovernor':
+        """
+        Tworzy ogranicznik na podstawie ustawienia RPL_GOVERNOR.
+
+        Args:
+            name (str): Nazwa chronionej usługi
+
+        Returns:
+            UpstreamGovernor: Skonfigurowany ogranicznik
+        """
+        config = get_governor_settings()
+        return cls(
+            name=name,
+            enabled=config['ENABLED'],
+            state_dir=config['STATE_DIR'],
+            max_in_flight=config['MAX_IN_FLIGHT'],
+            rate=config['RATE'],
+            burst=config['BURST'],
+            queue_timeout=config['QUEUE_TIMEOUT'],
+            poll_interval=config['POLL_INTERVAL'],
+        )
+
+    def pool(self, name: str, max_in_flight: int) -> 'UpstreamGovernor':
+        """
+        Tworzy ogranicznik z osobną pulą slotów i wspólnym wiadrem żetonów.
+
+        Args:
+            name (str): Nazwa puli slotów
+            max_in_flight (int): Liczba slotów puli
+
+        Returns:
+            UpstreamGovernor: Ogranicznik puli
+
+        Example:
+            >>> rpl_download_governor = rpl_governor.pool('download', 1)
+        """
+        governor = copy(self)
+        governor.slot_pool = name
+        governor.max_in_flight = max_in_flight
+        return governor
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None):
+        """
+        Menedżer kontekstu rezerwujący slot i żeton na czas zapytania.
+
+        Args:
+            timeout (Optional[float]): Maksymalny czas oczekiwania w sekundach,
+                domyślnie RPL_GOVERNOR['QUEUE_TIMEOUT']
+
+        Raises:
+            GovernorTimeout: Gdy slot lub żeton nie zostały uzyskane w czasie
+
+        Example:
+            >>> with rpl_governor.slot():
+            ...     response = session.get(url)
+        """
+        if not self.enabled:
+            yield
+            return
+
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        fd = None
+        while fd is None:
+            fd = self._acquire_slot()
+            if fd is None:
+                self._sleep_until(deadline, self.poll_interval)
+                time.sleep(self.poll_interval)
+        try:
+            # Żeton jest pobierany dopiero po uzyskaniu slotu, więc
+            # przekroczenie czasu oczekiwania na slot go nie zużywa
+            while True:
+                wait = self._take_token()
+                if wait == 0:
+                    break
+                self._sleep_until(deadline, wait)
+                time.sleep(wait)
+            yield
+        finally:
+            os.close(fd)
+
+    @asynccontextmanager
+    async def aslot(self, timeout: Optional[float] = None):
+        """
+        Asynchroniczna wersja slot; oczekiwanie nie blokuje pętli zdarzeń.
+
+        Args:
+            timeout (Optional[float]): Maksymalny czas oczekiwania w sekundach
+
+        Raises:
+            GovernorTimeout: Gdy slot lub żeton nie zostały uzyskane w czasie
+        """
+        if not self.enabled:
+            yield
+            return
+
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        fd = None
+        while fd is None:
+            fd = self._acquire_slot()
+            if fd is None:
+                self._sleep_until(deadline, self.poll_interval)
+                await asyncio.sleep(self.poll_interval)
+        try:
+            # Żeton jest pobierany dopiero po uzyskaniu slotu, więc
+            # przekroczenie czasu oczekiwania na slot go nie zużywa
+            while True:
+                wait = self._take_token()
+                if wait == 0:
+                    break
+                self._sleep_until(deadline, wait)
+                await asyncio.sleep(wait)
+            yield
+        finally:
+            os.close(fd)
+
+    def _sleep_until(self, deadline: float, wait: float) -> None:
+        # Zgłasza wyjątek, jeśli oczekiwanie przekroczyłoby termin
+        if time.monotonic() + wait > deadline:
+            raise GovernorTimeout(f"Upstream governor '{self.name}' queue timeout")
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.state_dir, f'{self.name}-{filename}')
+
+    def _open(self, filename: str) -> int:
+        try:
+            return os.open(self._path(filename), os.O_RDWR | os.O_CREAT, 0o666)
+        except FileNotFoundError:
+            os.makedirs(self.state_dir, exist_ok=True)
+            return os.open(self._path(filename), os.O_RDWR | os.O_CREAT, 0o666)
+
+    def _acquire_slot(self) -> Optional[int]:
+        # Slot jest zajęty, dopóki deskryptor z blokadą pozostaje otwarty
+        prefix = f'{self.slot_pool}-slot' if self.slot_pool else 'slot'
+        for index in range(self.max_in_flight):
+            fd = self._open(f'{prefix}-{index}.lock')
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def _take_token(self) -> float:
+        # Zwraca 0 po pobraniu żetonu lub czas do pojawienia się żetonu
+        fd = self._open('bucket')
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.pread(fd, BUCKET_STATE.size, 0)
+            now = time.time()
+            if len(raw) == BUCKET_STATE.size:
+                tokens, updated = BUCKET_STATE.unpack(raw)
+                tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+            else:
+                tokens = self.burst
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            os.pwrite(fd, BUCKET_STATE.pack(tokens, now), 0)
+            return wait
+        finally:
+            os.close(fd)
@@ -0,0 +1,351 @@
+"""
+Moduł zapytań zabezpieczających (hedged requests) do API rejestru.
+
+Jeśli zapytanie nie otrzymało odpowiedzi w czasie odpowiadającym wybranemu
+percentylowi ostatnio zmierzonych opóźnień API, wysyłane jest drugie,
+identyczne zapytanie, a wynik stanowi pierwsza otrzymana odpowiedź.
+Skraca to ogon rozkładu opóźnień skanowania kosztem niewielkiej liczby
+dodatkowych zapytań.
+
+Liczba zapytań zabezpieczających jest ograniczona budżetem: każde zapytanie
+dodaje do budżetu ułamek RPL_HEDGING['MAX_HEDGE_RATIO'], a każde
+zapytanie zabezpieczające zużywa jedną jednostkę, więc dodatkowe obciążenie
+API nie przekracza tego ułamka.
+"""
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEDGING_SETTINGS = {
+    'ENABLED': True,
+    'PERCENTILE': 95,
+    'MAX_HEDGE_RATIO': 0.05,
+    'MAX_BURST': 5,
+    'MIN_SAMPLES': 20,
+    'WINDOW': 500,
+    'MIN_DELAY': 0.05,
+    'MAX_WORKERS': 16,
+}
+
+
+def get_hedging_settings() -> dict:
+    """
+    Zwraca ustawienia zapytań zabezpieczających uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z RPL_HEDGING nałożone na DEFAULT_HEDGING_SETTINGS
+    """
+    return {**DEFAULT_HEDGING_SETTINGS, **getattr(settings, 'RPL_HEDGING', {})}
+
+
+class LatencyHistogram:
+    """
+    Histogram ostatnich opóźnień odpowiedzi w oknie przesuwnym.
+
+    Bezpieczny wątkowo. Przechowuje ostatnie window pomiarów zarówno
+    w kolejności napływu, jak i posortowane, dzięki czemu odczyt percentyla
+    nie wymaga sortowania.
+
+    Attributes:
+        window (int): Maksymalna liczba przechowywanych pomiarów
+    """
+    def __init__(self, window: int):
+        """
+        Inicjalizuje pusty histogram.
+
+        Args:
+            window (int): Maksymalna liczba przechowywanych pomiarów
+        """
+        self.window = window
+        self._samples = deque()
+        self._sorted = []
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """
+        Dodaje pomiar, usuwając najstarszy po zapełnieniu okna.
+
+        Args:
+            seconds (float): Opóźnienie odpowiedzi w sekundach
+        """
+        with self._lock:
+            if len(self._samples) >= self.window:
+                oldest = self._samples.popleft()
+                del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+            self._samples.append(seconds)
+            bisect.insort(self._sorted, seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Zwraca percentyl zmierzonych opóźnień.
+
+        Args:
+            percent (float): Percentyl z zakresu 0-100
+
+        Returns:
+            Optional[float]: Opóźnienie w sekundach lub None, gdy brak pomiarów
+        """
+        with self._lock:
+            if not self._sorted:
+                return None
+            index = min(len(self._sorted) - 1, int(len(self._sorted) * percent / 100))
+            return self._sorted[index]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class HedgeBudget:
+    """
+    Budżet zapytań zabezpieczających w postaci wiadra żetonów.
+
+    Każde zapytanie dodaje ratio żetonu (do limitu burst), a każde
+    zapytanie zabezpieczające zużywa jeden żeton.
+
+    Attributes:
+        ratio (float): Maksymalny udział zapytań zabezpieczających
+        burst (float): Maksymalna liczba zgromadzonych żetonów
+    """
+    def __init__(self, ratio: float, burst: float):
+        """
+        Inicjalizuje pusty budżet.
+
+        Args:
+            ratio (float): Maksymalny udział zapytań zabezpieczających
+            burst (float): Maksymalna liczba zgromadzonych żetonów
+        """
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        """
+        Zasila budżet po wysłaniu zapytania.
+        """
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        Pobiera żeton na zapytanie zabezpieczające.
+
+        Returns:
+            bool: True, jeśli budżet pozwala na zapytanie zabezpieczające
+        """
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class Hedger:
+    """
+    Wykonawca zapytań z zapytaniem zabezpieczającym po przekroczeniu
+    percentyla opóźnień.
+
+    Attributes:
+        name (str): Nazwa chronionej usługi (do logów)
+        enabled (bool): Czy zapytania zabezpieczające są włączone
+        percentile (float): Percentyl opóźnień wyznaczający czas oczekiwania
+        min_samples (int): Minimalna liczba pomiarów przed pierwszym
+            zapytaniem zabezpieczającym
+        min_delay (float): Minimalny czas oczekiwania w sekundach
+        max_workers (int): Rozmiar puli wątków dla zapytań synchronicznych
+        histogram (LatencyHistogram): Ostatnie opóźnienia odpowiedzi
+        budget (HedgeBudget): Budżet zapytań zabezpieczających
+        stats (dict): Liczniki zapytań ('requests'), zapytań zabezpieczających
+            ('hedges') i wygranych zapytań zabezpieczających ('hedge_wins')
+    """
+    def __init__(self, name: str, enabled: bool, percentile: float, max_hedge_ratio: float,
+                 max_burst: float, min_samples: int, window: int, min_delay: float,
+                 max_workers: int):
+        """
+        Inicjalizuje wykonawcę.
+
+        Args:
+            name (str): Nazwa chronionej usługi
+            enabled (bool): Czy zapytania zabezpieczające są włączone
+            percentile (float): Percentyl opóźnień wyznaczający czas oczekiwania
+            max_hedge_ratio (float): Maksymalny udział zapytań zabezpieczających
+            max_burst (float): Maksymalna liczba zgromadzonych żetonów budżetu
+            min_samples (int): Minimalna liczba pomiarów przed hedgingiem
+            window (int): Rozmiar okna histogramu opóźnień
+            min_delay (float): Minimalny czas oczekiwania w sekundach
+            max_workers (int): Rozmiar puli wątków dla zapytań synchronicznych
+        """
+        self.name = name
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self.histogram = LatencyHistogram(window)
+        self.budget = HedgeBudget(max_hedge_ratio, max_burst)
+        self.stats = {'requests': 0, 'hedges': 0, 'hedge_wins': 0}
+        self._stats_lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, name: str) -> 'Hedger':
+        """
+        Tworzy wykonawcę na podstawie ustawienia RPL_HEDGING.
+
+        Args:
+            name (str): Nazwa chronionej usługi
+
+        Returns:
+            Hedger: Skonfigurowany wykonawca
+        """
+        config = get_hedging_settings()
+        return cls(
+            name=name,
+            enabled=config['ENABLED'],
+            percentile=config['PERCENTILE'],
+            max_hedge_ratio=config['MAX_HEDGE_RATIO'],
+            max_burst=config['MAX_BURST'],
+            min_samples=config['MIN_SAMPLES'],
+            window=config['WINDOW'],
+            min_delay=config['MIN_DELAY'],
+            max_workers=config['MAX_WORKERS'],
+        )
+
+    def delay(self) -> Optional[float]:
+        """
+        Zwraca czas oczekiwania przed wysłaniem zapytania zabezpieczającego.
+
+        Returns:
+            Optional[float]: Czas w sekundach lub None, gdy hedging jest
+                wyłączony albo brak wystarczającej liczby pomiarów
+        """
+        if not self.enabled or len(self.histogram) < self.min_samples:
+            return None
+        return max(self.min_delay, self.histogram.percentile(self.percentile))
+
+    def run(self, fn: Callable[[], Any]) -> Any:
+        """
+        Wykonuje fn, wysyłając zapytanie zabezpieczające, gdy odpowiedź
+        się opóźnia.
+
+        Args:
+            fn (Callable[[], Any]): Idempotentna funkcja wykonująca zapytanie
+
+        Returns:
+            Any: Wynik pierwszego zakończonego powodzeniem wywołania
+
+        Raises:
+            Exception: Wyjątek zgłoszony przez fn, gdy żadne wywołanie
+                nie zakończyło się powodzeniem
+        """
+        self._start()
+        delay = self.delay()
+        if delay is None:
+            return self._timed(fn)
+
+        executor = self._get_executor()
+        primary = executor.submit(self._timed, fn)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self.budget.withdraw():
+            return primary.result()
+
+        self._count('hedges')
+        hedge = executor.submit(self._timed, fn)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count('hedge_wins')
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    async def arun(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Asynchroniczna wersja run; przegrane zapytanie jest anulowane.
+
+        Args:
+            fn (Callable[[], Awaitable[Any]]): Idempotentna korutyna
+                wykonująca zapytanie
+
+        Returns:
+            Any: Wynik pierwszego zakończonego powodzeniem wywołania
+        """
+        self._start()
+        delay = self.delay()
+        if delay is None:
+            return await self._atimed(fn)
+
+        primary = asyncio.ensure_future(self._atimed(fn))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self.budget.withdraw():
+            return await primary
+
+        self._count('hedges')
+        hedge = asyncio.ensure_future(self._atimed(fn))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count('hedge_wins')
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _count(self, name: str) -> None:
+        # Liczniki są zwiększane z wątków żądań, wywołań zwrotnych puli
+        # i zadań pętli zdarzeń
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _start(self) -> None:
+        self._count('requests')
+        self.budget.deposit()
+
+    def _timed(self, fn: Callable[[], Any]) -> Any:
+        started = time.monotonic()
+        result = fn()
+        self.histogram.record(time.monotonic() - started)
+        return result
+
+    async def _atimed(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.monotonic()
+        result = await fn()
+        self.histogram.record(time.monotonic() - started)
+        return result
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Pula jest odtwarzana po rozwidleniu procesu, bo wątki nie są
+        # dziedziczone przez proces potomny
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._executor_lock:
+                if self._executor is None or self._executor_pid != pid:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=f'hedge-{self.name}'
+                    )
+                    self._executor_pid = pid
+        return self._executor
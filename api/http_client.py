@@ -0,0 +1,158 @@
+"""
+Moduł współdzielonego klienta HTTP dla API Rejestru Produktów Leczniczych.
+
+Udostępnia jedną na proces sesję requests z pulą połączeń keep-alive,
+ograniczoną polityką ponowień z wykładniczym opóźnieniem dla idempotentnych
+zapytań oraz osobnymi limitami czasu na nawiązanie połączenia i odczyt.
+Z sesji korzystają zarówno wyszukiwanie leków (PolishMedicinesAPI), jak
+i pobieranie eksportu CSV przez synchronizację sync_rpl.
+
+Dla widoków asynchronicznych (ASGI) moduł udostępnia analogicznie
+skonfigurowanego klienta httpx.AsyncClient, tworzonego osobno dla każdej
+pętli zdarzeń.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from typing import Optional, Tuple
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HTTP_SETTINGS = {
+    'POOL_SIZE': 10,
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'DOWNLOAD_READ_TIMEOUT': 300,
+    'DOWNLOAD_QUEUE_TIMEOUT': 600,
+    'RETRIES': 2,
+    'BACKOFF_FACTOR': 0.3,
+    'RETRY_STATUSES': (502, 503, 504),
+}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# Klienci asynchroniczni przypisani do pętli zdarzeń, w której powstali
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_http_settings() -> dict:
+    """
+    Zwraca ustawienia klienta HTTP uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z RPL_HTTP nałożone na DEFAULT_HTTP_SETTINGS
+    """
+    return {**DEFAULT_HTTP_SETTINGS, **getattr(settings, 'RPL_HTTP', {})}
+
+
+def build_session() -> requests.Session:
+    """
+    Tworzy nową sesję HTTP z pulą połączeń i polityką ponowień.
+
+    Sesja ponawia wyłącznie idempotentne zapytania GET i HEAD po błędach
+    połączenia i przekroczeniu czasu odczytu. Odpowiedzi ze statusem
+    z RPL_HTTP['RETRY_STATUSES'] ponawia wywołujący, zajmując na każdą próbę
+    osobny slot i żeton ogranicznika (api.governor), tak jak klient
+    asynchroniczny.
+
+    Returns:
+        requests.Session: Skonfigurowana sesja
+    """
+    config = get_http_settings()
+    retry = Retry(
+        total=config['RETRIES'],
+        backoff_factor=config['BACKOFF_FACTOR'],
+        allowed_methods=frozenset(['GET', 'HEAD']),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config['POOL_SIZE'],
+        pool_maxsize=config['POOL_SIZE'],
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Zwraca współdzieloną sesję HTTP bieżącego procesu.
+
+    Sesja jest tworzona przy pierwszym użyciu i odtwarzana po rozwidleniu
+    procesu (np. przez gunicorna), aby workery nie współdzieliły gniazd.
+
+    Returns:
+        requests.Session: Współdzielona sesja
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = build_session()
+                _session_pid = pid
+    return _session
+
+
+def get_timeout(read_timeout: Optional[float] = None) -> Tuple[float, float]:
+    """
+    Zwraca parę limitów czasu (połączenie, odczyt) dla zapytania.
+
+    Args:
+        read_timeout (Optional[float]): Limit czasu odczytu, domyślnie
+            RPL_HTTP['READ_TIMEOUT']
+
+    Returns:
+        Tuple[float, float]: Limity czasu w sekundach
+    """
+    config = get_http_settings()
+    return config['CONNECT_TIMEOUT'], read_timeout or config['READ_TIMEOUT']
+
+
+def build_async_client() -> httpx.AsyncClient:
+    """
+    Tworzy nowego asynchronicznego klienta HTTP z pulą połączeń.
+
+    Transport ponawia nieudane nawiązania połączenia; ponawianie odpowiedzi
+    z kodami błędów realizuje wywołujący (patrz PolishMedicinesAPI.afetch_drug).
+
+    Returns:
+        httpx.AsyncClient: Skonfigurowany klient
+    """
+    config = get_http_settings()
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config['POOL_SIZE'],
+            max_keepalive_connections=config['POOL_SIZE'],
+        ),
+        timeout=httpx.Timeout(
+            config['READ_TIMEOUT'],
+            connect=config['CONNECT_TIMEOUT'],
+        ),
+        transport=httpx.AsyncHTTPTransport(retries=config['RETRIES']),
+    )
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Zwraca asynchronicznego klienta HTTP dla bieżącej pętli zdarzeń.
+
+    Klient httpx jest związany z pętlą, w której nawiązał połączenia,
+    dlatego każda pętla (np. pętla workera ASGI) otrzymuje własnego klienta.
+
+    Returns:
+        httpx.AsyncClient: Klient bieżącej pętli zdarzeń
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _async_clients[loop] = build_async_client()
+    return client
@@ -0,0 +1,24 @@
+"""
+Komenda przebudowująca gotowe odpowiedzi endpointu skanowania.
+
+Dokumenty są przebudowywane automatycznie po każdej synchronizacji
+rejestru; komenda służy do ich zbudowania bez ponownej synchronizacji,
+np. po wdrożeniu.
+
+Użycie:
+    python manage.py materialize_scan_documents
+"""
+from django.core.management.base import BaseCommand
+
+from api.documents import materialize_scan_documents
+
+
+class Command(BaseCommand):
+    """
+    Przebudowuje gotowe odpowiedzi skanowania dla wszystkich opakowań z rejestru.
+    """
+    help = 'Przebudowuje gotowe odpowiedzi endpointu skanowania dla opakowań z rejestru'
+
+    def handle(self, *args, **options):
+        count = materialize_scan_documents()
+        self.stdout.write(self.style.SUCCESS(f"Zapisano dokumentów: {count}"))
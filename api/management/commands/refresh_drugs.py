@@ -0,0 +1,30 @@
+"""
+Komenda odświeżająca leki zapisane z API Rejestru Produktów Leczniczych.
+
+Użycie:
+    python manage.py refresh_drugs [--limit N]
+"""
+from django.core.management.base import BaseCommand
+
+from api.drug_store import refresh_stale_drugs
+
+
+class Command(BaseCommand):
+    """
+    Odświeża leki, których dane pobrane z API rejestru nie są już świeże.
+    """
+    help = 'Odświeża nieaktualne leki zapisane z API Rejestru Produktów Leczniczych'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help="Maksymalna liczba odświeżanych leków (domyślnie DRUG_STORE['REFRESH_BATCH'])"
+        )
+
+    def handle(self, *args, **options):
+        stats = refresh_stale_drugs(options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Odświeżono: {stats['refreshed']}, usunięto: {stats['removed']}"
+        ))
@@ -0,0 +1,35 @@
+"""
+Komenda zapełniająca cache najczęściej skanowanymi kodami.
+
+Użycie:
+    python manage.py warm_scan_cache [--limit N] [--days D]
+"""
+from django.core.management.base import BaseCommand
+
+from api.scan_events import warm_scan_cache
+
+
+class Command(BaseCommand):
+    """
+    Rozwiązuje z wyprzedzeniem najczęściej skanowane kody z dziennika skanowań.
+    """
+    help = 'Zapełnia cache wyszukiwania leków najczęściej skanowanymi kodami'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help="Liczba kodów (domyślnie SCAN_EVENTS['WARM_TOP_CODES'])"
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help="Okres dziennika skanowań w dniach (domyślnie SCAN_EVENTS['WARM_WINDOW_DAYS'])"
+        )
+
+    def handle(self, *args, **options):
+        tiers = warm_scan_cache(options['limit'], options['days'])
+        summary = ', '.join(f'{tier}: {count}' for tier, count in sorted(tiers.items())) or 'brak kodów'
+        self.stdout.write(self.style.SUCCESS(f"Rozwiązano kody - {summary}"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_drug_drugcode_delete_druginfo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drug',
+            name='fetched_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='drug',
+            name='rpl_data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_drug_rpl_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanDocument',
+            fields=[
+                ('gtin', models.CharField(max_length=14, primary_key=True, serialize=False)),
+                ('document', models.BinaryField()),
+            ],
+        ),
+    ]
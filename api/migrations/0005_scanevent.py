@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_scandocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=100)),
+                ('tier', models.CharField(max_length=20)),
+                ('found', models.BooleanField()),
+                ('latency_ms', models.FloatField()),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at', 'code'], name='scan_event_created_code')],
+            },
+        ),
+    ]
@@ -20,6 +20,10 @@ class Drug(models.Model):
         active_ingredients (JSONField): Składniki aktywne i ich ilości w formacie
             {"substancja": "ilość"}
         dosage_form (CharField): Postać leku (np. tabletki, syrop) (max 100 znaków)
+        rpl_data (JSONField): Opis produktu zwrócony przez API Rejestru Produktów
+            Leczniczych lub None dla leków spoza rejestru
+        fetched_at (DateTimeField): Data i czas ostatniego pobrania danych z API
+            rejestru
         created_at (DateTimeField): Data i czas utworzenia rekordu
         updated_at (DateTimeField): Data i czas ostatniej aktualizacji rekordu
     """
@@ -27,6 +31,8 @@ class Drug(models.Model):
     manufacturer = models.CharField(max_length=200)
     active_ingredients = models.JSONField()  # Format: {"substance": "amount"}
     dosage_form = models.CharField(max_length=100)
+    rpl_data = models.JSONField(null=True, blank=True)
+    fetched_at = models.DateTimeField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -91,4 +97,73 @@ class DrugCode(models.Model):
         Returns:
             str: Typ kodu i jego wartość oddzielone dwukropkiem
         """
-        return f"{self.code_type}: {self.value}"
\ No newline at end of file
+        return f"{self.code_type}: {self.value}"
+
+class ScanDocument(models.Model):
+    """
+    Model przechowujący gotową odpowiedź endpointu skanowania dla kodu GTIN.
+
+    Dokumenty są budowane po każdej synchronizacji lokalnego rejestru
+    (sygnał sync_rpl.signals.registry_synced) dla wszystkich opakowań
+    z rejestru i wysyłane klientowi bez dalszego przetwarzania.
+
+    Atrybuty:
+        gtin (CharField): Kanoniczny, 14-cyfrowy kod GTIN (klucz główny)
+        document (BinaryField): Treść odpowiedzi JSON zakodowana w UTF-8
+    """
+    gtin = models.CharField(max_length=14, primary_key=True)
+    document = models.BinaryField()
+
+    def __str__(self):
+        """
+        Zwraca tekstową reprezentację dokumentu.
+
+        Returns:
+            str: Kod GTIN dokumentu
+        """
+        return self.gtin
+
+
+class ScanEvent(models.Model):
+    """
+    Model reprezentujący pojedyncze skanowanie kodu.
+
+    Tabela jest zapisywana wyłącznie przez dopisywanie, hurtowo i poza
+    obsługą żądania (patrz api.scan_events). Służy m.in. do wyznaczania
+    najczęściej skanowanych kodów przy wstępnym zapełnianiu cache.
+
+    Atrybuty:
+        code (CharField): Kanoniczny kod GTIN lub zeskanowany kod dla kodów
+            odrzuconych (max 100 znaków)
+        tier (CharField): Źródło wyniku, np. 'local', 'stored', 'cache',
+            'upstream', 'stale', 'unavailable' lub 'invalid'
+        found (BooleanField): Czy lek został znaleziony
+        latency_ms (FloatField): Czas obsługi żądania w milisekundach
+        created_at (DateTimeField): Data i czas skanowania
+    """
+    code = models.CharField(max_length=100)
+    tier = models.CharField(max_length=20)
+    found = models.BooleanField()
+    latency_ms = models.FloatField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        """
+        Metadane modelu ScanEvent.
+
+        Atrybuty:
+            indexes (list): Indeks na kodzie i czasie skanowania dla zliczania
+                najczęściej skanowanych kodów
+        """
+        indexes = [
+            models.Index(fields=['created_at', 'code'], name='scan_event_created_code'),
+        ]
+
+    def __str__(self):
+        """
+        Zwraca tekstową reprezentację zdarzenia.
+
+        Returns:
+            str: Kod i źródło wyniku
+        """
+        return f"{self.code} ({self.tier})"
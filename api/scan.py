@@ -0,0 +1,431 @@
+"""
+Moduł rozwiązywania zeskanowanych kodów leków.
+
+Zawiera logikę wyszukiwania leku po kodzie GTIN/EAN używaną przez endpoint
+skanowania. Kod jest najpierw wyszukiwany w lokalnej kopii Rejestru Produktów
+Leczniczych (tabela synchronizowana przez aplikację sync_rpl), następnie
+wśród leków zapisanych wcześniej z API rejestru (patrz api.drug_store),
+a dopiero w przypadku braku świeżego trafienia w zewnętrznym API rejestru.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from sync_rpl.gtin_index import aget_gtin_index, get_gtin_index
+from sync_rpl.models import Medicine, MedicinePackage
+from sync_rpl.packaging import canonical_gtin
+from .codes import ScannedCode
+from .drug_api import PolishMedicinesAPI, RegistryUnavailableError
+from .drug_store import (
+    afind_stored_drug,
+    find_stored_drug,
+    find_stored_drugs,
+    is_fresh,
+    persist_upstream_result,
+)
+from .models import Drug
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCAN_BATCH_SETTINGS = {
+    'MAX_CODES': 100,
+    'MAX_WORKERS': 8,
+}
+
+
+def get_scan_batch_settings() -> dict:
+    """
+    Zwraca ustawienia skanowania wsadowego uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z SCAN_BATCH nałożone na DEFAULT_SCAN_BATCH_SETTINGS
+    """
+    return {**DEFAULT_SCAN_BATCH_SETTINGS, **getattr(settings, 'SCAN_BATCH', {})}
+
+
+def find_local_package(code: str) -> Optional[MedicinePackage]:
+    """
+    Wyszukuje opakowanie leku o podanym kodzie w lokalnej kopii rejestru.
+
+    Gdy dostępny jest indeks GTIN (patrz sync_rpl.gtin_index), kod jest
+    wyszukiwany wyłącznie w nim, bez zapytania do bazy danych.
+
+    Args:
+        code (str): Kod GTIN/EAN leku
+
+    Returns:
+        Optional[MedicinePackage]: Opakowanie wraz z powiązanym lekiem
+            lub None w przypadku braku trafienia
+    """
+    gtin = canonical_gtin(code)
+    if not gtin:
+        return None
+    index = get_gtin_index()
+    if index is not None:
+        return index.lookup(gtin)
+    return MedicinePackage.objects.select_related('medicine').filter(gtin=gtin).first()
+
+
+def drug_from_medicine(
+    medicine: Medicine,
+    code: str,
+    code_type: str,
+    package: Optional[MedicinePackage] = None
+) -> Dict[str, Any]:
+    """
+    Buduje opis leku w formacie odpowiedzi endpointu skanowania
+    na podstawie rekordu lokalnego rejestru.
+
+    Pola, których lokalny rejestr nie przechowuje, mają wartość None.
+
+    Args:
+        medicine (Medicine): Rekord leku z lokalnego rejestru
+        code (str): Zeskanowany kod
+        code_type (str): Zidentyfikowany typ kodu
+        package (Optional[MedicinePackage]): Zeskanowane opakowanie leku
+
+    Returns:
+        Dict[str, Any]: Opis leku
+    """
+    return {
+        'name': medicine.name,
+        'common_name': medicine.common_name,
+        'power': medicine.strength,
+        'form': medicine.pharmaceutical_form,
+        'package_size': package.pack_size if package else None,
+        'marketing_authorization_holder': medicine.responsible_entity,
+        'marketing_authorization_number': None,
+        'active_substance': medicine.active_substance,
+        'code_info': {
+            'value': code,
+            'type': code_type
+        },
+        'atc_code': medicine.atc_code,
+        'expiration_date': None,
+        'procedure_type': None,
+        'specimen_type': None
+    }
+
+
+def drug_from_upstream(product: Dict[str, Any], code: str, code_type: str) -> Dict[str, Any]:
+    """
+    Buduje opis leku w formacie odpowiedzi endpointu skanowania
+    na podstawie produktu zwróconego przez API rejestru.
+
+    Args:
+        product (Dict[str, Any]): Pojedynczy element listy 'content' z odpowiedzi API
+        code (str): Zeskanowany kod
+        code_type (str): Zidentyfikowany typ kodu
+
+    Returns:
+        Dict[str, Any]: Opis leku
+    """
+    return {
+        'name': product.get('medicinalProductName'),
+        'common_name': product.get('commonName'),
+        'power': product.get('medicinalProductPower'),
+        'form': product.get('pharmaceuticalFormName'),
+        'package_size': None,  # brak w odpowiedzi API
+        'marketing_authorization_holder': product.get('subjectMedicinalProductName'),
+        'marketing_authorization_number': product.get('registryNumber'),
+        'active_substance': product.get('activeSubstanceName'),
+        'code_info': {
+            'value': code,
+            'type': code_type
+        },
+        # Dodatkowe pola z API
+        'atc_code': product.get('atcCode'),
+        'expiration_date': product.get('expirationDateString'),
+        'procedure_type': product.get('procedureTypeName'),
+        'specimen_type': product.get('specimenType')
+    }
+
+
+class ScanLookup:
+    """
+    Wynik wyszukiwania leku po kodzie.
+
+    Attributes:
+        drug (Optional[Dict[str, Any]]): Opis leku lub None, gdy nie znaleziono
+        tier (str): Źródło wyniku: 'local' (lokalny rejestr), 'stored'
+            (lek zapisany z API rejestru), 'cache', 'upstream' (API rejestru)
+            lub 'stale' (nieaktualne dane zwrócone podczas awarii API)
+        unavailable (bool): Czy API rejestru było niedostępne i nie udało się
+            ustalić wyniku
+    """
+    def __init__(self, drug: Optional[Dict[str, Any]], tier: str, unavailable: bool = False):
+        """
+        Inicjalizuje wynik wyszukiwania.
+
+        Args:
+            drug (Optional[Dict[str, Any]]): Opis leku lub None
+            tier (str): Źródło wyniku
+            unavailable (bool): Czy API rejestru było niedostępne
+        """
+        self.drug = drug
+        self.tier = tier
+        self.unavailable = unavailable
+
+    @property
+    def stale(self) -> bool:
+        """
+        Czy wynik pochodzi z nieaktualnych danych.
+        """
+        return self.tier == 'stale'
+
+
+def resolve_code(code: str, code_type: str) -> ScanLookup:
+    """
+    Wyszukuje lek po kodzie, zaczynając od lokalnego rejestru.
+
+    Zewnętrzne API rejestru jest odpytywane tylko wtedy, gdy kod nie
+    występuje w lokalnej kopii rejestru, a lek zapisany wcześniej z API
+    nie istnieje lub jego dane nie są już świeże.
+
+    Args:
+        code (str): Kanoniczny kod GTIN (patrz api.codes.parse_code)
+        code_type (str): Zidentyfikowany typ kodu
+
+    Returns:
+        ScanLookup: Wynik wyszukiwania
+    """
+    package = find_local_package(code)
+    if package:
+        return ScanLookup(drug_from_medicine(package.medicine, code, code_type, package), 'local')
+
+    stored = find_stored_drug(code)
+    if stored and is_fresh(stored):
+        return ScanLookup(drug_from_upstream(stored.rpl_data, code, code_type), 'stored')
+
+    return lookup_upstream(code, code_type, stored)
+
+
+async def aresolve_code(code: str, code_type: str) -> ScanLookup:
+    """
+    Asynchroniczna wersja resolve_code, korzystająca z asynchronicznego ORM
+    i asynchronicznego klienta HTTP.
+
+    Args:
+        code (str): Kanoniczny kod GTIN
+        code_type (str): Zidentyfikowany typ kodu
+
+    Returns:
+        ScanLookup: Wynik wyszukiwania
+    """
+    gtin = canonical_gtin(code)
+    if gtin:
+        index = await aget_gtin_index()
+        if index is not None:
+            package = index.lookup(gtin)
+        else:
+            package = await MedicinePackage.objects.select_related('medicine').filter(gtin=gtin).afirst()
+        if package:
+            return ScanLookup(drug_from_medicine(package.medicine, code, code_type, package), 'local')
+
+        stored = await afind_stored_drug(gtin)
+        if stored and is_fresh(stored):
+            return ScanLookup(drug_from_upstream(stored.rpl_data, code, code_type), 'stored')
+    else:
+        stored = None
+
+    try:
+        drug_data, source = await PolishMedicinesAPI.alookup(code)
+    except RegistryUnavailableError as e:
+        return upstream_unavailable(e, code, code_type, stored)
+    await sync_to_async(persist_upstream_result)(code, drug_data, source, stored)
+    return ScanLookup(drug_from_search(drug_data, code, code_type), source)
+
+
+def lookup_upstream(code: str, code_type: str, stored: Optional[Drug] = None) -> ScanLookup:
+    """
+    Wyszukuje lek w API rejestru (przez cache wyników) i zapisuje
+    znaleziony lek w bazie.
+
+    Args:
+        code (str): Kanoniczny kod GTIN
+        code_type (str): Zidentyfikowany typ kodu
+        stored (Optional[Drug]): Nieaktualny lek zapisany wcześniej z API,
+            zwracany, gdy API rejestru jest niedostępne
+
+    Returns:
+        ScanLookup: Wynik wyszukiwania
+    """
+    try:
+        drug_data, source = PolishMedicinesAPI.lookup(code)
+    except RegistryUnavailableError as e:
+        return upstream_unavailable(e, code, code_type, stored)
+    persist_upstream_result(code, drug_data, source, stored)
+    return ScanLookup(drug_from_search(drug_data, code, code_type), source)
+
+
+def upstream_unavailable(
+    error: Exception,
+    code: str,
+    code_type: str,
+    stored: Optional[Drug]
+) -> ScanLookup:
+    """
+    Buduje wynik wyszukiwania dla niedostępnego API rejestru.
+
+    Args:
+        error (Exception): Błąd zgłoszony przez PolishMedicinesAPI
+        code (str): Kanoniczny kod GTIN
+        code_type (str): Zidentyfikowany typ kodu
+        stored (Optional[Drug]): Nieaktualny lek zapisany wcześniej z API
+
+    Returns:
+        ScanLookup: Nieaktualne dane zapisanego leku lub wynik oznaczony
+            jako niedostępny
+    """
+    if stored:
+        return ScanLookup(drug_from_upstream(stored.rpl_data, code, code_type), 'stale')
+    logger.warning(f"Drug lookup failed: {error}")
+    return ScanLookup(None, 'upstream', unavailable=True)
+
+
+def drug_from_search(
+    drug_data: Optional[Dict[str, Any]],
+    code: str,
+    code_type: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Buduje opis leku z odpowiedzi wyszukiwania w API rejestru.
+
+    Args:
+        drug_data (Optional[Dict[str, Any]]): Wynik PolishMedicinesAPI.search_drug
+        code (str): Zeskanowany kod
+        code_type (str): Zidentyfikowany typ kodu
+
+    Returns:
+        Optional[Dict[str, Any]]: Opis pierwszego znalezionego leku lub None
+    """
+    if drug_data and drug_data.get('content') and len(drug_data['content']) > 0:
+        # Pobieramy pierwszy lek z listy content
+        return drug_from_upstream(drug_data['content'][0], code, code_type)
+    return None
+
+
+def resolve_codes(codes: List[Tuple[str, str]]) -> List[ScanLookup]:
+    """
+    Wyszukuje leki dla wielu kodów jednocześnie.
+
+    Trafienia w lokalnym rejestrze (z indeksu GTIN lub jednym zapytaniem)
+    oraz wśród leków zapisanych z API rejestru są pobierane hurtowo. Pozostałe kody są wyszukiwane w API
+    rejestru współbieżnie,
+    przy liczbie równoległych zapytań ograniczonej ustawieniem
+    SCAN_BATCH['MAX_WORKERS'].
+
+    Args:
+        codes (List[Tuple[str, str]]): Lista par (kanoniczny kod GTIN, typ kodu)
+
+    Returns:
+        List[ScanLookup]: Wyniki wyszukiwania w kolejności kodów wejściowych
+    """
+    gtins = {code: canonical_gtin(code) for code, _ in codes}
+    index = get_gtin_index()
+    if index is not None:
+        packages = {
+            package.gtin: package
+            for package in (index.lookup(gtin) for gtin in set(gtins.values()) if gtin)
+            if package
+        }
+    else:
+        packages = {
+            package.gtin: package
+            for package in MedicinePackage.objects.select_related('medicine')
+            .filter(gtin__in={gtin for gtin in gtins.values() if gtin})
+        }
+
+    stored = find_stored_drugs({code for code in gtins if gtins[code] not in packages})
+
+    misses = list(dict.fromkeys(
+        (code, code_type) for code, code_type in codes
+        if gtins[code] not in packages and not (code in stored and is_fresh(stored[code]))
+    ))
+    upstream = {}
+    if misses:
+        max_workers = min(get_scan_batch_settings()['MAX_WORKERS'], len(misses))
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            upstream = dict(zip(misses, pool.map(
+                _lookup_in_thread, [(code, code_type, stored.get(code)) for code, code_type in misses]
+            )))
+
+    results = []
+    for code, code_type in codes:
+        package = packages.get(gtins[code])
+        if package:
+            results.append(ScanLookup(
+                drug_from_medicine(package.medicine, code, code_type, package), 'local'
+            ))
+        elif (code, code_type) in upstream:
+            results.append(upstream[(code, code_type)])
+        else:
+            results.append(ScanLookup(
+                drug_from_upstream(stored[code].rpl_data, code, code_type), 'stored'
+            ))
+    return results
+
+
+def _lookup_in_thread(args: Tuple[str, str, Optional[Drug]]) -> ScanLookup:
+    # Wątki puli mogą otworzyć połączenia do bazy (np. przez cache
+    # bazodanowy lub zapis leku), które należy zamknąć po zakończeniu zadania
+    try:
+        return lookup_upstream(*args)
+    finally:
+        connections.close_all()
+
+
+def scan_result(scanned: ScannedCode, lookup: Optional[ScanLookup]) -> Tuple[Dict[str, Any], int]:
+    """
+    Buduje treść i status odpowiedzi endpointu skanowania.
+
+    Dla kodów GS1 DataMatrix informacje o kodzie są uzupełniane o numer
+    serii, datę ważności i numer seryjny opakowania. Wyniki pochodzące
+    z nieaktualnego cache (podczas awarii API rejestru) są oznaczane
+    polem 'stale'.
+
+    Args:
+        scanned (ScannedCode): Przeanalizowany zeskanowany kod
+        lookup (Optional[ScanLookup]): Wynik wyszukiwania lub None dla
+            kodów odrzuconych
+
+    Returns:
+        Tuple[Dict[str, Any], int]: Treść odpowiedzi i kod statusu HTTP
+    """
+    if not scanned.is_valid:
+        return {
+            'found': False,
+            'scanned_code': scanned.raw,
+            'identified_type': scanned.code_type,
+            'error': scanned.error
+        }, 400
+    if lookup.unavailable:
+        return {
+            'found': False,
+            'scanned_code': scanned.raw,
+            'identified_type': scanned.code_type,
+            'error': 'Rejestr produktów leczniczych jest chwilowo niedostępny'
+        }, 503
+    if lookup.drug:
+        drug = lookup.drug
+        if scanned.is_gs1:
+            drug['code_info'].update(scanned.gs1_info())
+        body = {
+            'found': True,
+            'drug': drug
+        }
+        if lookup.stale:
+            body['stale'] = True
+        return body, 200
+    body = {
+        'found': False,
+        'scanned_code': scanned.raw,
+        'identified_type': scanned.code_type
+    }
+    if lookup.stale:
+        body['stale'] = True
+    return body, 404
@@ -0,0 +1,282 @@
+"""
+Moduł dziennika skanowań i wstępnego zapełniania cache.
+
+Każde skanowanie jest zapisywane jako zdarzenie ScanEvent. Zdarzenia trafiają
+do bufora w pamięci procesu, który wątek w tle zapisuje hurtowo
+(bulk_create), więc obsługa żądania nie wykonuje żadnego INSERT-u. Gdy baza
+jest niedostępna, bufor jest ograniczony rozmiarem, a nadmiarowe zdarzenia
+są odrzucane.
+
+Funkcja warm_scan_cache wyszukuje najczęściej skanowane kody z ostatnich dni
+i rozwiązuje je z wyprzedzeniem, zapełniając cache wyników API rejestru
+i tabelę leków zapisanych z API. Jest uruchamiana po synchronizacji rejestru
+oraz komendą manage.py warm_scan_cache (np. po wdrożeniu).
+"""
+import atexit
+import logging
+import os
+import threading
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Count
+from django.utils import timezone
+
+from .codes import ScannedCode
+from .models import ScanEvent
+from .scan import ScanLookup, resolve_code
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCAN_EVENTS_SETTINGS = {
+    'ENABLED': True,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 2,
+    'MAX_BUFFER': 10000,
+    'WARM_TOP_CODES': 500,
+    'WARM_WINDOW_DAYS': 7,
+}
+
+
+def get_scan_events_settings() -> dict:
+    """
+    Zwraca ustawienia dziennika skanowań uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z SCAN_EVENTS nałożone na DEFAULT_SCAN_EVENTS_SETTINGS
+    """
+    return {**DEFAULT_SCAN_EVENTS_SETTINGS, **getattr(settings, 'SCAN_EVENTS', {})}
+
+
+class ScanEventWriter:
+    """
+    Buforowany zapis zdarzeń skanowania przez wątek w tle.
+
+    Wątek zapisujący jest uruchamiany przy pierwszym zdarzeniu w procesie
+    (również po rozwidleniu procesu przez serwer aplikacji) i zapisuje bufor
+    co flush_interval sekund lub po zebraniu batch_size zdarzeń.
+
+    Attributes:
+        enabled (bool): Czy zdarzenia są zapisywane
+        batch_size (int): Liczba zdarzeń wyzwalająca zapis
+        flush_interval (float): Maksymalny czas między zapisami w sekundach
+        max_buffer (int): Maksymalna liczba zdarzeń oczekujących na zapis
+        dropped (int): Liczba zdarzeń odrzuconych z powodu pełnego bufora
+    """
+    def __init__(self, enabled: bool, batch_size: int, flush_interval: float, max_buffer: int):
+        """
+        Inicjalizuje pusty bufor.
+
+        Args:
+            enabled (bool): Czy zdarzenia są zapisywane
+            batch_size (int): Liczba zdarzeń wyzwalająca zapis
+            flush_interval (float): Maksymalny czas między zapisami w sekundach
+            max_buffer (int): Maksymalna liczba zdarzeń oczekujących na zapis
+        """
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self._buffer: List[ScanEvent] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+
+    @classmethod
+    def from_settings(cls) -> 'ScanEventWriter':
+        """
+        Tworzy bufor na podstawie ustawienia SCAN_EVENTS.
+
+        Returns:
+            ScanEventWriter: Skonfigurowany bufor
+        """
+        config = get_scan_events_settings()
+        return cls(
+            enabled=config['ENABLED'],
+            batch_size=config['BATCH_SIZE'],
+            flush_interval=config['FLUSH_INTERVAL'],
+            max_buffer=config['MAX_BUFFER'],
+        )
+
+    def record(self, code: str, tier: str, found: bool, latency: float) -> None:
+        """
+        Dodaje zdarzenie skanowania do bufora.
+
+        Args:
+            code (str): Kanoniczny kod GTIN lub zeskanowany kod
+            tier (str): Źródło wyniku
+            found (bool): Czy lek został znaleziony
+            latency (float): Czas obsługi żądania w sekundach
+        """
+        if not self.enabled:
+            return
+        event = ScanEvent(
+            code=code[:100],
+            tier=tier,
+            found=found,
+            latency_ms=latency * 1000,
+            created_at=timezone.now(),
+        )
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.batch_size
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Zapisuje wszystkie zdarzenia z bufora.
+
+        Returns:
+            int: Liczba zapisanych zdarzeń
+        """
+        with self._lock:
+            events, self._buffer = self._buffer, []
+        if not events:
+            return 0
+        try:
+            close_old_connections()
+            ScanEvent.objects.bulk_create(events, batch_size=self.batch_size)
+            return len(events)
+        except Exception as e:
+            logger.error(f"Saving {len(events)} scan events failed: {e}")
+            # Zdarzenia wracają do bufora w granicach jego rozmiaru
+            with self._lock:
+                self._buffer = (events + self._buffer)[:self.max_buffer]
+            connections.close_all()
+            return 0
+
+    def _ensure_thread(self) -> None:
+        pid = os.getpid()
+        if self._thread_pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread_pid == pid and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='scan-event-writer', daemon=True)
+            self._thread_pid = pid
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+scan_event_writer = ScanEventWriter.from_settings()
+atexit.register(scan_event_writer.flush)
+
+
+def record_scan(code: str, tier: str, found: bool, latency: float) -> None:
+    """
+    Rejestruje skanowanie w dzienniku bez blokowania obsługi żądania.
+
+    Args:
+        code (str): Kanoniczny kod GTIN lub zeskanowany kod
+        tier (str): Źródło wyniku
+        found (bool): Czy lek został znaleziony
+        latency (float): Czas obsługi żądania w sekundach
+    """
+    scan_event_writer.record(code, tier, found, latency)
+
+
+def record_scan_result(scanned: ScannedCode, lookup: Optional[ScanLookup], latency: float) -> None:
+    """
+    Rejestruje wynik skanowania obsłużonego przez scan_result.
+
+    Args:
+        scanned (ScannedCode): Przeanalizowany zeskanowany kod
+        lookup (Optional[ScanLookup]): Wynik wyszukiwania lub None dla
+            kodów odrzuconych
+        latency (float): Czas obsługi żądania w sekundach
+    """
+    if not scanned.is_valid:
+        record_scan(scanned.raw, 'invalid', False, latency)
+    elif lookup.unavailable:
+        record_scan(scanned.gtin, 'unavailable', False, latency)
+    else:
+        record_scan(scanned.gtin, lookup.tier, lookup.drug is not None, latency)
+
+
+def top_scanned_codes(limit: Optional[int] = None, days: Optional[int] = None) -> List[str]:
+    """
+    Zwraca najczęściej skanowane poprawne kody z ostatnich dni.
+
+    Args:
+        limit (Optional[int]): Liczba kodów, domyślnie SCAN_EVENTS['WARM_TOP_CODES']
+        days (Optional[int]): Okres w dniach, domyślnie SCAN_EVENTS['WARM_WINDOW_DAYS']
+
+    Returns:
+        List[str]: Kody GTIN od najczęściej skanowanego
+    """
+    config = get_scan_events_settings()
+    since = timezone.now() - timedelta(days=days or config['WARM_WINDOW_DAYS'])
+    return list(
+        ScanEvent.objects.filter(created_at__gte=since)
+        .exclude(tier='invalid')
+        .values('code')
+        .annotate(scans=Count('id'))
+        .order_by('-scans')
+        .values_list('code', flat=True)[:limit or config['WARM_TOP_CODES']]
+    )
+
+
+def warm_scan_cache(limit: Optional[int] = None, days: Optional[int] = None) -> dict:
+    """
+    Rozwiązuje z wyprzedzeniem najczęściej skanowane kody.
+
+    Kody spoza lokalnego rejestru są wyszukiwane w API rejestru (przez
+    cache, wspólny ogranicznik i wyłącznik awaryjny), co zapełnia
+    współdzielony cache wyników i tabelę leków zapisanych z API.
+
+    Args:
+        limit (Optional[int]): Liczba kodów, domyślnie SCAN_EVENTS['WARM_TOP_CODES']
+        days (Optional[int]): Okres w dniach, domyślnie SCAN_EVENTS['WARM_WINDOW_DAYS']
+
+    Returns:
+        dict: Liczba rozwiązanych kodów według źródła wyniku
+    """
+    tiers = {}
+    for code in top_scanned_codes(limit, days):
+        lookup = resolve_code(code, 'GTIN')
+        tier = 'unavailable' if lookup.unavailable else lookup.tier
+        tiers[tier] = tiers.get(tier, 0) + 1
+    return tiers
+
+
+def warm_after_sync(sender, background: bool = True, **kwargs) -> None:
+    """
+    Odbiornik sygnału sync_rpl.signals.registry_synced zapełniający cache.
+
+    W długo działającym procesie serwera zapełnianie odbywa się w wątku w tle.
+    Synchronizacja uruchamiana jako skrypt lub zadanie cron wysyła sygnał
+    z background=False - wątek demona zostałby przerwany wraz z zakończeniem
+    procesu, więc cache jest zapełniany przed powrotem z odbiornika.
+
+    Args:
+        sender: Nadawca sygnału
+        background (bool): Czy zapełniać cache w wątku w tle
+    """
+    if not background:
+        _warm_in_thread()
+        return
+    threading.Thread(target=_warm_in_thread, name='scan-cache-warmer', daemon=True).start()
+
+
+def _warm_in_thread() -> None:
+    try:
+        tiers = warm_scan_cache()
+        logger.info(f"Scan cache warmed: {tiers}")
+    except Exception as e:
+        logger.error(f"Scan cache warm-up failed: {e}")
+    finally:
+        connections.close_all()
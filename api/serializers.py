@@ -7,6 +7,7 @@ na format JSON i odwrotnie, umożliwiając komunikację przez API REST.
 # serializers.py
 from rest_framework import serializers
 from .models import Drug, DrugCode
+from .scan import get_scan_batch_settings
 
 class DrugCodeSerializer(serializers.ModelSerializer):
     """
@@ -62,4 +63,22 @@ class DrugSerializer(serializers.ModelSerializer):
         """
         model = Drug
         fields = ['id', 'name', 'manufacturer', 'active_ingredients', 
-                 'dosage_form', 'codes']
\ No newline at end of file
+                 'dosage_form', 'codes']
+
+class ScanBatchRequestSerializer(serializers.Serializer):
+    """
+    Serializer żądania wsadowego skanowania kodów.
+
+    Waliduje listę kodów przesłaną do endpointu scan_batch. Maksymalna
+    liczba kodów w jednym żądaniu jest określona ustawieniem
+    SCAN_BATCH['MAX_CODES'].
+
+    Atrybuty:
+        codes (ListField): Lista zeskanowanych kodów
+    """
+    codes = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        allow_empty=False,
+        max_length=get_scan_batch_settings()['MAX_CODES'],
+        help_text="Lista zeskanowanych kodów"
+    )
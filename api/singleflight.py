@@ -0,0 +1,256 @@
+"""
+Moduł łączenia współbieżnych, identycznych zapytań do API rejestru.
+
+Gdy wielu klientów jednocześnie skanuje ten sam kod, tylko jedno zapytanie
+trafia do zewnętrznego API, a pozostali oczekujący otrzymują jego wynik.
+Łączenie działa na dwóch poziomach:
+- w obrębie procesu: wątki czekają na wynik wątku, który pierwszy
+  rozpoczął zapytanie,
+- między workerami: proces, który zdobędzie krótkotrwałą blokadę we
+  współdzielonym cache, wykonuje zapytanie, a pozostałe odpytują cache
+  w oczekiwaniu na zapisany przez niego wynik.
+
+Metoda ado udostępnia ten sam mechanizm dla kodu asynchronicznego, gdzie
+oczekującymi są korutyny w obrębie pętli zdarzeń.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SINGLEFLIGHT_SETTINGS = {
+    'LOCK_TTL': 30,
+    'WAIT_TIMEOUT': 10,
+    'POLL_INTERVAL': 0.05,
+    'SHARED_ALIAS': 'rpl',
+}
+
+
+class _Call:
+    """
+    Zapytanie w toku, na którego wynik mogą czekać inne wątki procesu.
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Mechanizm single-flight dla zapytań identyfikowanych kluczem.
+
+    Attributes:
+        prefix (str): Prefiks kluczy blokad we współdzielonym cache
+        lock_ttl (int): Czas życia blokady między workerami w sekundach
+        wait_timeout (float): Maksymalny czas oczekiwania na wynik innego
+            workera, po którym zapytanie jest wykonywane samodzielnie
+        poll_interval (float): Odstęp między sprawdzeniami współdzielonego cache
+        shared_alias (str): Alias współdzielonego cache w ustawieniu CACHES
+    """
+    def __init__(self, prefix: str, lock_ttl: int, wait_timeout: float,
+                 poll_interval: float, shared_alias: str):
+        """
+        Inicjalizuje mechanizm single-flight.
+
+        Args:
+            prefix (str): Prefiks kluczy blokad we współdzielonym cache
+            lock_ttl (int): Czas życia blokady między workerami w sekundach
+            wait_timeout (float): Maksymalny czas oczekiwania na innego workera
+            poll_interval (float): Odstęp między sprawdzeniami współdzielonego cache
+            shared_alias (str): Alias współdzielonego cache w ustawieniu CACHES
+        """
+        self.prefix = prefix
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.shared_alias = shared_alias
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._async_calls = {}
+
+    @classmethod
+    def from_settings(cls, prefix: str) -> 'SingleFlight':
+        """
+        Tworzy mechanizm na podstawie ustawienia RPL_SINGLEFLIGHT.
+
+        Args:
+            prefix (str): Prefiks kluczy blokad we współdzielonym cache
+
+        Returns:
+            SingleFlight: Skonfigurowany mechanizm
+        """
+        config = {**DEFAULT_SINGLEFLIGHT_SETTINGS, **getattr(settings, 'RPL_SINGLEFLIGHT', {})}
+        return cls(
+            prefix=prefix,
+            lock_ttl=config['LOCK_TTL'],
+            wait_timeout=config['WAIT_TIMEOUT'],
+            poll_interval=config['POLL_INTERVAL'],
+            shared_alias=config['SHARED_ALIAS'],
+        )
+
+    def do(self, key: str, fn: Callable[[], Any], peek: Callable[[], Tuple[bool, Any]]) -> Any:
+        """
+        Wykonuje fn dla klucza, łącząc współbieżne wywołania.
+
+        Args:
+            key (str): Znormalizowany klucz zapytania
+            fn (Callable[[], Any]): Funkcja wykonująca zapytanie; powinna
+                zapisać wynik we współdzielonym cache
+            peek (Callable[[], Tuple[bool, Any]]): Funkcja sprawdzająca, czy
+                wynik jest już dostępny we współdzielonym cache
+
+        Returns:
+            Any: Wynik zapytania
+
+        Raises:
+            Exception: Wyjątek zgłoszony przez fn jest przekazywany wszystkim
+                oczekującym wątkom procesu
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn, peek)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        peek: Callable[[], Awaitable[Tuple[bool, Any]]]
+    ) -> Any:
+        """
+        Asynchroniczna wersja do, łącząca współbieżne korutyny.
+
+        Args:
+            key (str): Znormalizowany klucz zapytania
+            fn (Callable[[], Awaitable[Any]]): Korutyna wykonująca zapytanie
+            peek (Callable[[], Awaitable[Tuple[bool, Any]]]): Korutyna
+                sprawdzająca współdzielony cache
+
+        Returns:
+            Any: Wynik zapytania
+        """
+        loop = asyncio.get_running_loop()
+        future = self._async_calls.get(key)
+        if future is not None and future.get_loop() is loop:
+            return await asyncio.shield(future)
+
+        future = self._async_calls[key] = loop.create_future()
+        try:
+            result = await self._ado_shared(key, fn, peek)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # Wyjątek jest odbierany przez oczekujących; zapobiega to
+            # ostrzeżeniu o nieodebranym wyjątku, gdy nikt nie czekał
+            future.exception()
+            raise
+        finally:
+            if self._async_calls.get(key) is future:
+                del self._async_calls[key]
+
+    async def _ado_shared(self, key, fn, peek):
+        lock_key = f"{self.prefix}:{key}"
+        token = uuid.uuid4().hex
+        shared = caches[self.shared_alias]
+        try:
+            acquired = await shared.aadd(lock_key, token, self.lock_ttl)
+        except Exception as e:
+            logger.warning(f"Single-flight lock failed: {e}")
+            return await fn()
+
+        if acquired:
+            try:
+                return await fn()
+            finally:
+                try:
+                    if await shared.aget(lock_key) == token:
+                        await shared.adelete(lock_key)
+                except Exception as e:
+                    logger.warning(f"Single-flight unlock failed: {e}")
+
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            hit, value = await peek()
+            if hit:
+                return value
+            try:
+                if await shared.aget(lock_key) is None:
+                    break
+            except Exception:
+                break
+
+        hit, value = await peek()
+        if hit:
+            return value
+        return await fn()
+
+    def _do_shared(self, key: str, fn: Callable[[], Any], peek: Callable[[], Tuple[bool, Any]]) -> Any:
+        lock_key = f"{self.prefix}:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = caches[self.shared_alias].add(lock_key, token, self.lock_ttl)
+        except Exception as e:
+            logger.warning(f"Single-flight lock failed: {e}")
+            return fn()
+
+        if acquired:
+            try:
+                return fn()
+            finally:
+                self._release(lock_key, token)
+
+        # Inny worker wykonuje już to zapytanie - czekamy na jego wynik
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            hit, value = peek()
+            if hit:
+                return value
+            try:
+                if caches[self.shared_alias].get(lock_key) is None:
+                    break
+            except Exception:
+                break
+
+        # Blokada zwolniona lub czas oczekiwania minął - wynik mógł zostać
+        # zapisany tuż przed zwolnieniem blokady
+        hit, value = peek()
+        if hit:
+            return value
+        return fn()
+
+    def _release(self, lock_key: str, token: str) -> None:
+        try:
+            shared = caches[self.shared_alias]
+            if shared.get(lock_key) == token:
+                shared.delete(lock_key)
+        except Exception as e:
+            logger.warning(f"Single-flight unlock failed: {e}")
@@ -1,3 +1,201 @@
-from django.test import TestCase
+import tempfile
+from datetime import datetime, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.test import RequestFactory, SimpleTestCase
+
+from sync_rpl.snapshot import RegistrySnapshot, registry_etag
+from .codes import GS1_SEPARATOR, parse_code, parse_gs1
+from .governor import GovernorTimeout, UpstreamGovernor
+from .scan_events import ScanEventWriter
+from .views import indexed_not_modified
+
+
+class ParseGs1Tests(SimpleTestCase):
+    """
+    Testy rozbijania ciągów elementów GS1 i rozpoznawania kodów DataMatrix.
+    """
+    GTIN = '05909990840229'
+
+    def test_raw_form(self):
+        fields = parse_gs1(f'01{self.GTIN}17260131' f'10AB123{GS1_SEPARATOR}21XYZ')
+        self.assertEqual(fields, {'gtin': self.GTIN, 'expiry': '260131', 'lot': 'AB123', 'serial': 'XYZ'})
+
+    def test_fnc1_prefixed_raw_form(self):
+        code = parse_code(f'{GS1_SEPARATOR}01{self.GTIN}10AB123{GS1_SEPARATOR}17260100')
+        self.assertEqual(code.gtin, self.GTIN)
+        self.assertEqual(code.lot, 'AB123')
+        self.assertEqual(code.expiry, '2026-01-31')
+
+    def test_symbology_identifier_prefix(self):
+        code = parse_code(f']d201{self.GTIN}21SN001')
+        self.assertTrue(code.is_valid)
+        self.assertTrue(code.is_gs1)
+        self.assertEqual(code.serial, 'SN001')
+
+    def test_bracketed_form(self):
+        code = parse_code(f'(01){self.GTIN}(17)260131(10)AB123(21)XYZ')
+        self.assertEqual((code.gtin, code.lot, code.serial, code.expiry),
+                         (self.GTIN, 'AB123', 'XYZ', '2026-01-31'))
+
+    def test_unknown_ais_are_ignored(self):
+        raw = f'01{self.GTIN}240X1{GS1_SEPARATOR}7120123{GS1_SEPARATOR}10AB123'
+        self.assertEqual(parse_gs1(raw), {'gtin': self.GTIN, 'lot': 'AB123'})
+        self.assertEqual(parse_gs1(f'(01){self.GTIN}(240)X'), {'gtin': self.GTIN})
+        self.assertEqual(parse_code(f'(01){self.GTIN}(240)X').gtin, self.GTIN)
+
+    def test_unknown_fixed_length_ai_is_skipped_by_length(self):
+        # AI 3103 (masa netto) ma stałą długość, więc nie wymaga separatora
+        self.assertEqual(parse_gs1(f'01{self.GTIN}3103000500' f'10AB'), {'gtin': self.GTIN, 'lot': 'AB'})
+        self.assertEqual(parse_gs1(f'01{self.GTIN}11250101' f'3103000500'),
+                         {'gtin': self.GTIN, 'production_date': '250101'})
+
+    def test_bracketed_form_checks_lengths(self):
+        self.assertIsNone(parse_gs1('(01)0590999084022'))
+        self.assertIsNone(parse_gs1('(17)2601'))
+        self.assertIsNone(parse_gs1(f'(01){self.GTIN}(10)' + 'A' * 21))
+        self.assertIsNone(parse_gs1(f'(01){self.GTIN}(21)'))
+
+    def test_raw_form_checks_lengths(self):
+        self.assertIsNone(parse_gs1('010590999084022'))
+        self.assertIsNone(parse_gs1(f'01{self.GTIN}10' + 'A' * 21))
+
+    def test_plain_gtin(self):
+        code = parse_code('5909990840229')
+        self.assertEqual((code.code_type, code.gtin, code.is_gs1), ('GTIN', self.GTIN, False))
+        self.assertEqual(parse_code('5909990840228').error, 'Nieprawidłowy kod GTIN')
+
+
+class UpstreamGovernorTests(SimpleTestCase):
+    """
+    Testy kolejności pobierania slotu i żetonu oraz osobnej puli slotów.
+    """
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        # Dwa żetony i praktycznie zerowe tempo uzupełniania wiadra
+        self.governor = UpstreamGovernor(
+            name='test', enabled=True, state_dir=state_dir.name, max_in_flight=1,
+            rate=0.001, burst=2, queue_timeout=1, poll_interval=0.01,
+        )
+
+    def test_slot_timeout_does_not_consume_token(self):
+        with self.governor.slot():
+            with self.assertRaises(GovernorTimeout):
+                with self.governor.slot(timeout=0.05):
+                    pass
+        # Drugi żeton nie został zużyty przez żądanie czekające na slot
+        with self.governor.slot(timeout=0):
+            pass
+
+    def test_token_timeout_releases_slot(self):
+        for _ in range(2):
+            with self.governor.slot(timeout=0):
+                pass
+        with self.assertRaises(GovernorTimeout):
+            with self.governor.slot(timeout=0.05):
+                pass
+        self.assertIsNotNone(self.governor._acquire_slot())
+
+    def test_pool_has_own_slots_and_shares_bucket(self):
+        download = self.governor.pool('download', 1)
+        with self.governor.slot(timeout=0):
+            with download.slot(timeout=0):
+                pass
+        with self.assertRaises(GovernorTimeout):
+            with download.slot(timeout=0.05):
+                pass
+
+    def test_disabled_governor_does_not_wait(self):
+        self.governor.enabled = False
+        for _ in range(5):
+            with self.governor.slot(timeout=0):
+                pass
+
+
+class ScanEventWriterTests(SimpleTestCase):
+    """
+    Testy buforowania, odrzucania i zapisu zdarzeń skanowania.
+    """
+    def setUp(self):
+        self.writer = ScanEventWriter(enabled=True, batch_size=2, flush_interval=60, max_buffer=3)
+        patcher = mock.patch.object(self.writer, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_buffer_drops_events(self):
+        for index in range(5):
+            self.writer.record(f'code-{index}', 'local', True, 0.01)
+        self.assertEqual([event.code for event in self.writer._buffer], ['code-0', 'code-1', 'code-2'])
+        self.assertEqual(self.writer.dropped, 2)
+
+    def test_full_batch_wakes_writer(self):
+        self.writer.record('code', 'local', True, 0.01)
+        self.assertFalse(self.writer._wakeup.is_set())
+        self.writer.record('code', 'upstream', False, 0.25)
+        self.assertTrue(self.writer._wakeup.is_set())
+        self.assertEqual(self.writer._buffer[1].latency_ms, 250)
+
+    def test_flush_writes_buffer_in_batches(self):
+        for _ in range(3):
+            self.writer.record('code', 'local', True, 0.01)
+        with mock.patch('api.scan_events.ScanEvent.objects.bulk_create') as bulk_create, \
+                mock.patch('api.scan_events.close_old_connections'):
+            self.assertEqual(self.writer.flush(), 3)
+            self.assertEqual(self.writer.flush(), 0)
+        bulk_create.assert_called_once()
+        self.assertEqual(len(bulk_create.call_args.args[0]), 3)
+        self.assertEqual(bulk_create.call_args.kwargs, {'batch_size': 2})
+
+    def test_failed_flush_keeps_events_within_limit(self):
+        self.writer.record('first', 'local', True, 0.01)
+        self.writer.record('second', 'local', True, 0.01)
+        with mock.patch('api.scan_events.ScanEvent.objects.bulk_create', side_effect=Exception('db down')), \
+                mock.patch('api.scan_events.close_old_connections'), \
+                mock.patch('api.scan_events.connections'), \
+                self.assertLogs('api.scan_events', 'ERROR'):
+            self.assertEqual(self.writer.flush(), 0)
+        self.assertEqual([event.code for event in self.writer._buffer], ['first', 'second'])
+
+    def test_disabled_writer_records_nothing(self):
+        self.writer.enabled = False
+        self.writer.record('code', 'local', True, 0.01)
+        self.assertEqual(self.writer._buffer, [])
+
+
+class ScanNotModifiedTests(SimpleTestCase):
+    """
+    Testy odpowiedzi 304 dla kodów z indeksu GTIN przed wyszukiwaniem leku.
+    """
+    SNAPSHOT = RegistrySnapshot('v1', datetime(2026, 1, 31, tzinfo=timezone.utc))
+    CODE = '5909990840229'
+
+    def setUp(self):
+        self.index = mock.Mock()
+        self.index.find.side_effect = lambda gtin: (0, 100) if gtin == '05909990840229' else None
+        patcher = mock.patch('api.views.record_scan')
+        self.record_scan = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def not_modified(self, code=CODE, snapshot=SNAPSHOT, index=True, **headers):
+        request = RequestFactory().get('/api/scan/', {'code': code}, headers=headers)
+        return indexed_not_modified(request, snapshot, parse_code(code), self.index if index else None, 0.0)
+
+    def test_matching_etag(self):
+        etag = registry_etag(self.SNAPSHOT, self.CODE)
+        response = self.not_modified(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertEqual(self.record_scan.call_args.args[:3], ('05909990840229', 'local', True))
+
+    def test_etag_of_previous_registry_version(self):
+        etag = registry_etag(RegistrySnapshot('v0', self.SNAPSHOT.synced_at), self.CODE)
+        self.assertIsNone(self.not_modified(if_none_match=etag))
+        self.record_scan.assert_not_called()
+
+    def test_code_outside_index(self):
+        code = '5909990000005'
+        self.assertIsNone(self.not_modified(code, if_none_match=registry_etag(self.SNAPSHOT, code)))
+        self.assertIsNone(self.not_modified(index=False, if_none_match=registry_etag(self.SNAPSHOT, self.CODE)))
+        self.record_scan.assert_not_called()
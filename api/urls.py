@@ -3,5 +3,7 @@ from . import views
 
 urlpatterns = [
     path('scan/', views.scan_code, name='scan_code'),
+    path('scan/async/', views.scan_code_async, name='scan_code_async'),
+    path('scan/batch/', views.scan_batch, name='scan_batch'),
     path('notifications/', include('api.notifications.urls')),
 ]
\ No newline at end of file
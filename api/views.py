@@ -2,15 +2,27 @@
 Moduł widoków API dla systemu zarządzania lekami.
 
 Zawiera endpointy do obsługi skanowania kodów leków i zarządzania powiadomieniami.
-Wykorzystuje zewnętrzne API (PolishMedicinesAPI) do wyszukiwania informacji o lekach.
+Wykorzystuje lokalną kopię rejestru leków oraz zewnętrzne API (PolishMedicinesAPI)
+do wyszukiwania informacji o lekach.
 """
 # api/views.py
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .drug_api import PolishMedicinesAPI
-from django.http import JsonResponse
+from .codes import parse_code
+from .documents import afind_scan_document, find_scan_document
+from .scan import aresolve_code, resolve_code, resolve_codes, scan_result
+from .scan_events import record_scan, record_scan_result
+from .serializers import ScanBatchRequestSerializer
+from sync_rpl.gtin_index import aget_gtin_index, get_gtin_index
+from sync_rpl.snapshot import (
+    aregistry_snapshot, registry_conditional_response, registry_snapshot, tag_registry_response,
+)
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import add_never_cache_headers
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
 import json
+import time
 
 @csrf_exempt
 def notifications_handler(request):
@@ -55,13 +67,106 @@ def notifications_handler(request):
         'status': 'error',
         'message': 'Method not allowed'
     }, status=405)
+def scan_request_key(request):
+    """
+    Zwraca klucz żądania skanowania używany w nagłówku ETag.
+
+    Args:
+        request (HttpRequest): Obiekt żądania HTTP
+
+    Returns:
+        str: Zeskanowany kod z parametru 'code'
+    """
+    return request.GET.get('code', '')
+
+
+def registry_scan_response(request, snapshot, scanned, started, build_response):
+    """
+    Zwraca odpowiedź dla kodu znalezionego w lokalnej kopii rejestru.
+
+    Tylko takie odpowiedzi zależą wyłącznie od wersji rejestru, więc tylko
+    one otrzymują ETag i publiczny Cache-Control, a powtórny skan z pasującym
+    nagłówkiem If-None-Match kończy się odpowiedzią 304. Skanowanie jest
+    rejestrowane w dzienniku również wtedy, gdy zwracana jest odpowiedź 304.
+
+    Args:
+        request (HttpRequest): Obiekt żądania HTTP
+        snapshot (RegistrySnapshot): Wersja rejestru odczytana przed wyszukiwaniem
+        scanned (ScannedCode): Przeanalizowany zeskanowany kod
+        started (float): Czas rozpoczęcia obsługi żądania (time.perf_counter)
+        build_response (Callable[[], HttpResponse]): Funkcja budująca
+            odpowiedź 200
+
+    Returns:
+        HttpResponse: Odpowiedź 200 lub 304 z nagłówkami cache
+    """
+    response, etag = registry_conditional_response(request, snapshot, scan_request_key(request))
+    if response is None:
+        response = build_response()
+    record_scan(scanned.gtin, 'local', True, time.perf_counter() - started)
+    return tag_registry_response(response, snapshot, etag)
+
+
+def is_conditional_request(request):
+    """
+    Sprawdza, czy żądanie zawiera nagłówki warunkowe.
+
+    Args:
+        request (HttpRequest): Obiekt żądania HTTP
+
+    Returns:
+        bool: True, gdy żądanie ma nagłówek If-None-Match lub If-Modified-Since
+    """
+    return 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers
+
+
+def indexed_not_modified(request, snapshot, scanned, index, started):
+    """
+    Zwraca odpowiedź 304 dla kodu z indeksu GTIN przed wyszukiwaniem leku.
+
+    Indeks GTIN jest używany tylko wtedy, gdy zbudowano go dla bieżącej
+    wersji rejestru (sync_rpl.gtin_index), więc obecność kodu w indeksie
+    oznacza, że odpowiedź pochodzi z lokalnego rejestru i zależy wyłącznie
+    od jego wersji. Sprawdzenie to wyszukiwanie binarne w pamięci procesu,
+    bez zapytań do bazy danych.
+
+    Args:
+        request (HttpRequest): Obiekt żądania HTTP
+        snapshot (RegistrySnapshot): Wersja rejestru
+        scanned (ScannedCode): Przeanalizowany, poprawny zeskanowany kod
+        index (Optional[GtinIndex]): Indeks GTIN bieżącego procesu
+        started (float): Czas rozpoczęcia obsługi żądania (time.perf_counter)
+
+    Returns:
+        Optional[HttpResponse]: Odpowiedź 304 lub None, gdy żądanie trzeba
+            obsłużyć w całości
+    """
+    if index is None or index.find(scanned.gtin) is None:
+        return None
+    response, etag = registry_conditional_response(request, snapshot, scan_request_key(request))
+    if response is None:
+        return None
+    record_scan(scanned.gtin, 'local', True, time.perf_counter() - started)
+    return tag_registry_response(response, snapshot, etag)
+
+
 @api_view(['GET'])
 def scan_code(request):
     """
     Endpoint do wyszukiwania leków po zeskanowanym kodzie GTIN/EAN.
 
-    Przyjmuje kod kreskowy leku i zwraca szczegółowe informacje o leku
-    pobrane z API Polskich Leków (URPL).
+    Przyjmuje kod kreskowy leku i zwraca szczegółowe informacje o leku.
+    Kod jest najpierw wyszukiwany w lokalnej kopii Rejestru Produktów
+    Leczniczych, a w przypadku braku trafienia w API Polskich Leków (URPL).
+    Dla kodów z rejestru zwracana jest gotowa odpowiedź zbudowana podczas
+    synchronizacji (patrz api.documents). Obsługiwane są kody GTIN/EAN oraz
+    kody GS1 DataMatrix; kody z błędną cyfrą kontrolną są odrzucane bez
+    wyszukiwania. Odpowiedzi dla leków z lokalnego rejestru niosą ETag
+    wyznaczony z wersji rejestru (sync_rpl.snapshot), więc powtórne skany
+    tego samego kodu kończą się odpowiedzią 304 - dla kodów z indeksu GTIN
+    przed wyszukiwaniem leku i budową odpowiedzi.
+    Odpowiedzi z API URPL nie są związane z wersją rejestru i nie otrzymują
+    nagłówka ETag.
 
     Args:
         request (HttpRequest): Obiekt żądania HTTP zawierający parametr 'code'
@@ -74,10 +179,16 @@ def scan_code(request):
               zeskanowany kod i jego zidentyfikowany typ
 
     Status codes:
-        200: Sukces - lek znaleziony
-        400: Brak wymaganego parametru 'code'
+        200: Sukces - lek znaleziony (pole 'stale' oznacza dane z cache
+             zwrócone podczas awarii API URPL)
+        304: Lek z lokalnego rejestru, a odpowiedź nie zmieniła się od
+             wersji rejestru wskazanej w nagłówku If-None-Match /
+             If-Modified-Since
+        400: Brak wymaganego parametru 'code' lub nieprawidłowy kod
         404: Lek nie został znaleziony
+        503: API URPL niedostępne i brak danych w cache
     """
+    started = time.perf_counter()
     scanned_code = request.GET.get('code')
 
     if not scanned_code:
@@ -85,58 +196,170 @@ def scan_code(request):
             'error': 'Nie podano kodu'
         }, status=400)
 
-    code_type = identify_code_type(scanned_code)
-
-    # Wyszukiwanie w bazie URPL
-    drug_data = PolishMedicinesAPI.search_drug(scanned_code)
-
-    if drug_data and drug_data.get('content') and len(drug_data['content']) > 0:
-        # Pobieramy pierwszy lek z listy content
-        medicine = drug_data['content'][0]
-
-        resp = Response({
-            'found': True,
-            'drug': {
-                'name': medicine.get('medicinalProductName'),
-                'common_name': medicine.get('commonName'),
-                'power': medicine.get('medicinalProductPower'),
-                'form': medicine.get('pharmaceuticalFormName'),
-                'package_size': None,  # brak w odpowiedzi API
-                'marketing_authorization_holder': medicine.get('subjectMedicinalProductName'),
-                'marketing_authorization_number': medicine.get('registryNumber'),
-                'active_substance': medicine.get('activeSubstanceName'),
-                'code_info': {
-                    'value': scanned_code,
-                    'type': code_type
-                },
-                # Dodatkowe pola z API
-                'atc_code': medicine.get('atcCode'),
-                'expiration_date': medicine.get('expirationDateString'),
-                'procedure_type': medicine.get('procedureTypeName'),
-                'specimen_type': medicine.get('specimenType')
-            }
-        })
-        print(resp)
-        return resp
-    else:
-        return Response({
-            'found': False,
-            'scanned_code': scanned_code,
-            'identified_type': code_type
-        }, status=404)
+    scanned = parse_code(scanned_code)
+    snapshot = registry_snapshot()
+
+    # Powtórny skan kodu z lokalnego rejestru kończy się odpowiedzią 304
+    # przed wyszukiwaniem leku i budową odpowiedzi
+    if scanned.is_valid and is_conditional_request(request):
+        response = indexed_not_modified(request, snapshot, scanned, get_gtin_index(), started)
+        if response is not None:
+            return response
+
+    # Kody GS1 wymagają uzupełnienia informacji o kodzie, więc gotowy
+    # dokument wysyłamy tylko dla zwykłych kodów GTIN
+    if scanned.is_valid and not scanned.is_gs1:
+        document = find_scan_document(scanned.gtin)
+        if document is not None:
+            return registry_scan_response(
+                request, snapshot, scanned, started,
+                lambda: HttpResponse(document, content_type='application/json'),
+            )
+
+    # Kody z błędną cyfrą kontrolną odrzucamy bez wyszukiwania
+    lookup = None
+    if scanned.is_valid:
+        # Wyszukiwanie w lokalnym rejestrze, a w razie braku w bazie URPL
+        lookup = resolve_code(scanned.gtin, scanned.code_type)
+
+    if lookup and lookup.tier == 'local':
+        return registry_scan_response(request, snapshot, scanned, started, lambda: Response(*scan_result(scanned, lookup)))
+
+    body, status = scan_result(scanned, lookup)
+    record_scan_result(scanned, lookup, time.perf_counter() - started)
+    response = Response(body, status=status)
+    if lookup and lookup.stale:
+        # Dane zwrócone podczas awarii API URPL nie mogą trafić do cache klienta
+        add_never_cache_headers(response)
+    return response
+
+
+@require_GET
+async def scan_code_async(request):
+    """
+    Asynchroniczna wersja endpointu scan_code dla serwera ASGI.
+
+    Zwraca odpowiedź w tym samym formacie co scan_code. Oczekiwanie na
+    bazę danych i API URPL nie blokuje wątku workera, dzięki czemu jeden
+    worker ASGI obsługuje wiele skanów jednocześnie.
+
+    Args:
+        request (HttpRequest): Obiekt żądania HTTP zawierający parametr 'code'
+            w query string
+
+    Returns:
+        JsonResponse: Odpowiedź w formacie JSON
+
+    Status codes:
+        200: Sukces - lek znaleziony
+        304: Lek z lokalnego rejestru, a odpowiedź nie zmieniła się od wersji
+             rejestru wskazanej w żądaniu
+        400: Brak wymaganego parametru 'code' lub nieprawidłowy kod
+        404: Lek nie został znaleziony
+        405: Niedozwolona metoda HTTP
+        503: API URPL niedostępne i brak danych w cache
+    """
+    started = time.perf_counter()
+    scanned_code = request.GET.get('code')
+
+    if not scanned_code:
+        return JsonResponse({
+            'error': 'Nie podano kodu'
+        }, status=400, json_dumps_params={'ensure_ascii': False})
+
+    scanned = parse_code(scanned_code)
+    snapshot = await aregistry_snapshot()
+
+    if scanned.is_valid and is_conditional_request(request):
+        response = indexed_not_modified(request, snapshot, scanned, await aget_gtin_index(), started)
+        if response is not None:
+            return response
+
+    if scanned.is_valid and not scanned.is_gs1:
+        document = await afind_scan_document(scanned.gtin)
+        if document is not None:
+            return registry_scan_response(
+                request, snapshot, scanned, started,
+                lambda: HttpResponse(document, content_type='application/json'),
+            )
+
+    lookup = None
+    if scanned.is_valid:
+        lookup = await aresolve_code(scanned.gtin, scanned.code_type)
+
+    if lookup and lookup.tier == 'local':
+        def build_response():
+            body, status = scan_result(scanned, lookup)
+            return JsonResponse(body, status=status, json_dumps_params={'ensure_ascii': False})
+        return registry_scan_response(request, snapshot, scanned, started, build_response)
+
+    body, status = scan_result(scanned, lookup)
+    record_scan_result(scanned, lookup, time.perf_counter() - started)
+    response = JsonResponse(body, status=status, json_dumps_params={'ensure_ascii': False})
+    if lookup and lookup.stale:
+        add_never_cache_headers(response)
+    return response
+
+
+@api_view(['POST'])
+def scan_batch(request):
+    """
+    Endpoint do wyszukiwania leków dla wielu zeskanowanych kodów naraz.
+
+    Przyjmuje listę kodów w polu 'codes' treści żądania i zwraca wyniki
+    dla każdego kodu w formacie odpowiedzi endpointu scan_code, w kolejności
+    kodów z żądania. Trafienia w lokalnym rejestrze są pobierane jednym
+    zapytaniem, a pozostałe kody wyszukiwane w API URPL współbieżnie.
+
+    Args:
+        request (HttpRequest): Obiekt żądania HTTP z treścią
+            {"codes": ["05909990840229", ...]}
+
+    Returns:
+        Response: Odpowiedź REST framework zawierająca listę 'results'
+
+    Status codes:
+        200: Sukces - wyniki dla wszystkich kodów
+        400: Brak lub nieprawidłowa lista kodów
+    """
+    started = time.perf_counter()
+    serializer = ScanBatchRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+
+    scanned_codes = [parse_code(code) for code in serializer.validated_data['codes']]
+    lookups = iter(resolve_codes([
+        (scanned.gtin, scanned.code_type)
+        for scanned in scanned_codes if scanned.is_valid
+    ]))
+
+    results = []
+    scans = []
+    for scanned in scanned_codes:
+        lookup = next(lookups) if scanned.is_valid else None
+        results.append(scan_result(scanned, lookup)[0])
+        scans.append((scanned, lookup))
+
+    # Każdy kod z paczki jest rejestrowany z czasem obsługi całego żądania
+    latency = time.perf_counter() - started
+    for scanned, lookup in scans:
+        record_scan_result(scanned, lookup, latency)
+
+    return Response({'results': results})
+
 
 def identify_code_type(code):
     """
     Identyfikuje typ kodu na podstawie jego formatu.
 
-    Obecnie wszystkie kody są traktowane jako GTIN (Global Trade Item Number).
-    W przyszłości funkcja może zostać rozszerzona o rozpoznawanie innych
-    typów kodów.
+    Kody GTIN/EAN z poprawną cyfrą kontrolną oraz kody GS1 DataMatrix
+    zawierające GTIN (AI 01) są rozpoznawane jako 'GTIN', pozostałe
+    jako 'OTHER'. Szczegóły analizy kodu udostępnia api.codes.parse_code.
 
     Args:
         code (str): Zeskanowany kod do zidentyfikowania
 
     Returns:
-        str: Typ kodu - obecnie zawsze zwraca 'GTIN'
+        str: Typ kodu - 'GTIN' lub 'OTHER'
     """
-    return 'GTIN'
+    return parse_code(code).code_type
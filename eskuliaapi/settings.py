@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'api.apps.ApiConfig',
     'rest_framework',
     'chatbot',
@@ -147,11 +148,170 @@ DATABASES = {
     }
 }
 
+# Cache współdzielony przez wszystkie workery. Domyślnie tabela w bazie danych
+# (wymaga jednorazowego `python manage.py createcachetable`), a przy ustawionej
+# zmiennej REDIS_URL - Redis.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'rpl': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    } if os.getenv('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'rpl_cache',
+    },
+}
+
+# Cache wyników wyszukiwania leków w API Rejestru Produktów Leczniczych
+# (czasy życia w sekundach)
+RPL_CACHE = {
+    'LOCAL_MAXSIZE': int(os.getenv('RPL_CACHE_LOCAL_MAXSIZE', 4096)),
+    'LOCAL_TTL': int(os.getenv('RPL_CACHE_LOCAL_TTL', 300)),
+    'SHARED_TTL': int(os.getenv('RPL_CACHE_SHARED_TTL', 60 * 60 * 24)),
+    'NEGATIVE_TTL': int(os.getenv('RPL_CACHE_NEGATIVE_TTL', 60 * 60)),
+    # Jak długo nieaktualne wpisy mogą być zwracane podczas awarii API rejestru
+    'STALE_TTL': int(os.getenv('RPL_CACHE_STALE_TTL', 60 * 60 * 24 * 7)),
+    'SHARED_ALIAS': 'rpl',
+}
+# Łączenie współbieżnych zapytań o ten sam kod (czasy w sekundach). Blokada
+# między workerami musi żyć dłużej niż najdłuższe zapytanie do API.
+RPL_SINGLEFLIGHT = {
+    'LOCK_TTL': 30,
+    'WAIT_TIMEOUT': 10,
+    'POLL_INTERVAL': 0.05,
+    'SHARED_ALIAS': 'rpl',
+}
+
+# Indeks GTIN lokalnego rejestru mapowany do pamięci przez workery. Plik jest
+# przebudowywany po każdej synchronizacji rejestru; zmiana pliku jest
+# sprawdzana co CHECK_INTERVAL sekund.
+RPL_GTIN_INDEX = {
+    'PATH': os.getenv('RPL_GTIN_INDEX_PATH', BASE_DIR / 'gtin_index.bin'),
+    'CHECK_INTERVAL': 1,
+}
+
+# Wyszukiwanie leków po nazwie: domyślny i maksymalny rozmiar strony wyników
+# oraz sposób liczenia podobieństwa trigramowego - 'postgres' (pg_trgm) lub
+# 'numpy' (w pamięci workera); SIMILARITY_THRESHOLD dotyczy wyszukiwania
+# w pamięci i powinien odpowiadać pg_trgm.similarity_threshold bazy;
+# CACHE_SIZE to liczba stron wyników zapamiętywanych w cache LRU workera
+RPL_NAME_SEARCH = {
+    'PAGE_SIZE': 20,
+    'MAX_PAGE_SIZE': 50,
+    'BACKEND': os.getenv('RPL_NAME_SEARCH_BACKEND', 'postgres'),
+    'SIMILARITY_THRESHOLD': 0.3,
+    'CACHE_SIZE': 1000,
+}
+
+# Podpowiedzi nazw leków z indeksu w pamięci procesu: domyślna i maksymalna
+# liczba podpowiedzi oraz liczba pasujących nazw, od której podpowiedzi dla
+# prefiksu są wyznaczane podczas budowy indeksu
+RPL_AUTOCOMPLETE = {
+    'LIMIT': 10,
+    'MAX_LIMIT': 25,
+    'PRECOMPUTE_THRESHOLD': 128,
+}
+
+# Przeglądanie rejestru z filtrami: maksymalna liczba wartości pola
+# zwracanych z liczbą leków
+RPL_FACETS = {
+    'VALUE_LIMIT': 50,
+}
+
+# Wersja rejestru dla nagłówków ETag / Last-Modified odpowiedzi skanowania
+# i wyszukiwania po nazwie: wersja jest sprawdzana w bazie co CHECK_INTERVAL
+# sekund, a odpowiedzi mogą być przechowywane w cache przez MAX_AGE sekund
+RPL_SNAPSHOT = {
+    'CHECK_INTERVAL': 5,
+    'MAX_AGE': int(os.getenv('RPL_SNAPSHOT_MAX_AGE', 3600)),
+}
+
+# Leki zapisane z API rejestru: okno świeżości (w sekundach), po którym
+# skan ponownie odpytuje API, oraz liczba leków odświeżanych przez
+# jedno uruchomienie komendy refresh_drugs
+DRUG_STORE = {
+    'FRESHNESS': 60 * 60 * 24 * 7,
+    'REFRESH_BATCH': 500,
+}
+
+# Wyłącznik awaryjny API rejestru: liczba kolejnych błędów otwierająca
+# wyłącznik oraz czas (w sekundach) do zapytania próbnego
+RPL_CIRCUIT_BREAKER = {
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 30,
+}
+
+# Zapytania zabezpieczające (hedged requests) do API rejestru: drugie
+# zapytanie jest wysyłane, gdy odpowiedź nie nadeszła w czasie PERCENTILE
+# ostatnich WINDOW opóźnień; MAX_HEDGE_RATIO ogranicza udział dodatkowych
+# zapytań w ruchu do API
+RPL_HEDGING = {
+    'ENABLED': os.getenv('RPL_HEDGING_ENABLED', 'true').lower() == 'true',
+    'PERCENTILE': 95,
+    'MAX_HEDGE_RATIO': 0.05,
+    'MAX_BURST': 5,
+    'MIN_SAMPLES': 20,
+    'WINDOW': 500,
+    'MIN_DELAY': 0.05,
+    'MAX_WORKERS': 16,
+}
+
+# Wspólny dla workerów serwera ogranicznik zapytań do API rejestru: limit
+# zapytań w toku, tempo (żetony na sekundę) z dopuszczalną serią oraz czas
+# oczekiwania w kolejce (w sekundach). Stan jest przechowywany w plikach
+# w katalogu STATE_DIR, wspólnym dla wszystkich procesów.
+RPL_GOVERNOR = {
+    'ENABLED': True,
+    'STATE_DIR': os.getenv('RPL_GOVERNOR_STATE_DIR', BASE_DIR / '.rpl_governor'),
+    'MAX_IN_FLIGHT': int(os.getenv('RPL_GOVERNOR_MAX_IN_FLIGHT', 8)),
+    'RATE': float(os.getenv('RPL_GOVERNOR_RATE', 20)),
+    'BURST': 20,
+    'QUEUE_TIMEOUT': 5,
+    'POLL_INTERVAL': 0.02,
+}
+
+# Wsadowe skanowanie kodów: maksymalna liczba kodów w żądaniu oraz liczba
+# równoległych zapytań do API rejestru
+SCAN_BATCH = {
+    'MAX_CODES': 100,
+    'MAX_WORKERS': 8,
+}
+
+# Dziennik skanowań: zdarzenia są zapisywane hurtowo przez wątek w tle co
+# FLUSH_INTERVAL sekund lub po zebraniu BATCH_SIZE zdarzeń; po synchronizacji
+# rejestru cache jest zapełniany WARM_TOP_CODES najczęściej skanowanymi kodami
+# z ostatnich WARM_WINDOW_DAYS dni
+SCAN_EVENTS = {
+    'ENABLED': os.getenv('SCAN_EVENTS_ENABLED', 'true').lower() == 'true',
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 2,
+    'MAX_BUFFER': 10000,
+    'WARM_TOP_CODES': int(os.getenv('SCAN_EVENTS_WARM_TOP_CODES', 500)),
+    'WARM_WINDOW_DAYS': 7,
+}
+
+# Klient HTTP dla API Rejestru Produktów Leczniczych (limity czasu w sekundach)
+RPL_HTTP = {
+    'POOL_SIZE': int(os.getenv('RPL_HTTP_POOL_SIZE', 10)),
+    'CONNECT_TIMEOUT': float(os.getenv('RPL_HTTP_CONNECT_TIMEOUT', 3.05)),
+    'READ_TIMEOUT': float(os.getenv('RPL_HTTP_READ_TIMEOUT', 10)),
+    'DOWNLOAD_READ_TIMEOUT': float(os.getenv('RPL_HTTP_DOWNLOAD_READ_TIMEOUT', 300)),
+    # Maksymalny czas oczekiwania pobierania CSV na slot puli pobierania
+    'DOWNLOAD_QUEUE_TIMEOUT': 600,
+    'RETRIES': int(os.getenv('RPL_HTTP_RETRIES', 2)),
+    'BACKOFF_FACTOR': 0.3,
+    'RETRY_STATUSES': (502, 503, 504),
+}
+
 
 # Zdefiniowanie zaplanowanych zadań cron
 CRONJOBS = [
     # Zadanie uruchamiane codziennie o północy
     ('0 0 * * *', 'eskulia-api.cron.my_scheduled_job'),
+    # Odświeżanie nieaktualnych leków zapisanych z API rejestru
+    ('30 3 * * *', 'api.drug_store.refresh_stale_drugs'),
 ]
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
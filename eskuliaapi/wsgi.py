@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eskuliaapi.settings')
 
 application = get_wsgi_application()
+
+# Indeks podpowiedzi nazw leków jest budowany w tle przy starcie workera,
+# zanim trafi do niego pierwsze żądanie
+from sync_rpl.autocomplete import warm_autocomplete_index  # noqa: E402
+
+warm_autocomplete_index()
@@ -26,4 +26,18 @@ class SyncRplConfig(AppConfig):
         ...     # inne aplikacje
         ... ]
     """
-    name = 'sync_rpl'  
+    name = 'sync_rpl'
+
+    def ready(self):
+        """
+        Podłącza budowę indeksu GTIN, indeksu podpowiedzi i czyszczenie cache
+        wyszukiwania po nazwie do sygnału synchronizacji rejestru.
+        """
+        from .autocomplete import warm_autocomplete_index
+        from .gtin_index import rebuild_gtin_index
+        from .query_cache import clear_name_search_cache
+        from .signals import registry_synced
+
+        registry_synced.connect(rebuild_gtin_index, dispatch_uid='sync_rpl.rebuild_gtin_index')
+        registry_synced.connect(clear_name_search_cache, dispatch_uid='sync_rpl.clear_name_search_cache')
+        registry_synced.connect(warm_autocomplete_index, dispatch_uid='sync_rpl.warm_autocomplete_index')
@@ -0,0 +1,204 @@
+"""
+Moduł drzewa klasyfikacji ATC lokalnej kopii rejestru.
+
+Kod ATC ma pięć poziomów: grupa anatomiczna (J), terapeutyczna (J05),
+farmakologiczna (J05A), chemiczna (J05AB) i substancja chemiczna
+(J05AB01). Podczas synchronizacji rejestru, w transakcji importu, tabela
+AtcNode jest przebudowywana z jednego zapytania grupującego leki według
+kodu ATC: każda grupa zawiera liczbę leków w całym poddrzewie
+(medicine_count) i liczbę leków z kodem równym kodowi grupy
+(direct_count). Leki bez kodu lub z kodem niezgodnym z formatem ATC nie są
+uwzględniane.
+
+Żądania przeglądania drzewa są obsługiwane z kopii drzewa w pamięci procesu
+(słownik grup z listami podgrup), przebudowywanej po zmianie wersji
+rejestru (sync_rpl.snapshot), więc przejście o poziom niżej nie wymaga
+zapytań do bazy danych niezależnie od wielkości rejestru.
+"""
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from django.db.models import Count
+
+from .models import AtcNode, Medicine
+from .snapshot import RegistryDerived
+
+# Długości kodów kolejnych poziomów klasyfikacji
+ATC_LEVEL_LENGTHS = (1, 3, 4, 5, 7)
+
+# Kod ATC dowolnego poziomu, np. J, J05, J05A, J05AB, J05AB01
+ATC_CODE = re.compile(r'[A-Z](?:[0-9]{2}(?:[A-Z](?:[A-Z](?:[0-9]{2})?)?)?)?')
+
+ATC_NODE_BATCH_SIZE = 5000
+
+
+def atc_prefixes(code: str) -> List[str]:
+    """
+    Zwraca kody grup ATC wszystkich poziomów, do których należy kod.
+
+    Args:
+        code (str): Kod ATC
+
+    Returns:
+        List[str]: Kody grup od 1. poziomu do poziomu kodu lub pusta lista,
+            gdy kod ma nieprawidłowy format
+
+    Example:
+        >>> atc_prefixes('J05AB01')
+        ['J', 'J05', 'J05A', 'J05AB', 'J05AB01']
+    """
+    if not code or not ATC_CODE.fullmatch(code):
+        return []
+    return [code[:length] for length in ATC_LEVEL_LENGTHS if length <= len(code)]
+
+
+def rebuild_atc_nodes() -> int:
+    """
+    Przebudowuje tabelę AtcNode z kodów ATC leków.
+
+    Wywoływana podczas synchronizacji rejestru, w transakcji importu.
+
+    Returns:
+        int: Liczba zapisanych grup ATC
+    """
+    direct = Counter()
+    totals = Counter()
+    codes = Medicine.objects.order_by().values_list('atc_code').annotate(count=Count('id'))
+    for code, count in codes:
+        prefixes = atc_prefixes(code)
+        if not prefixes:
+            continue
+        direct[code] += count
+        for prefix in prefixes:
+            totals[prefix] += count
+
+    # Tabela jest usuwana w całości jednym zapytaniem (parent bez kaskady
+    # po stronie Django), a ograniczenia kluczy obcych są sprawdzane przy
+    # zatwierdzeniu transakcji
+    AtcNode.objects.all().delete()
+    # Kolejność według długości kodu zapisuje grupy nadrzędne przed podgrupami
+    nodes = [
+        AtcNode(
+            code=code,
+            level=ATC_LEVEL_LENGTHS.index(len(code)) + 1,
+            parent_id=atc_prefixes(code)[-2] if len(code) > 1 else None,
+            medicine_count=count,
+            direct_count=direct[code],
+        )
+        for code, count in sorted(totals.items(), key=lambda item: (len(item[0]), item[0]))
+    ]
+    AtcNode.objects.bulk_create(nodes, batch_size=ATC_NODE_BATCH_SIZE)
+    return len(nodes)
+
+
+class AtcGroup(NamedTuple):
+    """
+    Grupa ATC w drzewie w pamięci procesu.
+
+    Attributes:
+        code (str): Kod grupy
+        level (int): Poziom klasyfikacji od 1 do 5
+        parent (Optional[str]): Kod grupy nadrzędnej
+        medicine_count (int): Liczba leków w grupie i jej podgrupach
+        direct_count (int): Liczba leków z kodem ATC równym kodowi grupy
+        children (Tuple[str, ...]): Kody podgrup w kolejności alfabetycznej
+    """
+    code: str
+    level: int
+    parent: Optional[str]
+    medicine_count: int
+    direct_count: int
+    children: Tuple[str, ...]
+
+    def summary(self) -> dict:
+        """
+        Zwraca opis grupy bez listy podgrup.
+
+        Returns:
+            dict: Kod, poziom i liczby leków grupy
+        """
+        return {
+            'code': self.code,
+            'level': self.level,
+            'medicine_count': self.medicine_count,
+            'direct_count': self.direct_count,
+        }
+
+
+class AtcTree:
+    """
+    Drzewo klasyfikacji ATC z liczbą leków w grupach.
+
+    Attributes:
+        version (Optional[str]): Wersja rejestru, z której zbudowano drzewo
+        roots (Tuple[str, ...]): Kody grup 1. poziomu
+    """
+    def __init__(self, rows: List[Tuple[str, int, Optional[str], int, int]], version: Optional[str] = None):
+        """
+        Buduje drzewo.
+
+        Args:
+            rows (List[Tuple[str, int, Optional[str], int, int]]): Grupy ATC
+                (kod, poziom, kod grupy nadrzędnej, liczba leków w poddrzewie,
+                liczba leków z kodem grupy) w kolejności alfabetycznej kodów
+            version (Optional[str]): Wersja rejestru
+        """
+        self.version = version
+        children: Dict[Optional[str], List[str]] = {}
+        for code, _, parent, _, _ in rows:
+            children.setdefault(parent, []).append(code)
+        self._groups: Dict[str, AtcGroup] = {
+            code: AtcGroup(code, level, parent, medicine_count, direct_count, tuple(children.get(code, ())))
+            for code, level, parent, medicine_count, direct_count in rows
+        }
+        self.roots = tuple(children.get(None, ()))
+
+    @classmethod
+    def from_database(cls, version: Optional[str] = None) -> 'AtcTree':
+        """
+        Buduje drzewo z tabeli AtcNode.
+
+        Args:
+            version (Optional[str]): Wersja rejestru
+
+        Returns:
+            AtcTree: Zbudowane drzewo
+        """
+        rows = AtcNode.objects.order_by('code') \
+            .values_list('code', 'level', 'parent_id', 'medicine_count', 'direct_count')
+        return cls(list(rows), version)
+
+    def get(self, code: str) -> Optional[AtcGroup]:
+        """
+        Zwraca grupę ATC.
+
+        Args:
+            code (str): Kod grupy (wielkość liter nie ma znaczenia)
+
+        Returns:
+            Optional[AtcGroup]: Grupa lub None, gdy nie ma w niej leków
+        """
+        return self._groups.get(code.strip().upper())
+
+    def children(self, code: Optional[str] = None) -> List[AtcGroup]:
+        """
+        Zwraca podgrupy grupy ATC.
+
+        Args:
+            code (Optional[str]): Kod grupy; bez kodu zwracane są grupy
+                1. poziomu
+
+        Returns:
+            List[AtcGroup]: Podgrupy w kolejności alfabetycznej
+        """
+        if code is None:
+            return [self._groups[root] for root in self.roots]
+        group = self.get(code)
+        return [self._groups[child] for child in group.children] if group else []
+
+    def __len__(self):
+        return len(self._groups)
+
+
+atc_tree = RegistryDerived('atc-tree', lambda version: AtcTree.from_database(version))
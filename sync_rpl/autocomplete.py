@@ -0,0 +1,251 @@
+"""
+Moduł podpowiedzi nazw leków (autocomplete) z indeksu w pamięci procesu.
+
+Indeks zawiera nazwy handlowe i powszechne leków z lokalnej kopii rejestru.
+Klucze są znormalizowane funkcją fold_text (bez znaków diakrytycznych,
+małymi literami), a każda nazwa jest indeksowana od początku każdego słowa,
+więc "zel" podpowiada "Ibuprom Żel". Podpowiedzi są uporządkowane według
+liczby leków o danej nazwie, a następnie długości i alfabetycznie.
+
+Klucze są przechowywane w posortowanej liście i wyszukiwane binarnie.
+Dla prefiksów pasujących do wielu kluczy (co najmniej
+RPL_AUTOCOMPLETE['PRECOMPUTE_THRESHOLD'], np. jedno- i dwuliterowych)
+najlepsze podpowiedzi są wyznaczane podczas budowy indeksu, więc żadne
+wyszukiwanie nie przegląda więcej kluczy niż ten próg. Wyszukiwanie nie
+wykonuje zapytań do bazy danych.
+
+Indeks jest budowany w wątku w tle przy starcie serwera (eskuliaapi.wsgi,
+eskuliaapi.asgi) i po synchronizacji rejestru (sygnał registry_synced),
+a w pozostałych procesach - po wykryciu zmiany wersji rejestru
+(sync_rpl.snapshot); do czasu zakończenia przebudowy podpowiedzi pochodzą
+z poprzedniego indeksu. Wersja rejestru w nagłówkach ETag i Last-Modified
+odpowiedzi pochodzi z indeksu, więc obsługa żądania nie wykonuje zapytań do
+bazy danych. Przed zbudowaniem pierwszego indeksu podpowiedzi nie są
+dostępne (AutocompleteNotReady).
+"""
+import bisect
+import heapq
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+from .models import Medicine
+from .snapshot import RegistryDerived, RegistrySnapshot
+from .text import fold_text
+
+DEFAULT_AUTOCOMPLETE_SETTINGS = {
+    'LIMIT': 10,
+    'MAX_LIMIT': 25,
+    'PRECOMPUTE_THRESHOLD': 128,
+}
+
+# Początki słów w znormalizowanej nazwie
+WORD_START = re.compile(r'(?<![0-9a-z])[0-9a-z]')
+
+
+def get_autocomplete_settings() -> dict:
+    """
+    Zwraca ustawienia podpowiedzi uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z RPL_AUTOCOMPLETE nałożone na DEFAULT_AUTOCOMPLETE_SETTINGS
+    """
+    return {**DEFAULT_AUTOCOMPLETE_SETTINGS, **getattr(settings, 'RPL_AUTOCOMPLETE', {})}
+
+
+class AutocompleteNotReady(Exception):
+    """
+    Wyjątek zgłaszany, gdy indeks podpowiedzi nie został jeszcze zbudowany.
+    """
+
+
+class Completion(NamedTuple):
+    """
+    Pojedyncza podpowiedź.
+
+    Attributes:
+        text (str): Nazwa w oryginalnej postaci
+        field (str): Pole modelu Medicine - 'name' lub 'common_name'
+        count (int): Liczba leków o tej nazwie
+    """
+    text: str
+    field: str
+    count: int
+
+
+class PrefixIndex:
+    """
+    Indeks prefiksowy nazw leków.
+
+    Attributes:
+        version (Optional[str]): Wersja rejestru, z której zbudowano indeks
+        max_limit (int): Maksymalna liczba podpowiedzi w odpowiedzi
+        threshold (int): Liczba pasujących kluczy, od której podpowiedzi
+            dla prefiksu są wyznaczane podczas budowy indeksu
+    """
+    def __init__(self, counts: Dict[Tuple[str, str], int], max_limit: int, threshold: int,
+                 version: Optional[str] = None):
+        """
+        Buduje indeks.
+
+        Args:
+            counts (Dict[Tuple[str, str], int]): Liczba leków według pary
+                (nazwa, pole modelu)
+            max_limit (int): Maksymalna liczba podpowiedzi w odpowiedzi
+            threshold (int): Liczba pasujących kluczy, od której podpowiedzi
+                dla prefiksu są wyznaczane podczas budowy indeksu
+            version (Optional[str]): Wersja rejestru
+        """
+        self.version = version
+        self.max_limit = max_limit
+        self.threshold = threshold
+        # Pozycja podpowiedzi na liście jest jednocześnie jej rangą
+        self._completions = sorted(
+            (Completion(text, field, count) for (text, field), count in counts.items()),
+            key=lambda completion: (-completion.count, len(completion.text), completion.text)
+        )
+
+        entries = []
+        for rank, completion in enumerate(self._completions):
+            folded = fold_text(completion.text)
+            for match in WORD_START.finditer(folded):
+                entries.append((folded[match.start():], rank))
+        entries.sort()
+        self._keys = [key for key, _ in entries]
+        self._ranks = [rank for _, rank in entries]
+        self._top = self._precompute()
+
+    def _precompute(self) -> Dict[str, List[int]]:
+        # Przedziały kluczy o wspólnym prefiksie są dzielone coraz dłuższymi
+        # prefiksami, dopóki liczą co najmniej threshold kluczy
+        top = {}
+        pending = [(0, len(self._keys))]
+        length = 1
+        while pending:
+            next_pending = []
+            for low, high in pending:
+                start = low
+                while start < high:
+                    if len(self._keys[start]) < length:
+                        start += 1
+                        continue
+                    prefix = self._keys[start][:length]
+                    end = bisect.bisect_left(self._keys, prefix + '\uffff', start, high)
+                    if end - start >= self.threshold:
+                        top[prefix] = heapq.nsmallest(self.max_limit, set(self._ranks[start:end]))
+                        next_pending.append((start, end))
+                    start = end
+            pending = next_pending
+            length += 1
+        return top
+
+    @classmethod
+    def from_database(cls, version: Optional[str] = None) -> 'PrefixIndex':
+        """
+        Buduje indeks z lokalnej kopii rejestru.
+
+        Args:
+            version (Optional[str]): Wersja rejestru
+
+        Returns:
+            PrefixIndex: Zbudowany indeks
+        """
+        config = get_autocomplete_settings()
+        counts = Counter()
+        rows = Medicine.objects.values_list('name', 'common_name')
+        for name, common_name in rows.iterator(chunk_size=5000):
+            for text, field in ((name, 'name'), (common_name, 'common_name')):
+                text = (text or '').strip()
+                if text:
+                    counts[(text, field)] += 1
+        return cls(counts, config['MAX_LIMIT'], config['PRECOMPUTE_THRESHOLD'], version)
+
+    def complete(self, prefix: str, limit: int) -> List[Completion]:
+        """
+        Zwraca najlepsze podpowiedzi dla prefiksu.
+
+        Args:
+            prefix (str): Wpisany tekst
+            limit (int): Liczba podpowiedzi (najwyżej max_limit)
+
+        Returns:
+            List[Completion]: Podpowiedzi od najlepszej
+        """
+        key = fold_text(prefix)
+        if not key:
+            return []
+        limit = min(limit, self.max_limit)
+        ranks = self._top.get(key)
+        if ranks is not None:
+            ranks = ranks[:limit]
+        else:
+            low = bisect.bisect_left(self._keys, key)
+            high = bisect.bisect_left(self._keys, key + '\uffff', low)
+            ranks = heapq.nsmallest(limit, set(self._ranks[low:high]))
+        return [self._completions[rank] for rank in ranks]
+
+    def __len__(self):
+        return len(self._completions)
+
+
+autocomplete_index = RegistryDerived('autocomplete-index', lambda version: PrefixIndex.from_database(version))
+
+
+def get_autocomplete_index() -> Optional[PrefixIndex]:
+    """
+    Zwraca indeks podpowiedzi bieżącego procesu bez oczekiwania na jego
+    budowę.
+
+    Returns:
+        Optional[PrefixIndex]: Indeks podpowiedzi lub None, gdy jest
+            dopiero budowany
+    """
+    return autocomplete_index.get(wait=False)
+
+
+def autocomplete_snapshot() -> Optional[RegistrySnapshot]:
+    """
+    Zwraca wersję rejestru, z której zbudowano indeks podpowiedzi.
+
+    Returns:
+        Optional[RegistrySnapshot]: Wersja rejestru lub None, gdy indeks nie
+            jest jeszcze gotowy
+    """
+    return autocomplete_index.snapshot
+
+
+def warm_autocomplete_index(sender=None, **kwargs) -> None:
+    """
+    Uruchamia w tle budowę indeksu podpowiedzi dla bieżącej wersji rejestru.
+
+    Wywoływana przy starcie serwera oraz jako odbiornik sygnału
+    sync_rpl.signals.registry_synced.
+
+    Args:
+        sender: Nadawca sygnału
+        **kwargs: Pozostałe argumenty sygnału
+    """
+    autocomplete_index.refresh(reload=True)
+
+
+def autocomplete(prefix: str, limit: Optional[int] = None) -> List[Completion]:
+    """
+    Zwraca podpowiedzi nazw leków dla wpisanego tekstu.
+
+    Args:
+        prefix (str): Wpisany tekst
+        limit (Optional[int]): Liczba podpowiedzi, domyślnie
+            RPL_AUTOCOMPLETE['LIMIT'], najwyżej RPL_AUTOCOMPLETE['MAX_LIMIT']
+
+    Returns:
+        List[Completion]: Podpowiedzi od najlepszej
+
+    Raises:
+        AutocompleteNotReady: Gdy indeks podpowiedzi jest dopiero budowany
+    """
+    index = get_autocomplete_index()
+    if index is None:
+        raise AutocompleteNotReady('Indeks podpowiedzi jest w trakcie budowy.')
+    return index.complete(prefix, limit or get_autocomplete_settings()['LIMIT'])
@@ -7,11 +7,19 @@ synchronizację danych o lekach, włączając ich identyfikatory, nazwy,
 składniki aktywne i inne istotne informacje.
 """
 import os
-import requests
+import time
 import pandas as pd
 import django
 import sys
-from .models import Medicine
+from django.db import transaction
+from api.drug_api import rpl_download_governor
+from api.http_client import get_http_settings, get_session, get_timeout
+from .atc import rebuild_atc_nodes
+from .equivalence import equivalence_class
+from .models import Medicine, MedicinePackage
+from .packaging import parse_packaging
+from .search import update_search_documents
+from .signals import registry_synced
 
 
 # sys.path.append('/Users/wiktoriapabis/Desktop/Projekt_grupowy/eskulia-api')
@@ -43,16 +51,30 @@ def download_csv(url):
 
     Notes:
         - Plik jest zapisywany w bieżącym katalogu jako 'data.csv'
+        - Pobieranie korzysta ze współdzielonej sesji HTTP (api.http_client)
+          z wydłużonym limitem czasu odczytu
+        - Każda próba pobrania zajmuje jedyny slot osobnej puli pobierania
+          i żeton wspólnego ogranicznika zapytań do API rejestru
+          (api.governor), więc wielominutowy transfer nie zajmuje slotów
+          krótkich zapytań o leki, a liczy się do limitu tempa zapytań
         - W przypadku istniejącego pliku zostanie on nadpisany
     """
-    response = requests.get(url)
-    if response.status_code == 200:
-        with open("data.csv", "wb") as f:
-            f.write(response.content)
-        print("Plik CSV został pobrany.")
-        return "data.csv"
-    else:
-        raise Exception(f"Nie udało się pobrać pliku CSV. Kod statusu: {response.status_code}")
+    config = get_http_settings()
+    for attempt in range(config['RETRIES'] + 1):
+        with rpl_download_governor.slot(timeout=config['DOWNLOAD_QUEUE_TIMEOUT']):
+            response = get_session().get(
+                url, stream=True, timeout=get_timeout(config['DOWNLOAD_READ_TIMEOUT'])
+            )
+            if response.status_code == 200:
+                with open("data.csv", "wb") as f:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+                print("Plik CSV został pobrany.")
+                return "data.csv"
+        if response.status_code not in config['RETRY_STATUSES'] or attempt == config['RETRIES']:
+            break
+        time.sleep(config['BACKOFF_FACTOR'] * (2 ** attempt))
+    raise Exception(f"Nie udało się pobrać pliku CSV. Kod statusu: {response.status_code}")
 
 
 def create_table_if_not_exists(csv_file):
@@ -93,24 +115,35 @@ def create_table_if_not_exists(csv_file):
         print(f"Błąd podczas tworzenia tabeli: {e}")
 
 
-def update_database(csv_file):
+def update_database(csv_file, background=False):
     """
     Aktualizuje bazę danych danymi z pliku CSV.
 
     Funkcja czyści obecne rekordy i wprowadza nowe dane z pliku CSV.
-    Wykorzystuje bulk_create dla efektywnego wprowadzania danych.
+    Opis opakowań każdego leku jest dodatkowo rozbijany na rekordy
+    MedicinePackage z indeksowanym kodem GTIN. Wykorzystuje bulk_create
+    dla efektywnego wprowadzania danych.
 
     Args:
         csv_file (str): Ścieżka do pliku CSV z danymi do importu.
+        background (bool): Czy odbiorniki sygnału registry_synced mogą
+            wykonywać pracę w wątkach w tle. Domyślnie False, ponieważ
+            synchronizacja działa jako skrypt lub zadanie cron.
 
     Raises:
         Exception: Gdy wystąpi błąd podczas przetwarzania pliku lub aktualizacji bazy.
 
     Notes:
         - Wszystkie istniejące rekordy są usuwane przed importem
+        - Import odbywa się w jednej transakcji, więc w trakcie synchronizacji
+          widoczna jest poprzednia wersja rejestru
         - Wszystkie wartości są konwertowane na typ string
         - Wykorzystuje bulk_create dla lepszej wydajności
         - Obsługuje brakujące wartości, zastępując je pustymi stringami
+        - Klasy zamienników są wyznaczane podczas tworzenia rekordów leków,
+          a dokumenty wyszukiwania pełnotekstowego i drzewo grup ATC z liczbą
+          leków są przeliczane w tej samej transakcji
+        - Po zatwierdzeniu transakcji wysyłany jest sygnał registry_synced
 
     Example:
         >>> update_database('data.csv')
@@ -121,27 +154,56 @@ def update_database(csv_file):
 
         df = df.astype(str)
 
-        Medicine.objects.all().delete()
-
-        medicine_records = []
-        for _, row in df.iterrows():
-            print(df.head())
-            medicine_records.append(Medicine(
-                identyfikator=row['identyfikator'],
-                nazwa=row['nazwa'],
-                nazwa_powszechna=row.get('nazwa_powszechna', ''),
-                rodzaj_preparatu=row.get('rodzaj_preparatu', ''),
-                droga_podania=row.get('droga_podania', ''),
-                moc=row.get('moc', ''),
-                postac_farmaceutyczna=row.get('postac_farmaceutyczna', ''),
-                kod_atc=row.get('kod_atc', ''),
-                podmiot_odpowiedzialny=row.get('podmiot_odpowiedzialny', ''),
-                substancja_czynna=row.get('substancja_czynna', '')
-            ))
-
-        Medicine.objects.bulk_create(medicine_records)
+        with transaction.atomic():
+            Medicine.objects.all().delete()
+
+            medicine_records = []
+            for _, row in df.iterrows():
+                medicine_records.append(Medicine(
+                    identifier=row['identyfikator'],
+                    name=row['nazwa'],
+                    common_name=row.get('nazwa_powszechna', ''),
+                    preparation_type=row.get('rodzaj_preparatu', ''),
+                    administration_route=row.get('droga_podania', ''),
+                    strength=row.get('moc', ''),
+                    pharmaceutical_form=row.get('postac_farmaceutyczna', ''),
+                    atc_code=row.get('kod_atc', ''),
+                    responsible_entity=row.get('podmiot_odpowiedzialny', ''),
+                    active_substance=row.get('substancja_czynna', ''),
+                    packaging=row.get('opakowanie', ''),
+                    equivalence_class=equivalence_class(
+                        row.get('substancja_czynna', ''), row.get('moc', ''), row.get('postac_farmaceutyczna', '')
+                    )
+                ))
+
+            medicines = Medicine.objects.bulk_create(medicine_records)
+
+            package_records = []
+            seen_gtins = set()
+            for medicine in medicines:
+                for package in parse_packaging(medicine.packaging):
+                    # Ten sam kod GTIN może pojawić się w rejestrze wielokrotnie,
+                    # zachowujemy pierwsze wystąpienie
+                    if package['gtin'] in seen_gtins:
+                        continue
+                    seen_gtins.add(package['gtin'])
+                    package_records.append(MedicinePackage(
+                        medicine=medicine,
+                        gtin=package['gtin'],
+                        pack_size=(package['pack_size'] or '')[:255] or None,
+                        raw_line=package['raw_line']
+                    ))
+
+            MedicinePackage.objects.bulk_create(package_records, batch_size=5000)
+
+            update_search_documents()
+            rebuild_atc_nodes()
 
         print("Baza danych została zaktualizowana.")
+
+        for receiver, result in registry_synced.send_robust(sender=Medicine, background=background):
+            if isinstance(result, Exception):
+                print(f"Błąd podczas przetwarzania zaktualizowanego rejestru: {result}")
     except Exception as e:
         print(f"Błąd podczas aktualizacji bazy danych: {e}")
 
@@ -0,0 +1,149 @@
+"""
+Moduł klas równoważności leków (zamienników).
+
+Zamiennikami są leki o tej samej substancji czynnej, mocy i postaci
+farmaceutycznej. Podczas synchronizacji rejestru każdy lek otrzymuje
+identyfikator klasy równoważności (pole equivalence_class) - skrót
+znormalizowanych wartości tych trzech pól - więc wyszukanie zamienników to
+zapytanie po indeksowanej kolumnie zamiast złączenia tabeli leków samej ze
+sobą po polach tekstowych.
+
+Normalizacja pomija wielkość liter, znaki diakrytyczne i białe znaki oraz
+zapis ułamka dziesiętnego w mocy ("2,5 mg" i "2.5mg" są równoważne).
+W preparatach złożonych moc każdego składnika jest łączona w parę z jego
+substancją przed uporządkowaniem składników, więc kolejność składników nie
+ma znaczenia ("Amlodipinum + Valsartanum", "5 mg + 80 mg" i "Valsartanum +
+Amlodipinum", "80 mg + 5 mg" są równoważne), a przypisanie mocy do
+substancji - ma. Gdy liczba mocy nie odpowiada liczbie składników, pary nie
+da się ustalić i zachowywana jest kolejność z rejestru. Leki bez substancji
+czynnej, mocy lub postaci nie należą do żadnej klasy.
+"""
+import hashlib
+import re
+from typing import List, Optional
+
+from .text import fold_text
+
+# Separatory składników substancji czynnej preparatów złożonych
+SUBSTANCE_SEPARATOR = re.compile(r'\s*(?:\+|;|,|/)\s*')
+
+# Separatory mocy składników preparatów złożonych (ukośnik należy do
+# jednostki, np. 5 mg/ml)
+STRENGTH_SEPARATOR = re.compile(r'\s*(?:\+|;)\s*')
+
+# Przecinek dziesiętny w mocy, np. 2,5 mg
+DECIMAL_COMMA = re.compile(r'(?<=\d),(?=\d)')
+
+# Wartości oznaczające brak danych w pliku rejestru
+MISSING_VALUES = {'', 'nan', 'none', '-'}
+
+
+def substance_components(value: Optional[str]) -> List[str]:
+    """
+    Rozkłada substancję czynną na znormalizowane składniki.
+
+    Args:
+        value (Optional[str]): Substancja czynna z rejestru
+
+    Returns:
+        List[str]: Składniki bez znaków diakrytycznych w kolejności z rejestru
+            lub pusta lista
+
+    Example:
+        >>> substance_components('Paracetamolum + Coffeinum')
+        ['paracetamolum', 'coffeinum']
+    """
+    folded = fold_text(value or '')
+    if folded in MISSING_VALUES:
+        return []
+    return [part for part in SUBSTANCE_SEPARATOR.split(folded) if part]
+
+
+def strength_components(value: Optional[str]) -> List[str]:
+    """
+    Rozkłada moc leku na znormalizowane moce składników.
+
+    Args:
+        value (Optional[str]): Moc z rejestru
+
+    Returns:
+        List[str]: Moce bez białych znaków, z kropką dziesiętną, w kolejności
+            z rejestru lub pusta lista
+
+    Example:
+        >>> strength_components('2,5 mg + 10 mg')
+        ['2.5mg', '10mg']
+    """
+    folded = fold_text(value or '')
+    if folded in MISSING_VALUES:
+        return []
+    folded = DECIMAL_COMMA.sub('.', folded)
+    return [part.replace(' ', '') for part in STRENGTH_SEPARATOR.split(folded) if part]
+
+
+def normalize_composition(active_substance: Optional[str], strength: Optional[str]) -> str:
+    """
+    Normalizuje skład leku (substancje czynne z mocami) do porównania.
+
+    Args:
+        active_substance (Optional[str]): Substancja czynna z rejestru
+        strength (Optional[str]): Moc z rejestru
+
+    Returns:
+        str: Posortowane pary substancja=moc, składniki i moce w kolejności
+            z rejestru, gdy nie da się ich połączyć w pary, lub pusty tekst,
+            gdy brakuje substancji albo mocy
+
+    Example:
+        >>> normalize_composition('Valsartanum + Amlodipinum', '80 mg + 5 mg')
+        'amlodipinum=5mg+valsartanum=80mg'
+    """
+    substances = substance_components(active_substance)
+    strengths = strength_components(strength)
+    if not substances or not strengths:
+        return ''
+    if len(substances) == len(strengths):
+        return '+'.join(sorted(f'{substance}={dose}' for substance, dose in zip(substances, strengths)))
+    return f"{'+'.join(substances)}={'+'.join(strengths)}"
+
+
+def normalize_form(value: Optional[str]) -> str:
+    """
+    Normalizuje postać farmaceutyczną do porównania.
+
+    Args:
+        value (Optional[str]): Postać farmaceutyczna z rejestru
+
+    Returns:
+        str: Postać bez znaków diakrytycznych lub pusty tekst
+    """
+    folded = fold_text(value or '')
+    return '' if folded in MISSING_VALUES else folded
+
+
+def equivalence_class(active_substance: Optional[str], strength: Optional[str],
+                      pharmaceutical_form: Optional[str]) -> Optional[str]:
+    """
+    Wyznacza identyfikator klasy równoważności leku.
+
+    Args:
+        active_substance (Optional[str]): Substancja czynna
+        strength (Optional[str]): Moc
+        pharmaceutical_form (Optional[str]): Postać farmaceutyczna
+
+    Returns:
+        Optional[str]: Identyfikator klasy (40 znaków szesnastkowych) lub
+            None, gdy brakuje którejś z wartości
+
+    Example:
+        >>> equivalence_class('Ibuprofenum', '200 mg', 'tabletki powlekane') \\
+        ...     == equivalence_class('IBUPROFENUM', '200mg', 'Tabletki powlekane')
+        True
+    """
+    parts: List[str] = [
+        normalize_composition(active_substance, strength),
+        normalize_form(pharmaceutical_form),
+    ]
+    if not all(parts):
+        return None
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
@@ -0,0 +1,275 @@
+"""
+Moduł przeglądania rejestru z filtrami i liczbami leków według wartości
+(wyszukiwanie fasetowe).
+
+Filtrowane są pola postaci farmaceutycznej, drogi podania, rodzaju
+preparatu i podmiotu odpowiedzialnego (wartości porównywane po
+normalizacji fold_text) oraz prefiks kodu ATC. Indeks w pamięci procesu
+przechowuje dla każdego pola tablicę NumPy z numerem wartości każdego leku
+(w kolejności identyfikatorów), a dla kodu ATC - po jednej tablicy na
+poziom klasyfikacji. Filtr to maska logiczna porównania tablicy z numerem
+wartości, a liczby leków według wartości to np.bincount po lekach
+spełniających pozostałe filtry, więc żądanie nie wykonuje zapytań COUNT / GROUP BY.
+
+Liczby dla pola są liczone z pominięciem filtra tego pola (wybranie
+wartości nie zeruje liczb pozostałych wartości), a dla kodu ATC - dla
+podgrup poziomu poniżej wybranego prefiksu. Strona wyników to kolejne leki
+maski po identyfikatorze z kursora (keyset pagination), pobierane z bazy
+danych jednym zapytaniem po kluczu głównym.
+
+Indeks jest budowany przy pierwszym użyciu i przebudowywany po zmianie
+wersji rejestru (sync_rpl.snapshot).
+"""
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .atc import ATC_LEVEL_LENGTHS, atc_prefixes
+from .models import Medicine
+from .search import SearchPage, decode_cursor, encode_cursor, page_limit
+from .snapshot import RegistryDerived
+from .text import fold_text
+
+DEFAULT_FACET_SETTINGS = {
+    'VALUE_LIMIT': 50,
+}
+
+FACET_FIELDS = ('pharmaceutical_form', 'administration_route', 'preparation_type', 'responsible_entity')
+
+ATC_FACET = 'atc_code'
+
+# Wartości oznaczające brak danych w pliku rejestru
+MISSING_VALUES = {'', 'nan'}
+
+
+def get_facet_settings() -> dict:
+    """
+    Zwraca ustawienia przeglądania rejestru uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z RPL_FACETS nałożone na DEFAULT_FACET_SETTINGS
+    """
+    return {**DEFAULT_FACET_SETTINGS, **getattr(settings, 'RPL_FACETS', {})}
+
+
+class FacetColumn:
+    """
+    Numery wartości jednego pola dla wszystkich leków.
+
+    Attributes:
+        labels (List[str]): Wartości w oryginalnej postaci (pierwsze wystąpienie)
+        codes (np.ndarray): Numer wartości każdego leku lub -1, gdy brak wartości
+    """
+    def __init__(self, size: int):
+        """
+        Tworzy pustą kolumnę.
+
+        Args:
+            size (int): Liczba leków
+        """
+        self.labels: List[str] = []
+        self.codes = np.full(size, -1, dtype=np.int32)
+        self._numbers: Dict[str, int] = {}
+
+    def add(self, position: int, key: str, label: str) -> None:
+        """
+        Zapisuje wartość leku.
+
+        Args:
+            position (int): Pozycja leku
+            key (str): Znormalizowana wartość
+            label (str): Wartość w oryginalnej postaci
+        """
+        number = self._numbers.get(key)
+        if number is None:
+            number = self._numbers[key] = len(self.labels)
+            self.labels.append(label)
+        self.codes[position] = number
+
+    def number(self, key: str) -> int:
+        """
+        Zwraca numer znormalizowanej wartości.
+
+        Args:
+            key (str): Znormalizowana wartość
+
+        Returns:
+            int: Numer wartości lub -2, gdy żaden lek jej nie ma
+        """
+        return self._numbers.get(key, -2)
+
+    def counts(self, mask: np.ndarray, limit: int) -> List[dict]:
+        """
+        Zlicza leki maski według wartości.
+
+        Args:
+            mask (np.ndarray): Maska leków
+            limit (int): Maksymalna liczba zwracanych wartości
+
+        Returns:
+            List[dict]: Wartości z liczbą leków ({"value", "count"}),
+                malejąco według liczby leków
+        """
+        codes = self.codes[mask]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.labels))
+        numbers = np.flatnonzero(counts)
+        order = np.lexsort((numbers, -counts[numbers]))[:limit]
+        return [{'value': self.labels[n], 'count': int(counts[n])} for n in numbers[order]]
+
+
+class FacetPage(NamedTuple):
+    """
+    Strona wyników przeglądania rejestru.
+
+    Attributes:
+        page (SearchPage): Leki na stronie i kursor następnej strony
+        total (int): Liczba leków spełniających filtry
+        facets (Dict[str, List[dict]]): Liczby leków według wartości pól
+    """
+    page: SearchPage
+    total: int
+    facets: Dict[str, List[dict]]
+
+
+class FacetIndex:
+    """
+    Indeks pól filtrowania lokalnej kopii rejestru.
+
+    Attributes:
+        version (Optional[str]): Wersja rejestru, z której zbudowano indeks
+    """
+    def __init__(self, rows: List[Tuple], version: Optional[str] = None):
+        """
+        Buduje indeks.
+
+        Args:
+            rows (List[Tuple]): Krotki (identyfikator leku, wartości pól
+                FACET_FIELDS..., kod ATC) w kolejności identyfikatorów
+            version (Optional[str]): Wersja rejestru
+        """
+        self.version = version
+        self._ids = np.asarray([row[0] for row in rows], dtype=np.int64)
+        self._columns = {field: FacetColumn(len(rows)) for field in FACET_FIELDS}
+        self._atc_levels = [FacetColumn(len(rows)) for _ in ATC_LEVEL_LENGTHS]
+
+        for position, row in enumerate(rows):
+            for field, value in zip(FACET_FIELDS, row[1:]):
+                label = (value or '').strip()
+                key = fold_text(label)
+                if key not in MISSING_VALUES:
+                    self._columns[field].add(position, key, label)
+            for level, prefix in zip(self._atc_levels, atc_prefixes(row[-1])):
+                level.add(position, prefix, prefix)
+
+    @classmethod
+    def from_database(cls, version: Optional[str] = None) -> 'FacetIndex':
+        """
+        Buduje indeks z lokalnej kopii rejestru.
+
+        Args:
+            version (Optional[str]): Wersja rejestru
+
+        Returns:
+            FacetIndex: Zbudowany indeks
+        """
+        rows = Medicine.objects.order_by('id').values_list('id', *FACET_FIELDS, 'atc_code')
+        return cls(list(rows.iterator(chunk_size=5000)), version)
+
+    @staticmethod
+    def _atc_level(prefix: str) -> int:
+        if not atc_prefixes(prefix):
+            return -1
+        return ATC_LEVEL_LENGTHS.index(len(prefix))
+
+    def browse(self, filters: Dict[str, str], atc: Optional[str] = None,
+               after: Optional[int] = None, limit: int = 20,
+               value_limit: int = 50) -> Tuple[List[int], bool, int, Dict[str, List[dict]]]:
+        """
+        Wyznacza leki spełniające filtry i liczby leków według wartości pól.
+
+        Args:
+            filters (Dict[str, str]): Wartości pól FACET_FIELDS
+            atc (Optional[str]): Prefiks kodu ATC jednego z poziomów
+                klasyfikacji (np. 'J05AB')
+            after (Optional[int]): Identyfikator ostatniego leku poprzedniej strony
+            limit (int): Rozmiar strony
+            value_limit (int): Maksymalna liczba wartości pola w liczbach leków
+
+        Returns:
+            Tuple[List[int], bool, int, Dict[str, List[dict]]]: Identyfikatory
+                leków strony, informacja o następnej stronie, liczba leków
+                spełniających filtry i liczby leków według wartości pól
+        """
+        everything = np.ones(len(self._ids), dtype=bool)
+        masks = {
+            field: self._columns[field].codes == self._columns[field].number(fold_text(value))
+            for field, value in filters.items()
+        }
+
+        # Liczby dla kodu ATC dotyczą poziomu poniżej wybranego prefiksu
+        next_level = 0
+        if atc:
+            prefix = atc.strip().upper()
+            level = self._atc_level(prefix)
+            if level >= 0:
+                column = self._atc_levels[level]
+                masks[ATC_FACET] = column.codes == column.number(prefix)
+            else:
+                masks[ATC_FACET] = ~everything
+            next_level = level + 1 if level >= 0 else len(self._atc_levels)
+
+        def combined(skip: Optional[str] = None) -> np.ndarray:
+            mask = everything
+            for field, field_mask in masks.items():
+                if field != skip:
+                    mask = mask & field_mask
+            return mask
+
+        mask = combined()
+        facets = {field: self._columns[field].counts(combined(field), value_limit) for field in FACET_FIELDS}
+        facets[ATC_FACET] = (
+            self._atc_levels[next_level].counts(mask, value_limit) if next_level < len(self._atc_levels) else []
+        )
+
+        start = int(np.searchsorted(self._ids, after, side='right')) if after is not None else 0
+        positions = np.flatnonzero(mask[start:])[:limit + 1] + start
+        ids = [int(medicine_id) for medicine_id in self._ids[positions]]
+        return ids[:limit], len(ids) > limit, int(mask.sum()), facets
+
+    def __len__(self):
+        return len(self._ids)
+
+
+facet_index = RegistryDerived('facet-index', lambda version: FacetIndex.from_database(version))
+
+
+def browse_medicines(filters: Dict[str, str], atc: Optional[str] = None, cursor: Optional[str] = None,
+                     page_size: Optional[int] = None) -> FacetPage:
+    """
+    Zwraca stronę leków spełniających filtry wraz z liczbami leków według
+    wartości pól.
+
+    Args:
+        filters (Dict[str, str]): Wartości pól FACET_FIELDS
+        atc (Optional[str]): Prefiks kodu ATC
+        cursor (Optional[str]): Kursor z poprzedniej strony
+        page_size (Optional[int]): Rozmiar strony (patrz page_limit)
+
+    Returns:
+        FacetPage: Strona wyników uporządkowanych według identyfikatora
+
+    Raises:
+        InvalidCursor: Gdy kursor ma nieprawidłowy format
+    """
+    page_size = page_limit(page_size)
+    after = decode_cursor(cursor)[1] if cursor else None
+    ids, has_more, total, facets = facet_index.get().browse(
+        filters, atc, after, page_size, get_facet_settings()['VALUE_LIMIT']
+    )
+
+    medicines = Medicine.objects.defer('search_document').in_bulk(ids)
+    # Lek mógł zniknąć z bazy przed przebudową indeksu
+    rows = [medicines[medicine_id] for medicine_id in ids if medicine_id in medicines]
+    next_cursor = encode_cursor(0, ids[-1]) if has_more else None
+    return FacetPage(SearchPage(rows, next_cursor), total, facets)
@@ -0,0 +1,296 @@
+"""
+Moduł binarnego indeksu kodów GTIN lokalnego rejestru.
+
+Po każdej synchronizacji rejestru zapisywany jest plik indeksu mapujący
+kody GTIN opakowań na rekordy leków. Workery mapują plik do pamięci (mmap)
+i wyszukują kody binarnie, bez zapytań do bazy danych; wszystkie procesy
+współdzielą jedną kopię pliku w pamięci podręcznej systemu.
+
+Format pliku (liczby w kolejności little-endian):
+- nagłówek: sygnatura, wersja formatu, liczba wpisów, czas budowy (ms),
+  wersja rejestru (sync_rpl.snapshot, ASCII uzupełnione zerami),
+- posortowane wpisy stałej długości: GTIN (u64), przesunięcie rekordu
+  względem początku sekcji danych (u32), długość rekordu (u32),
+- sekcja danych: rekordy leków w formacie JSON (UTF-8), po jednym na lek,
+  zawierające opakowania według kodu GTIN.
+
+Nowy plik jest zapisywany obok starego i podmieniany atomowo (os.replace),
+a workery otwierają go ponownie po wykryciu zmiany pliku. Indeks zbudowany
+dla innej wersji rejestru niż bieżąca (np. gdy przebudowa po synchronizacji
+nie powiodła się) nie jest używany - wyszukiwanie wraca wtedy do bazy danych.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+
+from .models import Medicine, MedicinePackage
+from .snapshot import aregistry_snapshot, load_registry_snapshot, registry_snapshot
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RPLGTIN\x00'
+FORMAT_VERSION = 2
+
+# Sygnatura, wersja formatu, zarezerwowane, liczba wpisów, czas budowy w ms,
+# wersja rejestru
+HEADER = struct.Struct('<8sHHIQ32s')
+# GTIN, przesunięcie rekordu, długość rekordu
+ENTRY = struct.Struct('<QII')
+
+MEDICINE_FIELDS = (
+    'identifier', 'name', 'common_name', 'preparation_type', 'administration_route',
+    'strength', 'pharmaceutical_form', 'atc_code', 'responsible_entity', 'active_substance',
+)
+
+DEFAULT_GTIN_INDEX_SETTINGS = {
+    'PATH': 'gtin_index.bin',
+    'CHECK_INTERVAL': 1,
+}
+
+
+def get_gtin_index_settings() -> dict:
+    """
+    Zwraca ustawienia indeksu GTIN uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z RPL_GTIN_INDEX nałożone na DEFAULT_GTIN_INDEX_SETTINGS
+    """
+    return {**DEFAULT_GTIN_INDEX_SETTINGS, **getattr(settings, 'RPL_GTIN_INDEX', {})}
+
+
+def build_gtin_index(path: Optional[str] = None) -> int:
+    """
+    Buduje plik indeksu GTIN z lokalnej kopii rejestru.
+
+    Plik jest zapisywany do pliku tymczasowego w tym samym katalogu,
+    a następnie atomowo podmieniany, więc workery zawsze widzą kompletny
+    indeks.
+
+    Args:
+        path (Optional[str]): Ścieżka pliku indeksu, domyślnie RPL_GTIN_INDEX['PATH']
+
+    Returns:
+        int: Liczba zapisanych kodów GTIN
+    """
+    path = os.fspath(path or get_gtin_index_settings()['PATH'])
+    # Wersja odczytana przed danymi - zmiana rejestru w trakcie budowy daje
+    # indeks oznaczony starszą wersją, który nie zostanie użyty
+    registry_version = load_registry_snapshot().version
+    entries = []
+    data = bytearray()
+
+    medicines = Medicine.objects.defer('search_document').prefetch_related('packages').order_by('id')
+    for medicine in medicines.iterator(chunk_size=2000):
+        packages = list(medicine.packages.all())
+        if not packages:
+            continue
+        row = {field: getattr(medicine, field) for field in MEDICINE_FIELDS}
+        row['id'] = medicine.id
+        row['packages'] = {
+            package.gtin: [package.id, package.pack_size, package.raw_line]
+            for package in packages
+        }
+        encoded = json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        for package in packages:
+            entries.append((int(package.gtin), len(data), len(encoded)))
+        data += encoded
+
+    entries.sort()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.gtin_index.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(
+                MAGIC, FORMAT_VERSION, 0, len(entries), int(time.time() * 1000), registry_version.encode('ascii')
+            ))
+            for entry in entries:
+                f.write(ENTRY.pack(*entry))
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(entries)
+
+
+def rebuild_gtin_index(sender, **kwargs) -> None:
+    """
+    Odbiornik sygnału sync_rpl.signals.registry_synced przebudowujący indeks.
+    """
+    count = build_gtin_index()
+    logger.info(f"GTIN index rebuilt with {count} codes")
+
+
+class GtinIndex:
+    """
+    Zmapowany do pamięci plik indeksu GTIN.
+
+    Attributes:
+        path (str): Ścieżka pliku indeksu
+        count (int): Liczba kodów GTIN w indeksie
+        built_at (int): Czas budowy indeksu w milisekundach od epoki
+        registry_version (str): Wersja rejestru, z której zbudowano indeks
+    """
+    def __init__(self, path: str):
+        """
+        Otwiera i mapuje plik indeksu.
+
+        Args:
+            path (str): Ścieżka pliku indeksu
+
+        Raises:
+            OSError: Gdy pliku nie można otworzyć
+            ValueError: Gdy plik ma nieprawidłowy format lub wersję
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mm) < HEADER.size:
+                raise ValueError('GTIN index file is truncated')
+            magic, version, _, self.count, self.built_at, registry_version = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f'Unsupported GTIN index format (version {version})')
+            self.registry_version = registry_version.rstrip(b'\x00').decode('ascii')
+            self._data_offset = HEADER.size + self.count * ENTRY.size
+            if len(self._mm) < self._data_offset:
+                raise ValueError('GTIN index file is truncated')
+        except ValueError:
+            self._mm.close()
+            raise
+
+    def find(self, gtin: str) -> Optional[Tuple[int, int]]:
+        """
+        Wyszukuje binarnie wpis dla kodu GTIN.
+
+        Args:
+            gtin (str): Kanoniczny, 14-cyfrowy kod GTIN
+
+        Returns:
+            Optional[Tuple[int, int]]: Bezwzględne przesunięcie i długość
+                rekordu leku lub None, gdy kodu nie ma w indeksie
+        """
+        key = int(gtin)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            value, offset, length = ENTRY.unpack_from(self._mm, HEADER.size + middle * ENTRY.size)
+            if value < key:
+                low = middle + 1
+            elif value > key:
+                high = middle
+            else:
+                return self._data_offset + offset, length
+        return None
+
+    def lookup(self, gtin: str) -> Optional[MedicinePackage]:
+        """
+        Wyszukuje opakowanie o podanym kodzie GTIN.
+
+        Zwracane obiekty modeli nie są zapisywane w bazie i służą wyłącznie
+        do odczytu.
+
+        Args:
+            gtin (str): Kanoniczny, 14-cyfrowy kod GTIN
+
+        Returns:
+            Optional[MedicinePackage]: Opakowanie z przypisanym lekiem
+                lub None, gdy kodu nie ma w indeksie
+        """
+        found = self.find(gtin)
+        if found is None:
+            return None
+        offset, length = found
+        row = json.loads(self._mm[offset:offset + length])
+        package_id, pack_size, raw_line = row['packages'][gtin]
+        medicine = Medicine(id=row['id'], **{field: row[field] for field in MEDICINE_FIELDS})
+        package = MedicinePackage(id=package_id, gtin=gtin, pack_size=pack_size, raw_line=raw_line)
+        package.medicine = medicine
+        return package
+
+    def close(self) -> None:
+        """
+        Zwalnia mapowanie pliku.
+        """
+        self._mm.close()
+
+
+_index = None
+_index_stat = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_gtin_index() -> Optional[GtinIndex]:
+    """
+    Zwraca indeks GTIN bieżącego procesu, otwierając go ponownie po
+    podmianie pliku.
+
+    Zmiana pliku jest sprawdzana nie częściej niż co
+    RPL_GTIN_INDEX['CHECK_INTERVAL'] sekund, a wersja rejestru indeksu jest
+    porównywana z bieżącą wersją rejestru (sync_rpl.snapshot).
+
+    Returns:
+        Optional[GtinIndex]: Indeks lub None, gdy plik nie istnieje, jest
+            nieprawidłowy albo zbudowano go dla innej wersji rejestru
+    """
+    index = _open_gtin_index()
+    if index is None or index.registry_version != registry_snapshot().version:
+        return None
+    return index
+
+
+async def aget_gtin_index() -> Optional[GtinIndex]:
+    """
+    Asynchroniczna wersja get_gtin_index.
+
+    Returns:
+        Optional[GtinIndex]: Indeks lub None
+    """
+    index = _open_gtin_index()
+    if index is None or index.registry_version != (await aregistry_snapshot()).version:
+        return None
+    return index
+
+
+def _open_gtin_index() -> Optional[GtinIndex]:
+    global _index, _index_stat, _checked_at
+
+    now = time.monotonic()
+    config = get_gtin_index_settings()
+    if now - _checked_at < config['CHECK_INTERVAL']:
+        return _index
+
+    with _index_lock:
+        if now - _checked_at < config['CHECK_INTERVAL']:
+            return _index
+        _checked_at = now
+        path = os.fspath(config['PATH'])
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            _index, _index_stat = None, None
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key != _index_stat:
+            try:
+                # Poprzednie mapowanie zwalnia garbage collector, gdy żaden
+                # wątek już go nie używa
+                _index = GtinIndex(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cannot open GTIN index {path}: {e}")
+                _index = None
+            _index_stat = key
+        return _index
@@ -0,0 +1,31 @@
+"""
+Komenda budująca plik indeksu GTIN z lokalnej kopii rejestru.
+
+Indeks jest przebudowywany automatycznie po każdej synchronizacji
+rejestru; komenda służy do jego zbudowania bez ponownej synchronizacji,
+np. na nowym serwerze.
+
+Użycie:
+    python manage.py build_gtin_index [--path PLIK]
+"""
+from django.core.management.base import BaseCommand
+
+from sync_rpl.gtin_index import build_gtin_index
+
+
+class Command(BaseCommand):
+    """
+    Buduje plik indeksu GTIN mapowany do pamięci przez workery.
+    """
+    help = 'Buduje plik indeksu GTIN z lokalnej kopii rejestru'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=None,
+            help="Ścieżka pliku indeksu (domyślnie RPL_GTIN_INDEX['PATH'])"
+        )
+
+    def handle(self, *args, **options):
+        count = build_gtin_index(options['path'])
+        self.stdout.write(self.style.SUCCESS(f"Zapisano kodów GTIN: {count}"))
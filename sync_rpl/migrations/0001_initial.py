@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Medicine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifier', models.CharField(max_length=50, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('common_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('preparation_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('administration_route', models.CharField(blank=True, max_length=255, null=True)),
+                ('strength', models.CharField(blank=True, max_length=100, null=True)),
+                ('pharmaceutical_form', models.CharField(blank=True, max_length=255, null=True)),
+                ('atc_code', models.CharField(blank=True, max_length=50, null=True)),
+                ('responsible_entity', models.CharField(blank=True, max_length=255, null=True)),
+                ('active_substance', models.TextField(blank=True, null=True)),
+                ('packaging', models.TextField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync_rpl', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MedicinePackage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gtin', models.CharField(max_length=14, unique=True)),
+                ('pack_size', models.CharField(blank=True, max_length=255, null=True)),
+                ('raw_line', models.TextField()),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='packages', to='sync_rpl.medicine')),
+            ],
+        ),
+    ]
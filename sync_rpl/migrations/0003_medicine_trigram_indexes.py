@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:50
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync_rpl', '0002_medicinepackage'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='medicine_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['common_name'], name='medicine_common_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
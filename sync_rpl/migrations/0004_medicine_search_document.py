@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:54
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import UnaccentExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_documents(apps, schema_editor):
+    Medicine = apps.get_model('sync_rpl', 'Medicine')
+    Medicine.objects.update(search_document=(
+        SearchVector('name', weight='A', config='rpl_unaccent')
+        + SearchVector('common_name', weight='B', config='rpl_unaccent')
+        + SearchVector('active_substance', weight='C', config='rpl_unaccent')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync_rpl', '0003_medicine_trigram_indexes'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        # Słownik simple poprzedzony filtrem unaccent - wyszukiwanie ignoruje
+        # wielkość liter i polskie znaki diakrytyczne
+        migrations.RunSQL(
+            sql=[
+                'CREATE TEXT SEARCH CONFIGURATION rpl_unaccent (COPY = pg_catalog.simple)',
+                'ALTER TEXT SEARCH CONFIGURATION rpl_unaccent '
+                'ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple',
+            ],
+            reverse_sql='DROP TEXT SEARCH CONFIGURATION rpl_unaccent',
+        ),
+        migrations.AddField(
+            model_name='medicine',
+            name='search_document',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='medicine_search_document'),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:02
+
+import django.contrib.postgres.indexes
+import sync_rpl.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync_rpl', '0004_medicine_search_document'),
+    ]
+
+    operations = [
+        # Odpowiednik fold_text w bazie danych. Funkcja unaccent nie jest
+        # IMMUTABLE, więc do indeksu potrzebne jest opakowanie z jawnie
+        # wskazanym słownikiem
+        migrations.RunSQL(
+            sql=(
+                'CREATE FUNCTION rpl_fold(text) RETURNS text '
+                'LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS '
+                "$$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1)) $$"
+            ),
+            reverse_sql='DROP FUNCTION rpl_fold(text)',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_name_trgm',
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(sync_rpl.text.Fold('name'), name='gin_trgm_ops'), name='medicine_name_fold_trgm'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:21
+
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+ATC_CODE = re.compile(r'[A-Z](?:[0-9]{2}(?:[A-Z](?:[A-Z](?:[0-9]{2})?)?)?)?')
+ATC_LEVEL_LENGTHS = (1, 3, 4, 5, 7)
+
+
+def fill_atc_nodes(apps, schema_editor):
+    Medicine = apps.get_model('sync_rpl', 'Medicine')
+    AtcNode = apps.get_model('sync_rpl', 'AtcNode')
+    direct = Counter()
+    totals = Counter()
+    codes = Medicine.objects.order_by().values_list('atc_code').annotate(count=models.Count('id'))
+    for code, count in codes:
+        if not code or not ATC_CODE.fullmatch(code):
+            continue
+        direct[code] += count
+        for length in ATC_LEVEL_LENGTHS:
+            if length <= len(code):
+                totals[code[:length]] += count
+    AtcNode.objects.bulk_create([
+        AtcNode(
+            code=code,
+            level=ATC_LEVEL_LENGTHS.index(len(code)) + 1,
+            parent_id=code[:ATC_LEVEL_LENGTHS[ATC_LEVEL_LENGTHS.index(len(code)) - 1]] if len(code) > 1 else None,
+            medicine_count=count,
+            direct_count=direct[code],
+        )
+        for code, count in sorted(totals.items(), key=lambda item: (len(item[0]), item[0]))
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync_rpl', '0005_medicine_name_fold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AtcNode',
+            fields=[
+                ('code', models.CharField(max_length=7, primary_key=True, serialize=False)),
+                ('level', models.PositiveSmallIntegerField()),
+                ('medicine_count', models.PositiveIntegerField()),
+                ('direct_count', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['atc_code', 'id'], name='medicine_atc_code'),
+        ),
+        migrations.AddField(
+            model_name='atcnode',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='children', to='sync_rpl.atcnode'),
+        ),
+        migrations.RunPython(fill_atc_nodes, migrations.RunPython.noop),
+    ]
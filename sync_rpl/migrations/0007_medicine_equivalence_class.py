@@ -0,0 +1,77 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:34
+
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+FOLD_TRANSLATION = str.maketrans({'ł': 'l', 'Ł': 'l', 'ß': 'ss', 'ø': 'o', 'Ø': 'o'})
+WHITESPACE = re.compile(r'\s+')
+SUBSTANCE_SEPARATOR = re.compile(r'\s*(?:\+|;|,|/)\s*')
+STRENGTH_SEPARATOR = re.compile(r'\s*(?:\+|;)\s*')
+DECIMAL_COMMA = re.compile(r'(?<=\d),(?=\d)')
+MISSING_VALUES = {'', 'nan', 'none', '-'}
+
+
+def fold_text(text):
+    decomposed = unicodedata.normalize('NFKD', text.translate(FOLD_TRANSLATION))
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return WHITESPACE.sub(' ', stripped).strip().casefold()
+
+
+def equivalence_class(active_substance, strength, pharmaceutical_form):
+    substance = fold_text(active_substance or '')
+    substances = [] if substance in MISSING_VALUES else [
+        part for part in SUBSTANCE_SEPARATOR.split(substance) if part
+    ]
+    strength = fold_text(strength or '')
+    strengths = [] if strength in MISSING_VALUES else [
+        part.replace(' ', '') for part in STRENGTH_SEPARATOR.split(DECIMAL_COMMA.sub('.', strength)) if part
+    ]
+    if not substances or not strengths:
+        composition = ''
+    elif len(substances) == len(strengths):
+        composition = '+'.join(sorted(f'{substance}={dose}' for substance, dose in zip(substances, strengths)))
+    else:
+        composition = f"{'+'.join(substances)}={'+'.join(strengths)}"
+    form = fold_text(pharmaceutical_form or '')
+    form = '' if form in MISSING_VALUES else form
+    if not (composition and form):
+        return None
+    return hashlib.sha1('\x1f'.join([composition, form]).encode('utf-8')).hexdigest()
+
+
+def fill_equivalence_classes(apps, schema_editor):
+    Medicine = apps.get_model('sync_rpl', 'Medicine')
+    medicines = Medicine.objects.only('active_substance', 'strength', 'pharmaceutical_form')
+    batch = []
+    for medicine in medicines.iterator(chunk_size=5000):
+        medicine.equivalence_class = equivalence_class(
+            medicine.active_substance, medicine.strength, medicine.pharmaceutical_form
+        )
+        batch.append(medicine)
+        if len(batch) >= 5000:
+            Medicine.objects.bulk_update(batch, ['equivalence_class'])
+            batch = []
+    Medicine.objects.bulk_update(batch, ['equivalence_class'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync_rpl', '0006_atc_tree'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicine',
+            name='equivalence_class',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['equivalence_class', 'id'], name='medicine_equivalence_class'),
+        ),
+        migrations.RunPython(fill_equivalence_classes, migrations.RunPython.noop),
+    ]
@@ -4,9 +4,14 @@ Moduł definiujący model danych dla leków w bazie danych.
 Moduł zawiera model Medicine reprezentujący produkty lecznicze wraz z ich
 szczegółowymi informacjami, takimi jak nazwa, substancja czynna, opakowanie itp.
 Model jest wykorzystywany do przechowywania danych z Rejestru Produktów Leczniczych.
+Model AtcNode przechowuje drzewo klasyfikacji ATC z liczbą leków w grupach.
 """
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
+from .text import Fold
+
 class Medicine(models.Model):
     """
     Model reprezentujący produkt leczniczy w bazie danych.
@@ -27,9 +32,18 @@ class Medicine(models.Model):
         responsible_entity (CharField): Podmiot odpowiedzialny (max 255 znaków).
         active_substance (TextField): Substancja czynna/składniki aktywne.
         packaging (TextField): Informacje o dostępnych opakowaniach.
+        search_document (SearchVectorField): Dokument wyszukiwania pełnotekstowego
+            (nazwa, nazwa powszechna i substancja czynna z wagami), przeliczany
+            podczas synchronizacji rejestru (sync_rpl.search).
+        equivalence_class (CharField): Identyfikator klasy zamienników - leków
+            o tej samej substancji czynnej, mocy i postaci (sync_rpl.equivalence),
+            wyznaczany podczas synchronizacji rejestru.
 
     Meta:
-        db_table = 'medicines'
+        indexes: Indeksy GIN trigramowe na znormalizowanej nazwie i na polu
+            common_name, indeks GIN dokumentu wyszukiwania oraz indeksy
+            (atc_code, id) listy leków grupy ATC i (equivalence_class, id)
+            listy zamienników.
 
     Example:
         >>> lek = Medicine.objects.create(
@@ -52,6 +66,21 @@ class Medicine(models.Model):
     responsible_entity = models.CharField(max_length=255, null=True, blank=True)
     active_substance = models.TextField(null=True, blank=True)
     packaging = models.TextField(null=True, blank=True) 
+    search_document = SearchVectorField(null=True, editable=False)
+    equivalence_class = models.CharField(max_length=40, null=True, blank=True, editable=False)
+
+    class Meta:
+        # Indeksy trigramowe (pg_trgm) dla wyszukiwania po nazwie operatorem %
+        # (nazwa handlowa bez znaków diakrytycznych), indeks dokumentu
+        # wyszukiwania pełnotekstowego oraz indeksy list leków kodu ATC
+        # i klasy zamienników stronicowanych po identyfikatorze
+        indexes = [
+            GinIndex(OpClass(Fold('name'), name='gin_trgm_ops'), name='medicine_name_fold_trgm'),
+            GinIndex(fields=['common_name'], name='medicine_common_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['search_document'], name='medicine_search_document'),
+            models.Index(fields=['atc_code', 'id'], name='medicine_atc_code'),
+            models.Index(fields=['equivalence_class', 'id'], name='medicine_equivalence_class'),
+        ]
 
     def __str__(self):
         """
@@ -69,3 +98,77 @@ class Medicine(models.Model):
             'Przykładowy Lek'
         """
         return self.name
+
+
+class MedicinePackage(models.Model):
+    """
+    Model reprezentujący pojedyncze opakowanie produktu leczniczego.
+
+    Rekordy powstają podczas synchronizacji z rejestrem przez rozbicie
+    tekstowej kolumny packaging modelu Medicine na osobne opakowania.
+    Unikalny indeks na kodzie GTIN pozwala wyszukać lek po kodzie kreskowym
+    jednym zapytaniem punktowym.
+
+    Attributes:
+        medicine (ForeignKey): Produkt leczniczy, do którego należy opakowanie.
+        gtin (CharField): Kod GTIN opakowania w postaci 14-cyfrowej (unikalny).
+        pack_size (CharField): Wielkość opakowania (max 255 znaków).
+        raw_line (TextField): Oryginalna linia opisu opakowania z rejestru.
+
+    Example:
+        >>> opakowanie = MedicinePackage.objects.select_related('medicine') \\
+        ...     .get(gtin="05909990840229")
+        >>> print(opakowanie.medicine.name)
+        'Heviran'
+    """
+    medicine = models.ForeignKey(Medicine, related_name='packages', on_delete=models.CASCADE)
+    gtin = models.CharField(max_length=14, unique=True)
+    pack_size = models.CharField(max_length=255, null=True, blank=True)
+    raw_line = models.TextField()
+
+    def __str__(self):
+        """
+        Zwraca reprezentację tekstową obiektu MedicinePackage.
+
+        Returns:
+            str: Kod GTIN i wielkość opakowania.
+        """
+        return f"{self.gtin} ({self.pack_size})"
+
+
+class AtcNode(models.Model):
+    """
+    Model reprezentujący grupę klasyfikacji ATC wraz z liczbą leków.
+
+    Tabela jest przebudowywana podczas każdej synchronizacji rejestru
+    (sync_rpl.atc) i zawiera wszystkie grupy pięciu poziomów klasyfikacji
+    (np. J, J05, J05A, J05AB, J05AB01), do których należy co najmniej
+    jeden lek z lokalnej kopii rejestru.
+
+    Attributes:
+        code (CharField): Kod grupy ATC (klucz główny).
+        level (PositiveSmallIntegerField): Poziom klasyfikacji od 1 do 5.
+        parent (ForeignKey): Grupa nadrzędna, pusta dla grup 1. poziomu.
+        medicine_count (PositiveIntegerField): Liczba leków w grupie i jej
+            podgrupach.
+        direct_count (PositiveIntegerField): Liczba leków z kodem ATC równym
+            kodowi grupy.
+
+    Example:
+        >>> AtcNode.objects.get(code='J05AB').medicine_count
+        42
+    """
+    code = models.CharField(max_length=7, primary_key=True)
+    level = models.PositiveSmallIntegerField()
+    parent = models.ForeignKey('self', related_name='children', null=True, blank=True, on_delete=models.DO_NOTHING)
+    medicine_count = models.PositiveIntegerField()
+    direct_count = models.PositiveIntegerField()
+
+    def __str__(self):
+        """
+        Zwraca reprezentację tekstową obiektu AtcNode.
+
+        Returns:
+            str: Kod grupy i liczba leków.
+        """
+        return f"{self.code} ({self.medicine_count})"
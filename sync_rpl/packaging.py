@@ -0,0 +1,76 @@
+"""
+Moduł parsowania opisów opakowań z Rejestru Produktów Leczniczych.
+
+Kolumna opakowań w eksporcie CSV rejestru zawiera tekst, w którym każda linia
+opisuje jedno opakowanie produktu wraz z jego kodem GTIN. Moduł rozbija ten
+tekst na ustrukturyzowane rekordy zapisywane w tabeli MedicinePackage.
+"""
+import re
+from typing import Dict, List, Optional
+
+# Kod GTIN w opisie opakowania: 13 (EAN-13) lub 14 (GTIN-14) cyfr
+GTIN_PATTERN = re.compile(r'(?<!\d)(\d{13,14})(?!\d)')
+
+# Separatory pól w linii opisu opakowania
+FIELD_SEPARATORS = re.compile(r'[¦|;\t]')
+
+
+def canonical_gtin(code: str) -> Optional[str]:
+    """
+    Sprowadza kod GTIN/EAN do postaci 14-cyfrowej.
+
+    Args:
+        code (str): Kod GTIN/EAN w postaci tekstowej
+
+    Returns:
+        Optional[str]: Kod uzupełniony zerami wiodącymi do 14 cyfr lub None,
+            gdy podany tekst nie jest kodem GTIN
+
+    Example:
+        >>> canonical_gtin("5909990840229")
+        '05909990840229'
+    """
+    code = (code or '').strip()
+    if not code.isdigit() or not 8 <= len(code) <= 14:
+        return None
+    return code.zfill(14)
+
+
+def parse_packaging(packaging: Optional[str]) -> List[Dict[str, str]]:
+    """
+    Rozbija opis opakowań leku na listę opakowań.
+
+    Linie, w których nie występuje kod GTIN, są pomijane. Za wielkość
+    opakowania uznawane jest pierwsze niepuste pole linii inne niż kod GTIN.
+
+    Args:
+        packaging (Optional[str]): Zawartość kolumny opakowań z rejestru
+
+    Returns:
+        List[Dict[str, str]]: Lista słowników z kluczami 'gtin', 'pack_size'
+            i 'raw_line'
+
+    Example:
+        >>> parse_packaging("05909990840229 ¦ 30 tabl. ¦ Rp")
+        [{'gtin': '05909990840229', 'pack_size': '30 tabl.', 'raw_line': '05909990840229 ¦ 30 tabl. ¦ Rp'}]
+    """
+    if not packaging:
+        return []
+
+    packages = []
+    for line in packaging.split("\n"):
+        line = line.strip()
+        match = GTIN_PATTERN.search(line)
+        if not match:
+            continue
+
+        rest = line[:match.start()] + line[match.end():]
+        pack_size = next(
+            (field.strip() for field in FIELD_SEPARATORS.split(rest) if field.strip()), None
+        )
+        packages.append({
+            'gtin': canonical_gtin(match.group(1)),
+            'pack_size': pack_size,
+            'raw_line': line,
+        })
+    return packages
@@ -0,0 +1,130 @@
+"""
+Moduł cache wyników wyszukiwania leków po nazwie.
+
+Wyniki MedicineByNameView są zapamiętywane w pamięci procesu pod kluczem
+ze znormalizowanej nazwy (fold_text - bez znaków diakrytycznych, małymi
+literami, ze scalonymi białymi znakami), kursora i rozmiaru strony, więc
+"Ibuprom  ŻEL" i "ibuprom zel" korzystają z tego samego wpisu. Cache ma
+ograniczoną liczbę wpisów (RPL_NAME_SEARCH['CACHE_SIZE']) i usuwa najdawniej
+używane (LRU).
+
+Cały cache jest czyszczony po zakończeniu synchronizacji rejestru (sygnał
+registry_synced) w procesie, który ją wykonał, a w pozostałych procesach -
+po wykryciu zmiany wersji rejestru (sync_rpl.snapshot). Liczniki trafień
+i chybień są dostępne w atrybucie stats.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from .search import get_name_search_settings
+from .snapshot import registry_snapshot
+
+
+class QueryCache:
+    """
+    Ograniczony cache LRU wyników wyszukiwania, związany z wersją rejestru.
+
+    Attributes:
+        max_entries (Optional[int]): Maksymalna liczba wpisów, domyślnie
+            RPL_NAME_SEARCH['CACHE_SIZE'] (0 wyłącza cache)
+        stats (dict): Liczniki trafień ('hits'), chybień ('misses'),
+            usuniętych najdawniej używanych wpisów ('evictions')
+            i unieważnień całego cache ('invalidations')
+    """
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Inicjalizuje pusty cache.
+
+        Args:
+            max_entries (Optional[int]): Maksymalna liczba wpisów
+        """
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _capacity(self) -> int:
+        if self.max_entries is not None:
+            return self.max_entries
+        return get_name_search_settings()['CACHE_SIZE']
+
+    def _check_version(self) -> None:
+        version = registry_snapshot().version
+        if version != self._version:
+            if self._entries:
+                self._entries.clear()
+                self.stats['invalidations'] += 1
+            self._version = version
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Zwraca zapamiętany wynik.
+
+        Args:
+            key (Hashable): Klucz zapytania
+
+        Returns:
+            Optional[Any]: Wynik lub None, gdy nie ma go w cache
+        """
+        with self._lock:
+            self._check_version()
+            value = self._entries.get(key)
+            if value is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, version: Optional[str] = None) -> None:
+        """
+        Zapamiętuje wynik, usuwając najdawniej używane wpisy ponad limit.
+
+        Args:
+            key (Hashable): Klucz zapytania
+            value (Any): Wynik
+            version (Optional[str]): Wersja rejestru, z której pochodzi wynik;
+                wynik z innej niż bieżąca wersji (np. z macierzy w trakcie
+                przebudowy) nie jest zapamiętywany
+        """
+        capacity = self._capacity()
+        if capacity <= 0:
+            return
+        with self._lock:
+            self._check_version()
+            if version is not None and version != self._version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > capacity:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self) -> None:
+        """
+        Usuwa wszystkie wpisy.
+        """
+        with self._lock:
+            if self._entries:
+                self._entries.clear()
+                self.stats['invalidations'] += 1
+            self._version = None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+name_search_cache = QueryCache()
+
+
+def clear_name_search_cache(sender, **kwargs) -> None:
+    """
+    Odbiornik sygnału registry_synced - czyści cache wyszukiwania po nazwie.
+
+    Args:
+        sender: Nadawca sygnału
+        **kwargs: Pozostałe argumenty sygnału
+    """
+    name_search_cache.clear()
@@ -0,0 +1,344 @@
+"""
+Moduł stronicowanego wyszukiwania leków.
+
+Dostępne są dwa rodzaje wyszukiwania:
+- po nazwie handlowej - podobieństwo trigramowe do pola name bez znaków
+  diakrytycznych i wielkości liter (Fold / fold_text), liczone
+  w PostgreSQL (pg_trgm) lub, przy RPL_NAME_SEARCH['BACKEND'] = 'numpy',
+  w pamięci procesu (sync_rpl.trigram_engine),
+- pełnotekstowe - po nazwie handlowej, nazwie powszechnej i substancji
+  czynnej, z użyciem kolumny search_document (tsvector z wagami pól,
+  znormalizowanej rozszerzeniem unaccent) i indeksu GIN.
+
+Wyniki są uporządkowane malejąco według oceny dopasowania i rosnąco według
+identyfikatora. Kolejne strony są wyznaczane kursorem (keyset pagination)
+zawierającym ocenę i identyfikator ostatniego zwróconego leku, więc każda
+strona to jedno zapytanie ograniczone do rozmiaru strony, niezależnie od
+liczby dopasowań.
+"""
+import base64
+import binascii
+import json
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db.models import F, Q, QuerySet
+
+from .models import Medicine
+from .text import Fold, fold_text
+from .trigram_engine import trigram_engine
+
+DEFAULT_NAME_SEARCH_SETTINGS = {
+    'PAGE_SIZE': 20,
+    'MAX_PAGE_SIZE': 50,
+    'BACKEND': 'postgres',
+    'SIMILARITY_THRESHOLD': 0.3,
+    'CACHE_SIZE': 1000,
+}
+
+
+# Konfiguracja wyszukiwania pełnotekstowego: słownik simple poprzedzony
+# filtrem unaccent (tworzona w migracji 0004_medicine_search_document)
+SEARCH_CONFIG = 'rpl_unaccent'
+
+# Wagi pól dokumentu wyszukiwania - ranking SearchRank używa wag A > B > C
+SEARCH_DOCUMENT_WEIGHTS = (
+    ('name', 'A'),
+    ('common_name', 'B'),
+    ('active_substance', 'C'),
+)
+
+SEARCH_TERM = re.compile(r'[0-9a-z]+')
+
+
+def get_name_search_settings() -> dict:
+    """
+    Zwraca ustawienia wyszukiwania po nazwie uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z RPL_NAME_SEARCH nałożone na DEFAULT_NAME_SEARCH_SETTINGS
+    """
+    return {**DEFAULT_NAME_SEARCH_SETTINGS, **getattr(settings, 'RPL_NAME_SEARCH', {})}
+
+
+class InvalidCursor(ValueError):
+    """
+    Wyjątek zgłaszany dla kursora, którego nie można zdekodować.
+    """
+
+
+class SearchPage(NamedTuple):
+    """
+    Strona wyników wyszukiwania.
+
+    Attributes:
+        medicines (List[Medicine]): Leki na stronie, z atrybutem similarity
+        next_cursor (Optional[str]): Kursor następnej strony lub None,
+            gdy to ostatnia strona
+    """
+    medicines: List[Medicine]
+    next_cursor: Optional[str]
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(similarity: float, medicine_id: int) -> str:
+    """
+    Koduje pozycję ostatniego leku na stronie.
+
+    Args:
+        similarity (float): Podobieństwo nazwy ostatniego leku
+        medicine_id (int): Identyfikator ostatniego leku
+
+    Returns:
+        str: Kursor w postaci base64 bezpiecznej dla URL
+    """
+    raw = json.dumps([similarity, medicine_id], separators=(',', ':')).encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Dekoduje kursor zbudowany przez encode_cursor.
+
+    Args:
+        cursor (str): Kursor z żądania
+
+    Returns:
+        Tuple[float, int]: Podobieństwo i identyfikator ostatniego leku
+
+    Raises:
+        InvalidCursor: Gdy kursor ma nieprawidłowy format
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        similarity, medicine_id = json.loads(raw)
+        return float(similarity), int(medicine_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor('Nieprawidłowy kursor') from e
+
+
+def page_limit(page_size: Optional[int] = None) -> int:
+    """
+    Wyznacza rozmiar strony wyników.
+
+    Args:
+        page_size (Optional[int]): Rozmiar strony z żądania
+
+    Returns:
+        int: Rozmiar strony, domyślnie RPL_NAME_SEARCH['PAGE_SIZE'],
+            najwyżej RPL_NAME_SEARCH['MAX_PAGE_SIZE']
+    """
+    config = get_name_search_settings()
+    return max(1, min(page_size or config['PAGE_SIZE'], config['MAX_PAGE_SIZE']))
+
+
+def keyset_page(medicines: QuerySet, score: Optional[str], cursor: Optional[str] = None,
+                page_size: Optional[int] = None) -> SearchPage:
+    """
+    Zwraca stronę wyników uporządkowanych malejąco według oceny.
+
+    Pobierany jest jeden wiersz ponad rozmiar strony, aby bez osobnego
+    zapytania ustalić, czy istnieje następna strona. Bez oceny (score=None)
+    wyniki są uporządkowane wyłącznie według identyfikatora, a kursor
+    zawiera ocenę 0.
+
+    Args:
+        medicines (QuerySet): Leki z adnotacją oceny dopasowania
+        score (Optional[str]): Nazwa adnotacji z oceną dopasowania
+        cursor (Optional[str]): Kursor z poprzedniej strony
+        page_size (Optional[int]): Rozmiar strony (patrz page_limit)
+
+    Returns:
+        SearchPage: Strona wyników
+
+    Raises:
+        InvalidCursor: Gdy kursor ma nieprawidłowy format
+    """
+    page_size = page_limit(page_size)
+
+    if score is None:
+        medicines = medicines.order_by('id')
+        if cursor:
+            medicines = medicines.filter(id__gt=decode_cursor(cursor)[1])
+    else:
+        medicines = medicines.order_by(f'-{score}', 'id')
+        if cursor:
+            value, medicine_id = decode_cursor(cursor)
+            medicines = medicines.filter(
+                Q(**{f'{score}__lt': value}) | Q(**{score: value, 'id__gt': medicine_id})
+            )
+
+    rows = list(medicines[:page_size + 1])
+    if len(rows) <= page_size:
+        return SearchPage(rows, None)
+    last = rows[page_size - 1]
+    return SearchPage(rows[:page_size], encode_cursor(getattr(last, score) if score else 0, last.id))
+
+
+def search_medicines_by_name(name: str, cursor: Optional[str] = None,
+                             page_size: Optional[int] = None) -> SearchPage:
+    """
+    Zwraca stronę leków o nazwie podobnej do podanej.
+
+    Wielkość liter i znaki diakrytyczne nie mają wpływu na wynik.
+
+    Args:
+        name (str): Wyszukiwana nazwa
+        cursor (Optional[str]): Kursor z poprzedniej strony
+        page_size (Optional[int]): Rozmiar strony (patrz page_limit)
+
+    Returns:
+        SearchPage: Strona wyników z atrybutem similarity
+
+    Raises:
+        InvalidCursor: Gdy kursor ma nieprawidłowy format
+    """
+    if get_name_search_settings()['BACKEND'] == 'numpy':
+        return search_engine_page(name, cursor, page_size)
+
+    # Operator % (trigram_similar) na rpl_fold(name) korzysta z indeksu GIN
+    # medicine_name_fold_trgm, a podobieństwo jest liczone tylko dla
+    # dopasowanych wierszy
+    folded = fold_text(name)
+    medicines = Medicine.objects.defer('search_document').alias(folded_name=Fold('name')) \
+        .filter(folded_name__trigram_similar=folded) \
+        .annotate(similarity=TrigramSimilarity(Fold('name'), folded))
+    return keyset_page(medicines, 'similarity', cursor, page_size)
+
+
+def name_search_version() -> Optional[str]:
+    """
+    Zwraca wersję rejestru, z której pochodzą wyniki wyszukiwania po nazwie.
+
+    Returns:
+        Optional[str]: Wersja macierzy trigramów (sync_rpl.trigram_engine)
+            lub None, gdy wyszukiwanie odbywa się w bazie danych i zawsze
+            odpowiada bieżącej wersji rejestru
+    """
+    if get_name_search_settings()['BACKEND'] == 'numpy':
+        return trigram_engine.version
+    return None
+
+
+def search_engine_page(name: str, cursor: Optional[str] = None,
+                       page_size: Optional[int] = None) -> SearchPage:
+    """
+    Zwraca stronę leków o nazwie podobnej do podanej, wyznaczoną
+    w pamięci procesu (sync_rpl.trigram_engine).
+
+    Z bazy danych pobierane są jednym zapytaniem tylko leki ze strony.
+
+    Args:
+        name (str): Wyszukiwana nazwa
+        cursor (Optional[str]): Kursor z poprzedniej strony
+        page_size (Optional[int]): Rozmiar strony (patrz page_limit)
+
+    Returns:
+        SearchPage: Strona wyników z atrybutem similarity
+
+    Raises:
+        InvalidCursor: Gdy kursor ma nieprawidłowy format
+    """
+    page_size = page_limit(page_size)
+    after = decode_cursor(cursor) if cursor else None
+    threshold = get_name_search_settings()['SIMILARITY_THRESHOLD']
+    hits = trigram_engine.get().search(name, threshold, page_size + 1, after)
+
+    page = hits[:page_size]
+    medicines = Medicine.objects.defer('search_document').in_bulk([medicine_id for medicine_id, _ in page])
+    rows = []
+    for medicine_id, similarity in page:
+        # Lek mógł zniknąć z bazy przed przebudową macierzy
+        if medicine_id in medicines:
+            medicines[medicine_id].similarity = similarity
+            rows.append(medicines[medicine_id])
+    if len(hits) <= page_size:
+        return SearchPage(rows, None)
+    last_id, last_similarity = page[-1]
+    return SearchPage(rows, encode_cursor(last_similarity, last_id))
+
+
+def search_document() -> SearchVector:
+    """
+    Buduje wyrażenie dokumentu wyszukiwania pełnotekstowego leku.
+
+    Returns:
+        SearchVector: Suma wektorów pól z wagami SEARCH_DOCUMENT_WEIGHTS
+    """
+    vectors = [
+        SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        for field, weight in SEARCH_DOCUMENT_WEIGHTS
+    ]
+    document = vectors[0]
+    for vector in vectors[1:]:
+        document = document + vector
+    return document
+
+
+def update_search_documents() -> int:
+    """
+    Przelicza kolumnę search_document wszystkich leków.
+
+    Wywoływana podczas synchronizacji rejestru, w transakcji importu.
+
+    Returns:
+        int: Liczba zaktualizowanych leków
+    """
+    return Medicine.objects.update(search_document=search_document())
+
+
+def search_query(text: str) -> Optional[SearchQuery]:
+    """
+    Buduje zapytanie pełnotekstowe dopasowujące początki wszystkich słów.
+
+    Słowa są wydzielane ze znormalizowanego tekstu (fold_text), więc
+    znaki specjalne składni tsquery nie trafiają do zapytania.
+
+    Args:
+        text (str): Tekst wpisany przez użytkownika
+
+    Returns:
+        Optional[SearchQuery]: Zapytanie lub None, gdy tekst nie zawiera słów
+
+    Example:
+        >>> search_query('Ibuprom żel')  # 'ibuprom':* & 'zel':*
+    """
+    terms = SEARCH_TERM.findall(fold_text(text))
+    if not terms:
+        return None
+    raw = ' & '.join(f"'{term}':*" for term in terms)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_medicines(text: str, cursor: Optional[str] = None,
+                     page_size: Optional[int] = None) -> SearchPage:
+    """
+    Zwraca stronę leków dopasowanych pełnotekstowo po nazwie handlowej,
+    nazwie powszechnej i substancji czynnej.
+
+    Dopasowanie w nazwie handlowej waży więcej niż w nazwie powszechnej,
+    a ta więcej niż w substancji czynnej.
+
+    Args:
+        text (str): Tekst wpisany przez użytkownika
+        cursor (Optional[str]): Kursor z poprzedniej strony
+        page_size (Optional[int]): Rozmiar strony (patrz page_limit)
+
+    Returns:
+        SearchPage: Strona wyników z atrybutem rank
+
+    Raises:
+        InvalidCursor: Gdy kursor ma nieprawidłowy format
+    """
+    query = search_query(text)
+    if query is None:
+        return SearchPage([], None)
+    # Operator @@ na kolumnie search_document korzysta z indeksu GIN
+    medicines = Medicine.objects.defer('search_document').filter(search_document=query) \
+        .annotate(rank=SearchRank(F('search_document'), query))
+    return keyset_page(medicines, 'rank', cursor, page_size)
@@ -10,7 +10,8 @@ class MedicineSerializer(serializers.ModelSerializer):
     
     Attributes:
         model (Medicine): Model, który będzie serializowany.
-        fields (str): '__all__' oznacza, że wszystkie pola modelu Medicine będą uwzględnione w serializacji.
+        exclude (list): Pola pominięte w serializacji - dokument wyszukiwania
+            pełnotekstowego (search_document) służy wyłącznie do wyszukiwania.
     """
     class Meta:
         """
@@ -20,4 +21,4 @@ class MedicineSerializer(serializers.ModelSerializer):
         serializacji i deserializacji.
         """
         model = Medicine
-        fields = '__all__'
+        exclude = ['search_document']
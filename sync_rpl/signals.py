@@ -0,0 +1,16 @@
+"""
+Moduł sygnałów aplikacji sync_rpl.
+
+Sygnał registry_synced jest wysyłany po udanej synchronizacji lokalnej
+kopii Rejestru Produktów Leczniczych, aby inne aplikacje mogły przebudować
+dane wyprowadzane z rejestru.
+
+Argument background informuje odbiorniki, czy nadawca działa w długo
+działającym procesie serwera (True), czy w krótkotrwałym skrypcie lub
+zadaniu cron (False), w którym praca zlecona wątkom w tle zostałaby
+przerwana wraz z zakończeniem procesu.
+"""
+from django.dispatch import Signal
+
+# Wysyłany po zatwierdzeniu transakcji aktualizującej rejestr
+registry_synced = Signal()
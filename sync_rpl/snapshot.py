@@ -0,0 +1,359 @@
+"""
+Moduł wersji lokalnej kopii Rejestru Produktów Leczniczych.
+
+Każda synchronizacja rejestru zastępuje wszystkie rekordy leków i opakowań
+nowymi, więc największe identyfikatory obu tabel jednoznacznie wyznaczają
+wersję rejestru. Wersja jest odczytywana z bazy nie częściej niż co
+RPL_SNAPSHOT['CHECK_INTERVAL'] sekund na proces, a czas jej pierwszego
+odczytu (przybliżony czas synchronizacji) jest zapamiętywany we
+współdzielonym cache 'rpl', dzięki czemu wszystkie workery zwracają ten sam
+nagłówek Last-Modified.
+
+Dekorator registry_conditional obsługuje na tej podstawie warunkowe żądania
+GET (If-None-Match / If-Modified-Since): odpowiedź 304 jest zwracana przed
+wykonaniem widoku, a odpowiedzi 200 otrzymują nagłówki ETag, Last-Modified
+i Cache-Control. Widoki, których odpowiedź tylko czasem pochodzi z rejestru,
+sprawdzają warunki żądania funkcją registry_conditional_response dopiero po
+ustaleniu źródła odpowiedzi.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import Medicine, MedicinePackage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_SETTINGS = {
+    'CHECK_INTERVAL': 5,
+    'MAX_AGE': 3600,
+}
+
+
+def get_snapshot_settings() -> dict:
+    """
+    Zwraca ustawienia wersji rejestru uzupełnione o wartości domyślne.
+
+    Returns:
+        dict: Ustawienia z RPL_SNAPSHOT nałożone na DEFAULT_SNAPSHOT_SETTINGS
+    """
+    return {**DEFAULT_SNAPSHOT_SETTINGS, **getattr(settings, 'RPL_SNAPSHOT', {})}
+
+
+class RegistrySnapshot(NamedTuple):
+    """
+    Wersja lokalnej kopii rejestru.
+
+    Attributes:
+        version (str): Identyfikator wersji rejestru
+        synced_at (datetime): Przybliżony czas synchronizacji (UTC)
+    """
+    version: str
+    synced_at: datetime
+
+
+def load_registry_snapshot() -> RegistrySnapshot:
+    """
+    Odczytuje wersję rejestru z bazy danych.
+
+    Returns:
+        RegistrySnapshot: Bieżąca wersja rejestru
+    """
+    medicine_id = Medicine.objects.aggregate(latest=Max('id'))['latest'] or 0
+    package_id = MedicinePackage.objects.aggregate(latest=Max('id'))['latest'] or 0
+    version = f'{medicine_id}.{package_id}'
+    try:
+        synced_at = caches['rpl'].get_or_set(
+            f'registry-synced-at:{version}', lambda: time.time(), timeout=None
+        )
+    except Exception as e:
+        logger.warning(f"Shared cache read failed: {e}")
+        # Bez współdzielonego cache czas synchronizacji jest przybliżany
+        # w procesie (ten sam dla kolejnych odczytów tej samej wersji)
+        if _snapshot is not None and _snapshot.version == version:
+            synced_at = _snapshot.synced_at.timestamp()
+        else:
+            synced_at = time.time()
+    return RegistrySnapshot(version, datetime.fromtimestamp(int(synced_at), tz=dt_timezone.utc))
+
+
+_snapshot = None
+_loaded_at = 0.0
+_snapshot_lock = threading.Lock()
+
+
+def cached_registry_snapshot() -> Optional[RegistrySnapshot]:
+    """
+    Zwraca wersję rejestru zapamiętaną w bieżącym procesie, jeśli nie upłynął
+    jeszcze RPL_SNAPSHOT['CHECK_INTERVAL'].
+
+    Returns:
+        Optional[RegistrySnapshot]: Zapamiętana wersja lub None
+    """
+    if time.monotonic() - _loaded_at < get_snapshot_settings()['CHECK_INTERVAL']:
+        return _snapshot
+    return None
+
+
+def registry_snapshot() -> RegistrySnapshot:
+    """
+    Zwraca wersję rejestru, odczytując ją z bazy po upływie
+    RPL_SNAPSHOT['CHECK_INTERVAL'] sekund od poprzedniego odczytu.
+
+    Returns:
+        RegistrySnapshot: Bieżąca wersja rejestru
+    """
+    global _snapshot, _loaded_at
+
+    snapshot = cached_registry_snapshot()
+    if snapshot is not None:
+        return snapshot
+    with _snapshot_lock:
+        snapshot = cached_registry_snapshot()
+        if snapshot is None:
+            snapshot = load_registry_snapshot()
+            _snapshot, _loaded_at = snapshot, time.monotonic()
+        return snapshot
+
+
+async def aregistry_snapshot() -> RegistrySnapshot:
+    """
+    Asynchroniczna wersja registry_snapshot.
+
+    Returns:
+        RegistrySnapshot: Bieżąca wersja rejestru
+    """
+    return cached_registry_snapshot() or await sync_to_async(registry_snapshot)()
+
+
+class RegistryDerived:
+    """
+    Struktura w pamięci procesu wyprowadzana z lokalnej kopii rejestru.
+
+    Przy pierwszym użyciu struktura jest budowana synchronicznie lub - dla
+    get(wait=False) i refresh() - w wątku w tle. Później, gdy zapamiętana
+    wersja rejestru straci ważność, jej sprawdzenie i ewentualna przebudowa
+    odbywają się w wątku w tle, a do czasu zakończenia przebudowy zwracana
+    jest poprzednia struktura.
+
+    Attributes:
+        name (str): Nazwa struktury (do logów i nazwy wątku)
+        version (Optional[str]): Wersja rejestru bieżącej struktury
+        snapshot (Optional[RegistrySnapshot]): Wersja rejestru, z której
+            zbudowano bieżącą strukturę
+    """
+    def __init__(self, name: str, build: Callable[[str], Any]):
+        """
+        Inicjalizuje pustą strukturę.
+
+        Args:
+            name (str): Nazwa struktury
+            build (Callable[[str], Any]): Funkcja budująca strukturę dla
+                podanej wersji rejestru
+        """
+        self.name = name
+        self.version = None
+        self.snapshot = None
+        self._build = build
+        self._value = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def get(self, wait: bool = True) -> Any:
+        """
+        Zwraca strukturę dla bieżącej (lub poprzedniej, w trakcie przebudowy)
+        wersji rejestru.
+
+        Args:
+            wait (bool): Czy przy braku struktury zbudować ją w bieżącym
+                wątku; dla False budowa jest uruchamiana w tle
+
+        Returns:
+            Any: Zbudowana struktura lub None, gdy nie jest jeszcze gotowa
+                (tylko dla wait=False)
+        """
+        if self._value is None:
+            if not wait:
+                self.refresh()
+                return None
+            with self._lock:
+                if self._value is None:
+                    self._set(registry_snapshot())
+                return self._value
+
+        snapshot = cached_registry_snapshot()
+        if snapshot is None or snapshot.version != self.version:
+            self.refresh()
+        return self._value
+
+    def refresh(self, reload: bool = False) -> None:
+        """
+        Uruchamia w wątku w tle sprawdzenie wersji rejestru i przebudowę
+        struktury, jeśli wersja się zmieniła.
+
+        Args:
+            reload (bool): Czy odczytać wersję rejestru z bazy z pominięciem
+                wersji zapamiętanej w procesie (np. tuż po synchronizacji)
+        """
+        if self._pid != os.getpid():
+            # Blokady skopiowane przy rozwidleniu procesu mogą należeć do
+            # wątku, który nie istnieje w procesie potomnym
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+            self._refresh_lock = threading.Lock()
+        # Blokada jest zwalniana przez wątek przebudowy po jej zakończeniu
+        if self._refresh_lock.acquire(blocking=False):
+            threading.Thread(
+                target=self._refresh, args=(reload,), name=f'{self.name}-refresh', daemon=True
+            ).start()
+
+    def _set(self, snapshot: RegistrySnapshot) -> None:
+        value = self._build(snapshot.version)
+        self._value, self.version, self.snapshot = value, snapshot.version, snapshot
+
+    def _refresh(self, reload: bool) -> None:
+        try:
+            snapshot = load_registry_snapshot() if reload else registry_snapshot()
+            if snapshot.version != self.version or self._value is None:
+                self._set(snapshot)
+                logger.info(f"{self.name} rebuilt for registry version {snapshot.version}")
+        except Exception as e:
+            logger.error(f"{self.name} rebuild failed: {e}")
+        finally:
+            connections.close_all()
+            self._refresh_lock.release()
+
+
+def registry_etag(snapshot: RegistrySnapshot, key: str) -> str:
+    """
+    Buduje silny ETag odpowiedzi dla klucza żądania i wersji rejestru.
+
+    Args:
+        snapshot (RegistrySnapshot): Wersja rejestru
+        key (str): Klucz żądania (np. kod GTIN lub wyszukiwana nazwa)
+
+    Returns:
+        str: ETag w cudzysłowach
+    """
+    digest = hashlib.sha1(f'{snapshot.version}:{key}'.encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def registry_conditional_response(request, snapshot: RegistrySnapshot,
+                                  key: str) -> Tuple[Optional[HttpResponse], str]:
+    """
+    Sprawdza warunki żądania GET (If-None-Match / If-Modified-Since) względem
+    wersji rejestru.
+
+    Args:
+        request (HttpRequest): Obiekt żądania HTTP
+        snapshot (RegistrySnapshot): Wersja rejestru
+        key (str): Klucz żądania
+
+    Returns:
+        Tuple[Optional[HttpResponse], str]: Odpowiedź 304 (lub 412) albo
+            None, gdy widok powinien zbudować odpowiedź, oraz ETag żądania
+    """
+    etag = registry_etag(snapshot, key)
+    last_modified = int(snapshot.synced_at.timestamp())
+    return get_conditional_response(request, etag=etag, last_modified=last_modified), etag
+
+
+def tag_registry_response(response: HttpResponse, snapshot: RegistrySnapshot, etag: str) -> HttpResponse:
+    """
+    Ustawia nagłówki ETag, Last-Modified i Cache-Control (public,
+    max-age=RPL_SNAPSHOT['MAX_AGE']) odpowiedzi 200 lub 304 bez własnego
+    nagłówka Cache-Control.
+
+    Args:
+        response (HttpResponse): Odpowiedź widoku
+        snapshot (RegistrySnapshot): Wersja rejestru
+        etag (str): ETag żądania
+
+    Returns:
+        HttpResponse: Ta sama odpowiedź
+    """
+    # Odpowiedź 304 również niesie ETag i Cache-Control (RFC 9110)
+    if response.status_code not in (200, 304) or response.has_header('Cache-Control'):
+        return response
+    response.headers.setdefault('ETag', etag)
+    response.headers.setdefault('Last-Modified', http_date(snapshot.synced_at.timestamp()))
+    patch_cache_control(response, public=True, max_age=get_snapshot_settings()['MAX_AGE'])
+    return response
+
+
+def registry_conditional(key_func: Callable[..., str],
+                         snapshot: Optional[Callable[[], Optional[RegistrySnapshot]]] = None):
+    """
+    Dekorator obsługujący warunkowe żądania GET dla odpowiedzi wyprowadzanych
+    z rejestru.
+
+    Jeśli ETag lub data z żądania odpowiadają bieżącej wersji rejestru,
+    zwracana jest odpowiedź 304 bez wykonywania widoku. Odpowiedzi 200 bez
+    ustawionego nagłówka Cache-Control oraz odpowiedzi 304 otrzymują nagłówki
+    ETag, Last-Modified i Cache-Control (public,
+    max-age=RPL_SNAPSHOT['MAX_AGE']); widok może wyłączyć cache odpowiedzi,
+    ustawiając własny nagłówek Cache-Control.
+    Obsługuje widoki synchroniczne i asynchroniczne.
+
+    Dekorator jest przeznaczony dla widoków, których odpowiedź zależy
+    wyłącznie od rejestru; widoki korzystające także z innych źródeł danych
+    używają bezpośrednio registry_conditional_response i
+    tag_registry_response (np. api.views.scan_code).
+
+    Args:
+        key_func (Callable[..., str]): Funkcja przyjmująca argumenty widoku
+            i zwracająca klucz żądania
+        snapshot (Optional[Callable[[], Optional[RegistrySnapshot]]]): Funkcja
+            zwracająca wersję rejestru, z której pochodzą dane widoku (np.
+            RegistryDerived.snapshot), bez odczytu z bazy danych; gdy zwróci
+            None, żądanie jest obsługiwane bez nagłówków warunkowych.
+            Domyślnie registry_snapshot
+
+    Example:
+        >>> @registry_conditional(lambda request, code: request.get_full_path())
+        ... def get(self, request, code):
+        ...     ...
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                current = snapshot() if snapshot is not None else await aregistry_snapshot()
+                if current is None:
+                    return await view(request, *args, **kwargs)
+                response, etag = registry_conditional_response(
+                    request, current, key_func(request, *args, **kwargs)
+                )
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return tag_registry_response(response, current, etag)
+        else:
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                current = snapshot() if snapshot is not None else registry_snapshot()
+                if current is None:
+                    return view(request, *args, **kwargs)
+                response, etag = registry_conditional_response(
+                    request, current, key_func(request, *args, **kwargs)
+                )
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return tag_registry_response(response, current, etag)
+        return inner
+    return decorator
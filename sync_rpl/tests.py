@@ -0,0 +1,248 @@
+from datetime import datetime, timezone
+from importlib import import_module
+
+import numpy as np
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.utils.http import http_date
+
+from .equivalence import equivalence_class, normalize_composition, strength_components, substance_components
+from .facets import FacetIndex
+from .snapshot import RegistrySnapshot, registry_conditional_response, registry_etag, tag_registry_response
+from .trigram_engine import TrigramEngine, trigrams
+
+
+class TrigramsTests(SimpleTestCase):
+    """
+    Testy zgodności rozkładu na trigramy z funkcją show_trgm z pg_trgm.
+    """
+    def test_single_word(self):
+        # SELECT show_trgm('apap') -> {"  a"," ap",apa,"ap ",pap}
+        self.assertEqual(trigrams('apap'), {'  a', ' ap', 'apa', 'ap ', 'pap'})
+        # SELECT show_trgm('cat') -> {"  c"," ca","at ",cat}
+        self.assertEqual(trigrams('cat'), {'  c', ' ca', 'at ', 'cat'})
+
+    def test_words_and_digits(self):
+        # SELECT show_trgm('2,5 mg') -> {"  2","  5","  m"," 2 "," 5 "," mg","mg "}
+        self.assertEqual(trigrams('2,5 mg'), {'  2', '  5', '  m', ' 2 ', ' 5 ', ' mg', 'mg '})
+
+    def test_repeated_trigrams_are_counted_once(self):
+        # SELECT show_trgm('word-word') -> {"  w"," wo","ord","rd ","wor"}
+        self.assertEqual(trigrams('word-word'), {'  w', ' wo', 'ord', 'rd ', 'wor'})
+
+    def test_text_is_folded(self):
+        # SELECT show_trgm(rpl_fold('Żel')) -> {"  z"," ze","el ",zel}
+        self.assertEqual(trigrams('Żel'), {'  z', ' ze', 'el ', 'zel'})
+        self.assertEqual(trigrams('APAP'), trigrams('apap'))
+
+    def test_text_without_words(self):
+        self.assertEqual(trigrams(' - '), set())
+
+
+class TrigramEngineTests(SimpleTestCase):
+    """
+    Testy progu, kolejności wyników i stronicowania wyszukiwania w pamięci.
+    """
+    # 'Apap Forte' ma 11 trigramów, w tym 5 wspólnych z 'apap': 5 / 11
+    PARTIAL = float(np.float32(5) / np.float32(11))
+
+    def setUp(self):
+        self.engine = TrigramEngine([(3, 'Apap'), (2, 'Apap Forte'), (1, 'APAP'), (4, 'Ibuprom')], 'v1')
+
+    def test_rank_orders_by_similarity_then_id(self):
+        ids, similarity = self.engine.rank('apap', 0.3)
+        self.assertEqual(ids.tolist(), [1, 3, 2])
+        self.assertEqual(similarity.dtype, np.float32)
+        self.assertEqual(similarity.tolist(), [1.0, 1.0, self.PARTIAL])
+
+    def test_threshold_is_inclusive(self):
+        ids, _ = self.engine.rank('apap', self.PARTIAL)
+        self.assertEqual(ids.tolist(), [1, 3, 2])
+        ids, _ = self.engine.rank('apap', np.nextafter(self.PARTIAL, 1.0))
+        self.assertEqual(ids.tolist(), [1, 3])
+
+    def test_unknown_trigrams(self):
+        ids, similarity = self.engine.rank('xyz', 0.0)
+        self.assertEqual((len(ids), len(similarity)), (0, 0))
+
+    def test_search_after_is_exclusive_keyset(self):
+        self.assertEqual(self.engine.search('apap', 0.3, 1), [(1, 1.0)])
+        self.assertEqual(self.engine.search('apap', 0.3, 1, after=(1.0, 1)), [(3, 1.0)])
+        self.assertEqual(self.engine.search('apap', 0.3, 2, after=(1.0, 3)), [(2, self.PARTIAL)])
+        self.assertEqual(self.engine.search('apap', 0.3, 2, after=(self.PARTIAL, 2)), [])
+
+    def test_search_pages_cover_all_results(self):
+        pages, after = [], None
+        while True:
+            page = self.engine.search('apap', 0.3, 1, after=after)
+            if not page:
+                break
+            pages.extend(page)
+            after = (page[-1][1], page[-1][0])
+        self.assertEqual(pages, [(1, 1.0), (3, 1.0), (2, self.PARTIAL)])
+
+
+class EquivalenceClassTests(SimpleTestCase):
+    """
+    Testy normalizacji składu i klas równoważności leków (zamienników).
+    """
+    FORM = 'Tabletki powlekane'
+
+    def test_components(self):
+        self.assertEqual(substance_components('Paracetamolum + Coffeinum'), ['paracetamolum', 'coffeinum'])
+        self.assertEqual(substance_components('Żelaza siarczan; Kwas foliowy'), ['zelaza siarczan', 'kwas foliowy'])
+        self.assertEqual(strength_components('2,5 mg + 10 mg'), ['2.5mg', '10mg'])
+        self.assertEqual(strength_components('5 mg/ml'), ['5mg/ml'])
+        self.assertEqual(substance_components('nan'), [])
+        self.assertEqual(strength_components(' - '), [])
+
+    def test_decimal_comma_and_spacing(self):
+        self.assertEqual(
+            equivalence_class('Bisoprololi fumaras', '2,5 mg', self.FORM),
+            equivalence_class('BISOPROLOLI FUMARAS', '2.5mg', 'tabletki  powlekane'),
+        )
+        self.assertNotEqual(
+            equivalence_class('Bisoprololi fumaras', '2,5 mg', self.FORM),
+            equivalence_class('Bisoprololi fumaras', '25 mg', self.FORM),
+        )
+
+    def test_combination_strengths_follow_their_substances(self):
+        reference = equivalence_class('Amlodipinum + Valsartanum', '5 mg + 80 mg', self.FORM)
+        self.assertEqual(reference, equivalence_class('Valsartanum + Amlodipinum', '80 mg + 5 mg', self.FORM))
+        self.assertNotEqual(reference, equivalence_class('Valsartanum + Amlodipinum', '5 mg + 80 mg', self.FORM))
+        self.assertEqual(
+            normalize_composition('Valsartanum + Amlodipinum', '80 mg + 2,5 mg'),
+            'amlodipinum=2.5mg+valsartanum=80mg',
+        )
+
+    def test_unpaired_strength_keeps_registry_order(self):
+        self.assertEqual(
+            normalize_composition('Paracetamolum + Coffeinum', '500 mg'),
+            'paracetamolum+coffeinum=500mg',
+        )
+        self.assertNotEqual(
+            equivalence_class('Paracetamolum + Coffeinum', '500 mg', self.FORM),
+            equivalence_class('Coffeinum + Paracetamolum', '500 mg', self.FORM),
+        )
+
+    def test_missing_values(self):
+        self.assertIsNone(equivalence_class('Ibuprofenum', 'nan', self.FORM))
+        self.assertIsNone(equivalence_class(None, '200 mg', self.FORM))
+        self.assertIsNone(equivalence_class('Ibuprofenum', '200 mg', '-'))
+
+    def test_migration_copy_matches(self):
+        migration = import_module('sync_rpl.migrations.0007_medicine_equivalence_class')
+        for row in [
+            ('Amlodipinum + Valsartanum', '5 mg + 80 mg', self.FORM),
+            ('Valsartanum + Amlodipinum', '80 mg + 5 mg', 'Tabletki'),
+            ('Paracetamolum + Coffeinum', '500 mg', 'Tabletki'),
+            ('Łupek / Żelazo', '2,5 mg; 1 g', 'Żel'),
+            ('Ibuprofenum', 'nan', self.FORM),
+        ]:
+            self.assertEqual(migration.equivalence_class(*row), equivalence_class(*row))
+
+
+class RegistryConditionalTests(SimpleTestCase):
+    """
+    Testy nagłówków ETag/Last-Modified i odpowiedzi 304 zależnych od wersji rejestru.
+    """
+    SNAPSHOT = RegistrySnapshot('v1', datetime(2026, 1, 31, 12, tzinfo=timezone.utc))
+
+    def conditional(self, snapshot=SNAPSHOT, key='apap', **headers):
+        request = RequestFactory().get('/rpl/mbn', headers=headers)
+        return registry_conditional_response(request, snapshot, key)
+
+    def test_etag_depends_on_version_and_key(self):
+        etag = registry_etag(self.SNAPSHOT, 'apap')
+        self.assertEqual(etag, registry_etag(RegistrySnapshot('v1', datetime.now(timezone.utc)), 'apap'))
+        self.assertNotEqual(etag, registry_etag(RegistrySnapshot('v2', self.SNAPSHOT.synced_at), 'apap'))
+        self.assertNotEqual(etag, registry_etag(self.SNAPSHOT, 'ibuprom'))
+
+    def test_if_none_match(self):
+        response, etag = self.conditional()
+        self.assertIsNone(response)
+        response, _ = self.conditional(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        response, _ = self.conditional(RegistrySnapshot('v2', self.SNAPSHOT.synced_at), if_none_match=etag)
+        self.assertIsNone(response)
+
+    def test_if_modified_since(self):
+        synced = self.SNAPSHOT.synced_at.timestamp()
+        response, _ = self.conditional(if_modified_since=http_date(synced))
+        self.assertEqual(response.status_code, 304)
+        response, _ = self.conditional(if_modified_since=http_date(synced - 60))
+        self.assertIsNone(response)
+
+    def test_tagged_headers(self):
+        _, etag = self.conditional()
+        response = tag_registry_response(HttpResponse(), self.SNAPSHOT, etag)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response['Last-Modified'], http_date(self.SNAPSHOT.synced_at.timestamp()))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+    def test_untagged_responses(self):
+        _, etag = self.conditional()
+        response = tag_registry_response(HttpResponse(status=404), self.SNAPSHOT, etag)
+        self.assertFalse(response.has_header('ETag'))
+        response = HttpResponse()
+        response['Cache-Control'] = 'no-store'
+        tag_registry_response(response, self.SNAPSHOT, etag)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+
+class FacetIndexTests(SimpleTestCase):
+    """
+    Testy filtrowania, liczb leków według wartości pól i stronicowania przeglądania rejestru.
+    """
+    def setUp(self):
+        # (id, postać, droga podania, rodzaj preparatu, podmiot odpowiedzialny, kod ATC)
+        self.index = FacetIndex([
+            (1, 'Tabletki', 'Doustna', 'Ludzki', 'Polpharma', 'N02BE01'),
+            (2, 'tabletki', 'Doustna', 'Ludzki', 'Adamed', 'N02BE01'),
+            (3, 'Żel', 'Na skórę', 'Ludzki', 'Polpharma', 'M02AA13'),
+            (4, 'Tabletki', 'Doustna', 'Weterynaryjny', 'Polpharma', 'M01AE01'),
+            (5, 'nan', '', 'Ludzki', 'Adamed', None),
+        ], 'v1')
+
+    def test_values_are_folded(self):
+        ids, _, total, _ = self.index.browse({'pharmaceutical_form': 'TABLETKI'})
+        self.assertEqual((ids, total), ([1, 2, 4], 3))
+        ids, _, _, _ = self.index.browse({'pharmaceutical_form': 'zel'})
+        self.assertEqual(ids, [3])
+        self.assertEqual(self.index.browse({'pharmaceutical_form': 'Syrop'})[2], 0)
+
+    def test_counts_skip_own_filter(self):
+        _, _, total, facets = self.index.browse({'pharmaceutical_form': 'Tabletki', 'responsible_entity': 'Adamed'})
+        self.assertEqual(total, 1)
+        self.assertEqual(facets['pharmaceutical_form'], [{'value': 'Tabletki', 'count': 1}])
+        self.assertEqual(facets['responsible_entity'], [
+            {'value': 'Polpharma', 'count': 2},
+            {'value': 'Adamed', 'count': 1},
+        ])
+        self.assertEqual(facets['preparation_type'], [{'value': 'Ludzki', 'count': 1}])
+
+    def test_missing_values_are_not_counted(self):
+        _, _, total, facets = self.index.browse({})
+        self.assertEqual(total, 5)
+        self.assertEqual(facets['pharmaceutical_form'], [
+            {'value': 'Tabletki', 'count': 3},
+            {'value': 'Żel', 'count': 1},
+        ])
+        self.assertEqual(sum(value['count'] for value in facets['administration_route']), 4)
+
+    def test_atc_counts_next_level(self):
+        _, _, _, facets = self.index.browse({})
+        # Przy równych liczbach wartości są w kolejności pierwszego wystąpienia
+        self.assertEqual(facets['atc_code'], [{'value': 'N', 'count': 2}, {'value': 'M', 'count': 2}])
+        ids, _, total, facets = self.index.browse({}, atc='m01a')
+        self.assertEqual((ids, total), ([4], 1))
+        self.assertEqual(facets['atc_code'], [{'value': 'M01AE', 'count': 1}])
+        self.assertEqual(self.index.browse({}, atc='N02BE01')[3]['atc_code'], [])
+        self.assertEqual(self.index.browse({}, atc='XX')[2], 0)
+
+    def test_pages_after_last_id(self):
+        filters = {'preparation_type': 'Ludzki'}
+        self.assertEqual(self.index.browse(filters, limit=2)[:2], ([1, 2], True))
+        self.assertEqual(self.index.browse(filters, after=2, limit=2)[:2], ([3, 5], False))
+        self.assertEqual(self.index.browse(filters, after=5, limit=2)[:2], ([], False))
@@ -0,0 +1,51 @@
+"""
+Moduł normalizacji tekstu do wyszukiwania.
+
+Funkcja fold_text sprowadza tekst do postaci porównywalnej niezależnie od
+wielkości liter i polskich znaków diakrytycznych, dzięki czemu np. "Ibuprom
+Żel" i "ibuprom zel" mają ten sam klucz wyszukiwania. Jej odpowiednikiem
+w bazie danych jest funkcja SQL rpl_fold (lower(unaccent(...))), tworzona
+w migracji 0005_medicine_name_fold i dostępna jako wyrażenie Fold.
+"""
+import re
+import unicodedata
+
+from django.db.models import Func, TextField
+
+# Litery, których rozkład Unicode (NFKD) nie oddziela znaku diakrytycznego
+FOLD_TRANSLATION = str.maketrans({'ł': 'l', 'Ł': 'l', 'ß': 'ss', 'ø': 'o', 'Ø': 'o'})
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def fold_text(text: str) -> str:
+    """
+    Sprowadza tekst do klucza wyszukiwania.
+
+    Usuwa znaki diakrytyczne, zamienia litery na małe i scala białe znaki.
+
+    Args:
+        text (str): Tekst do znormalizowania
+
+    Returns:
+        str: Znormalizowany tekst
+
+    Example:
+        >>> fold_text('  Ibuprom  ŻEL ')
+        'ibuprom zel'
+    """
+    decomposed = unicodedata.normalize('NFKD', text.translate(FOLD_TRANSLATION))
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return WHITESPACE.sub(' ', stripped).strip().casefold()
+
+
+class Fold(Func):
+    """
+    Wyrażenie SQL sprowadzające tekst do klucza wyszukiwania - odpowiednik
+    fold_text w bazie danych (funkcja IMMUTABLE, więc może być indeksowana).
+
+    Example:
+        >>> Medicine.objects.annotate(folded=Fold('name'))
+    """
+    function = 'rpl_fold'
+    output_field = TextField()
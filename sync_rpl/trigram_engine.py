@@ -0,0 +1,167 @@
+"""
+Moduł wyszukiwania leków po nazwie w pamięci procesu (NumPy).
+
+Alternatywa dla wyszukiwania trigramowego w PostgreSQL, wybierana
+ustawieniem RPL_NAME_SEARCH['BACKEND'] = 'numpy'. Nazwy wszystkich leków
+są sprowadzane do klucza wyszukiwania (fold_text, jak rpl_fold w bazie)
+i rozkładane na trigramy tak jak robi to rozszerzenie pg_trgm (słowa ze
+znaków alfanumerycznych uzupełnione dwiema spacjami z przodu i jedną
+z tyłu, bez powtórzeń), a macierz incydencji
+trigram-lek jest przechowywana w postaci CSR w tablicach NumPy.
+
+Dla zapytania liczba wspólnych trigramów z każdą nazwą jest liczona jednym
+np.bincount po listach leków zawierających trigramy zapytania,
+a podobieństwo - jak w pg_trgm - jako wspólne / (suma - wspólne)
+w precyzji float32. Wyniki i kolejność (podobieństwo malejąco,
+identyfikator rosnąco, próg jak dla operatora %) są zgodne
+z wyszukiwaniem w bazie danych, więc kursory stron są wymienne między
+oboma sposobami wyszukiwania.
+
+Macierz jest budowana przy pierwszym wyszukiwaniu i przebudowywana po
+zmianie wersji rejestru (sync_rpl.snapshot). Z bazy danych pobierane są
+wyłącznie rekordy leków z wynikowej strony.
+"""
+import re
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .models import Medicine
+from .snapshot import RegistryDerived
+from .text import fold_text
+
+# Słowa w rozumieniu pg_trgm - ciągi znaków alfanumerycznych
+TRIGRAM_WORD = re.compile(r'[^\W_]+')
+
+
+def trigrams(text: str) -> set:
+    """
+    Rozkłada znormalizowany tekst (fold_text) na zbiór trigramów tak jak
+    funkcja show_trgm z pg_trgm wywołana dla rpl_fold(text).
+
+    Args:
+        text (str): Tekst do rozłożenia
+
+    Returns:
+        set: Zbiór trigramów
+
+    Example:
+        >>> sorted(trigrams('Żel'))
+        ['  z', ' ze', 'el ', 'zel']
+    """
+    result = set()
+    for word in TRIGRAM_WORD.findall(fold_text(text)):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class TrigramEngine:
+    """
+    Macierz trigramów nazw leków z wyszukiwaniem wektorowym.
+
+    Attributes:
+        version (Optional[str]): Wersja rejestru, z której zbudowano macierz
+    """
+    def __init__(self, rows: Iterable[Tuple[int, str]], version: Optional[str] = None):
+        """
+        Buduje macierz incydencji trigram-lek.
+
+        Args:
+            rows (Iterable[Tuple[int, str]]): Pary (identyfikator leku, nazwa)
+            version (Optional[str]): Wersja rejestru
+        """
+        self.version = version
+        vocabulary = {}
+        ids = []
+        sizes = []
+        trigram_ids = []
+        for medicine_id, name in rows:
+            grams = trigrams(name or '')
+            ids.append(medicine_id)
+            sizes.append(len(grams))
+            trigram_ids.extend(vocabulary.setdefault(gram, len(vocabulary)) for gram in grams)
+
+        self._vocabulary = vocabulary
+        self._ids = np.asarray(ids, dtype=np.int64)
+        self._sizes = np.asarray(sizes, dtype=np.float32)
+
+        # Macierz w postaci CSR po trigramach: leki zawierające trigram t to
+        # _postings[_offsets[t]:_offsets[t + 1]]
+        rows_of = np.repeat(np.arange(len(ids), dtype=np.int32), sizes)
+        columns = np.asarray(trigram_ids, dtype=np.int32)
+        order = np.argsort(columns, kind='stable')
+        self._postings = rows_of[order]
+        self._offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(columns, minlength=len(vocabulary)), out=self._offsets[1:])
+
+    @classmethod
+    def from_database(cls, version: Optional[str] = None) -> 'TrigramEngine':
+        """
+        Buduje macierz z nazw leków lokalnej kopii rejestru.
+
+        Args:
+            version (Optional[str]): Wersja rejestru
+
+        Returns:
+            TrigramEngine: Zbudowana macierz
+        """
+        rows = Medicine.objects.order_by('id').values_list('id', 'name')
+        return cls(rows.iterator(chunk_size=5000), version)
+
+    def rank(self, query: str, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Wyznacza leki o nazwie podobnej do zapytania.
+
+        Args:
+            query (str): Wyszukiwana nazwa
+            threshold (float): Minimalne podobieństwo (jak similarity_threshold)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Identyfikatory leków i ich
+                podobieństwa (float32), uporządkowane malejąco według
+                podobieństwa i rosnąco według identyfikatora
+        """
+        grams = trigrams(query)
+        known = [self._vocabulary[gram] for gram in grams if gram in self._vocabulary]
+        if not known:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        postings = np.concatenate([self._postings[self._offsets[t]:self._offsets[t + 1]] for t in known])
+        shared = np.bincount(postings, minlength=len(self._ids))
+        candidates = np.flatnonzero(shared)
+        common = shared[candidates].astype(np.float32)
+        similarity = common / (self._sizes[candidates] + np.float32(len(grams)) - common)
+
+        matched = similarity.astype(np.float64) >= threshold
+        ids, similarity = self._ids[candidates[matched]], similarity[matched]
+        order = np.lexsort((ids, -similarity))
+        return ids[order], similarity[order]
+
+    def search(self, query: str, threshold: float, limit: int,
+               after: Optional[Tuple[float, int]] = None) -> List[Tuple[int, float]]:
+        """
+        Zwraca stronę najlepiej dopasowanych leków.
+
+        Args:
+            query (str): Wyszukiwana nazwa
+            threshold (float): Minimalne podobieństwo
+            limit (int): Maksymalna liczba wyników
+            after (Optional[Tuple[float, int]]): Podobieństwo i identyfikator
+                ostatniego leku poprzedniej strony
+
+        Returns:
+            List[Tuple[int, float]]: Pary (identyfikator leku, podobieństwo)
+        """
+        ids, similarity = self.rank(query, threshold)
+        if after is not None:
+            value, medicine_id = np.float32(after[0]), after[1]
+            keep = (similarity < value) | ((similarity == value) & (ids > medicine_id))
+            ids, similarity = ids[keep], similarity[keep]
+        return [(int(i), float(s)) for i, s in zip(ids[:limit], similarity[:limit])]
+
+    def __len__(self):
+        return len(self._ids)
+
+
+trigram_engine = RegistryDerived('trigram-engine', lambda version: TrigramEngine.from_database(version))
@@ -1,7 +1,18 @@
 from django.urls import path
-from .views import MedicineByNameView, MedicineByBarcodeView, FetchMedicines
+from .views import (
+    MedicineByNameView, MedicineSearchView, MedicineAutocompleteView, AtcBrowseView, AtcMedicinesView,
+    MedicineSubstitutesView, MedicineBrowseView, MedicineByBarcodeView, FetchMedicines,
+)
 
 urlpatterns = [
     path('mbn/<str:name>', MedicineByNameView.as_view(), name='mbn'),
+    path('search/<str:query>', MedicineSearchView.as_view(), name='search'),
+    path('autocomplete/<str:prefix>', MedicineAutocompleteView.as_view(), name='autocomplete'),
+    path('atc/', AtcBrowseView.as_view(), name='atc'),
+    path('atc/<str:code>', AtcBrowseView.as_view(), name='atc_group'),
+    path('atc/<str:code>/medicines', AtcMedicinesView.as_view(), name='atc_medicines'),
+    path('substitutes/<str:identifier>', MedicineSubstitutesView.as_view(), name='substitutes'),
+    path('browse/', MedicineBrowseView.as_view(), name='browse'),
+    path('mbb/<str:barcode>', MedicineByBarcodeView.as_view(), name='mbb'),
     path('update/', FetchMedicines.as_view(), name='update'),
 ]
\ No newline at end of file
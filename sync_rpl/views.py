@@ -10,39 +10,66 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.db.models import Q
-from django.contrib.postgres.search import TrigramSimilarity
-from .models import Medicine
+from django.utils.decorators import method_decorator
+from .models import Medicine, MedicinePackage
+from .packaging import canonical_gtin
 from .serializers import MedicineSerializer
 from .database_update_django import main
-
+from .gtin_index import get_gtin_index
+from .atc import atc_tree
+from .autocomplete import AutocompleteNotReady, autocomplete, autocomplete_snapshot
+from .facets import FACET_FIELDS, browse_medicines
+from .query_cache import name_search_cache
+from .search import (
+    InvalidCursor, SearchPage, keyset_page, name_search_version, page_limit, search_medicines,
+    search_medicines_by_name,
+)
+from .snapshot import registry_conditional
+from .text import fold_text
+
+@method_decorator(registry_conditional(lambda request, name: request.get_full_path()), name='get')
 class MedicineByNameView(APIView):
     """
     Widok API do wyszukiwania leków po nazwie.
 
     Wykorzystuje algorytm podobieństwa trigramów do wyszukiwania przybliżonych
-    dopasowań nazw leków. Zwraca listę leków posortowaną według stopnia
-    podobieństwa do szukanej frazy.
+    dopasowań nazw leków. Zwraca stronę leków posortowanych według stopnia
+    podobieństwa do szukanej frazy (patrz sync_rpl.search). Dopasowania są
+    wyszukiwane operatorem % rozszerzenia pg_trgm z użyciem indeksu GIN na
+    nazwie leku. Wielkość liter, znaki diakrytyczne i nadmiarowe białe znaki
+    w nazwie są ignorowane. Odpowiedzi obsługują warunkowe żądania GET (ETag /
+    Last-Modified wyznaczane z wersji rejestru), a wyniki są zapamiętywane
+    w cache LRU pod znormalizowaną nazwą (sync_rpl.query_cache), czyszczonym
+    po synchronizacji rejestru.
 
     Endpoints:
-        GET /api/medicines/name/{name}/: Wyszukuje leki o nazwie podobnej do podanej.
+        GET /rpl/mbn/{name}?cursor=...&page_size=N: Wyszukuje leki o nazwie
+            podobnej do podanej.
 
     Attributes:
-        threshold (float): Próg podobieństwa dla wyników wyszukiwania (0.3).
+        threshold (float): Próg podobieństwa dla wyników wyszukiwania - ustawienie
+            pg_trgm.similarity_threshold bazy danych (domyślnie 0.3).
     """
     def get(self, request, name):
         """
         Obsługuje żądanie GET do wyszukiwania leków po nazwie.
 
         Metoda wyszukuje leki, których nazwa jest podobna do podanej,
-        używając algorytmu podobieństwa trigramów PostgreSQL.
+        używając algorytmu podobieństwa trigramów PostgreSQL. Każda strona
+        wyników to jedno zapytanie; rozmiar strony jest ograniczony
+        ustawieniem RPL_NAME_SEARCH['MAX_PAGE_SIZE'].
 
         Args:
-            request: Obiekt żądania HTTP.
+            request: Obiekt żądania HTTP z opcjonalnymi parametrami 'cursor'
+                (kursor z poprzedniej strony) i 'page_size'.
             name (str): Nazwa leku do wyszukania.
 
         Returns:
             Response: Odpowiedź HTTP zawierająca znalezione leki lub komunikat o błędzie.
-                Status 200: Lista znalezionych leków
+                Status 200: Strona wyników {"results": [...], "has_more": bool,
+                    "next_cursor": str | null}
+                Status 304: Gdy wyniki nie zmieniły się od wersji rejestru z żądania
+                Status 400: Nieprawidłowy kursor lub rozmiar strony
                 Status 404: Gdy nie znaleziono pasujących leków
                 Status 500: W przypadku błędu serwera
 
@@ -51,16 +78,402 @@ class MedicineByNameView(APIView):
             >>> print(response.status_code)
             200
         """
-        try:
-            medicines = Medicine.objects.annotate(similarity=TrigramSimilarity('name', name)) \
-                .filter(similarity__gt=0.3) \
-                .order_by('-similarity')
+        cursor = request.query_params.get('cursor')
+        page_size = request.query_params.get('page_size')
+        if page_size is not None and not page_size.isdigit():
+            return Response({"error": "Nieprawidłowy rozmiar strony."}, status=status.HTTP_400_BAD_REQUEST)
 
-            if not medicines.exists():
+        try:
+            query = fold_text(name)
+            limit = page_limit(int(page_size) if page_size else None)
+            key = (query, cursor or '', limit)
+            data = name_search_cache.get(key)
+            if data is None:
+                version = name_search_version()
+                page = search_medicines_by_name(query, cursor, limit)
+                data = {
+                    "results": MedicineSerializer(page.medicines, many=True).data,
+                    "has_more": page.has_more,
+                    "next_cursor": page.next_cursor,
+                }
+                name_search_cache.put(key, data, version)
+
+            if not data["results"] and not cursor:
                 return Response({"error": "Nie znaleziono leku o podanej nazwie."}, status=status.HTTP_404_NOT_FOUND)
-            
-            serializer = MedicineSerializer(medicines, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(data, status=status.HTTP_200_OK)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@method_decorator(registry_conditional(lambda request, query: request.get_full_path()), name='get')
+class MedicineSearchView(APIView):
+    """
+    Widok API pełnotekstowego wyszukiwania leków.
+
+    Jednym zapytaniem wyszukuje leki po nazwie handlowej, nazwie powszechnej
+    i substancji czynnej (patrz sync_rpl.search). Wielkość liter i znaki
+    diakrytyczne są ignorowane, a każde słowo zapytania dopasowuje początek
+    słowa w dokumencie. Wyniki są uporządkowane według rankingu z wagami pól
+    (nazwa handlowa > nazwa powszechna > substancja czynna) i stronicowane
+    kursorem jak w MedicineByNameView.
+
+    Endpoints:
+        GET /rpl/search/{query}?cursor=...&page_size=N: Wyszukuje leki.
+    """
+    def get(self, request, query):
+        """
+        Obsługuje żądanie GET pełnotekstowego wyszukiwania leków.
+
+        Args:
+            request: Obiekt żądania HTTP z opcjonalnymi parametrami 'cursor'
+                i 'page_size'.
+            query (str): Wyszukiwany tekst.
+
+        Returns:
+            Response: Odpowiedź HTTP zawierająca znalezione leki lub komunikat o błędzie.
+                Status 200: Strona wyników {"results": [...], "has_more": bool,
+                    "next_cursor": str | null}
+                Status 304: Gdy wyniki nie zmieniły się od wersji rejestru z żądania
+                Status 400: Nieprawidłowy kursor lub rozmiar strony
+                Status 404: Gdy nie znaleziono pasujących leków
+                Status 500: W przypadku błędu serwera
+
+        Example:
+            >>> response = client.get('/rpl/search/paracetamol')
+            >>> print(response.status_code)
+            200
+        """
+        cursor = request.query_params.get('cursor')
+        page_size = request.query_params.get('page_size')
+        if page_size is not None and not page_size.isdigit():
+            return Response({"error": "Nieprawidłowy rozmiar strony."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page = search_medicines(query, cursor, int(page_size) if page_size else None)
+            if not page.medicines and not cursor:
+                return Response({"error": "Nie znaleziono leku."}, status=status.HTTP_404_NOT_FOUND)
+
+            serializer = MedicineSerializer(page.medicines, many=True)
+            return Response({
+                "results": serializer.data,
+                "has_more": page.has_more,
+                "next_cursor": page.next_cursor,
+            }, status=status.HTTP_200_OK)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@method_decorator(
+    registry_conditional(lambda request, prefix: request.get_full_path(), snapshot=autocomplete_snapshot), name='get'
+)
+class MedicineAutocompleteView(APIView):
+    """
+    Widok API podpowiedzi nazw leków dla pola wyszukiwania.
+
+    Podpowiedzi (nazwy handlowe i powszechne) pochodzą z indeksu prefiksowego
+    w pamięci procesu (sync_rpl.autocomplete), bez zapytań do bazy danych -
+    także wersja rejestru w nagłówkach ETag i Last-Modified pochodzi
+    z indeksu.
+    Wielkość liter i polskie znaki diakrytyczne są ignorowane, a dopasowanie
+    obejmuje początek każdego słowa nazwy.
+
+    Endpoints:
+        GET /rpl/autocomplete/{prefix}?limit=N: Zwraca podpowiedzi dla prefiksu.
+    """
+    def get(self, request, prefix):
+        """
+        Obsługuje żądanie GET podpowiedzi nazw leków.
+
+        Args:
+            request: Obiekt żądania HTTP z opcjonalnym parametrem 'limit'
+                (najwyżej RPL_AUTOCOMPLETE['MAX_LIMIT']).
+            prefix (str): Wpisany tekst.
+
+        Returns:
+            Response: Odpowiedź HTTP z listą podpowiedzi.
+                Status 200: {"results": [{"text": str, "field": str, "count": int}, ...]}
+                Status 304: Gdy podpowiedzi nie zmieniły się od wersji rejestru z żądania
+                Status 400: Nieprawidłowa liczba podpowiedzi
+                Status 503: Indeks podpowiedzi jest w trakcie budowy
+                Status 500: W przypadku błędu serwera
+
+        Example:
+            >>> response = client.get('/rpl/autocomplete/ibu')
+            >>> response.data['results'][0]['text']
+            'Ibuprom'
+        """
+        limit = request.query_params.get('limit')
+        if limit is not None and not limit.isdigit():
+            return Response({"error": "Nieprawidłowa liczba podpowiedzi."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            completions = autocomplete(prefix, int(limit) if limit else None)
+            return Response({
+                "results": [completion._asdict() for completion in completions],
+            }, status=status.HTTP_200_OK)
+        except AutocompleteNotReady as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@method_decorator(registry_conditional(lambda request, code=None: request.get_full_path()), name='get')
+class AtcBrowseView(APIView):
+    """
+    Widok API przeglądania drzewa klasyfikacji ATC.
+
+    Grupy ATC pięciu poziomów wraz z liczbą leków pochodzą z drzewa
+    przebudowywanego po każdej synchronizacji rejestru i przechowywanego
+    w pamięci procesu (sync_rpl.atc), więc odpowiedź nie wymaga zapytań do
+    bazy danych.
+
+    Endpoints:
+        GET /rpl/atc/: Zwraca grupy 1. poziomu.
+        GET /rpl/atc/{code}: Zwraca grupę ATC wraz z jej podgrupami.
+    """
+    def get(self, request, code=None):
+        """
+        Obsługuje żądanie GET przeglądania drzewa ATC.
+
+        Args:
+            request: Obiekt żądania HTTP.
+            code (Optional[str]): Kod grupy ATC (np. 'J05AB'); bez kodu
+                zwracane są grupy 1. poziomu.
+
+        Returns:
+            Response: Odpowiedź HTTP z grupą ATC lub komunikat o błędzie.
+                Status 200: {"code": str | null, "level": int, "parent": str | null,
+                    "medicine_count": int, "direct_count": int,
+                    "children": [{"code": str, "level": int,
+                    "medicine_count": int, "direct_count": int}, ...]}
+                Status 304: Gdy drzewo nie zmieniło się od wersji rejestru z żądania
+                Status 404: Gdy żaden lek nie należy do grupy o podanym kodzie
+                Status 500: W przypadku błędu serwera
+
+        Example:
+            >>> response = client.get('/rpl/atc/J05A')
+            >>> [child['code'] for child in response.data['children']]
+            ['J05AB', 'J05AE', ...]
+        """
+        try:
+            tree = atc_tree.get()
+            if code is None:
+                children = tree.children()
+                return Response({
+                    "code": None,
+                    "level": 0,
+                    "parent": None,
+                    "medicine_count": sum(child.medicine_count for child in children),
+                    "direct_count": 0,
+                    "children": [child.summary() for child in children],
+                }, status=status.HTTP_200_OK)
+
+            group = tree.get(code)
+            if group is None:
+                return Response({"error": "Nie znaleziono grupy ATC o podanym kodzie."}, status=status.HTTP_404_NOT_FOUND)
+            return Response({
+                **group.summary(),
+                "parent": group.parent,
+                "children": [child.summary() for child in tree.children(group.code)],
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@method_decorator(registry_conditional(lambda request, code: request.get_full_path()), name='get')
+class AtcMedicinesView(APIView):
+    """
+    Widok API listy leków grupy ATC.
+
+    Zwraca leki, których kod ATC jest równy kodowi grupy (dla pełnych kodów
+    substancji - liście drzewa ATC), stronicowane kursorem po identyfikatorze
+    z użyciem indeksu (atc_code, id). Każda strona to jedno zapytanie
+    ograniczone do rozmiaru strony.
+
+    Endpoints:
+        GET /rpl/atc/{code}/medicines?cursor=...&page_size=N: Zwraca leki grupy.
+    """
+    def get(self, request, code):
+        """
+        Obsługuje żądanie GET listy leków grupy ATC.
+
+        Args:
+            request: Obiekt żądania HTTP z opcjonalnymi parametrami 'cursor'
+                i 'page_size'.
+            code (str): Kod grupy ATC (np. 'J05AB01').
+
+        Returns:
+            Response: Odpowiedź HTTP zawierająca leki lub komunikat o błędzie.
+                Status 200: Strona wyników {"results": [...], "has_more": bool,
+                    "next_cursor": str | null}
+                Status 304: Gdy lista nie zmieniła się od wersji rejestru z żądania
+                Status 400: Nieprawidłowy kursor lub rozmiar strony
+                Status 404: Gdy żaden lek nie ma podanego kodu ATC
+                Status 500: W przypadku błędu serwera
+
+        Example:
+            >>> response = client.get('/rpl/atc/J05AB01/medicines')
+            >>> response.data['results'][0]['name']
+            'Heviran'
+        """
+        cursor = request.query_params.get('cursor')
+        page_size = request.query_params.get('page_size')
+        if page_size is not None and not page_size.isdigit():
+            return Response({"error": "Nieprawidłowy rozmiar strony."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            group = atc_tree.get().get(code)
+            if group is None or not group.direct_count:
+                return Response({"error": "Nie znaleziono leków z podanym kodem ATC."}, status=status.HTTP_404_NOT_FOUND)
+
+            medicines = Medicine.objects.defer('search_document').filter(atc_code=group.code)
+            page = keyset_page(medicines, None, cursor, int(page_size) if page_size else None)
+            serializer = MedicineSerializer(page.medicines, many=True)
+            return Response({
+                "results": serializer.data,
+                "has_more": page.has_more,
+                "next_cursor": page.next_cursor,
+            }, status=status.HTTP_200_OK)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@method_decorator(registry_conditional(lambda request, identifier: request.get_full_path()), name='get')
+class MedicineSubstitutesView(APIView):
+    """
+    Widok API zamienników leku.
+
+    Zamiennikami są leki o tej samej substancji czynnej, mocy i postaci
+    farmaceutycznej. Klasy równoważności są wyznaczane podczas synchronizacji
+    rejestru (sync_rpl.equivalence), więc wyszukanie zamienników to jedno
+    zapytanie po indeksie (equivalence_class, id), stronicowane kursorem po
+    identyfikatorze.
+
+    Endpoints:
+        GET /rpl/substitutes/{identifier}?cursor=...&page_size=N: Zwraca
+            zamienniki leku o podanym identyfikatorze z rejestru.
+    """
+    def get(self, request, identifier):
+        """
+        Obsługuje żądanie GET zamienników leku.
+
+        Args:
+            request: Obiekt żądania HTTP z opcjonalnymi parametrami 'cursor'
+                i 'page_size'.
+            identifier (str): Identyfikator leku w rejestrze.
+
+        Returns:
+            Response: Odpowiedź HTTP zawierająca zamienniki lub komunikat o błędzie.
+                Status 200: {"medicine": {...}, "equivalence_class": str | null,
+                    "results": [...], "has_more": bool, "next_cursor": str | null}
+                    (lek bez substancji czynnej, mocy lub postaci nie ma
+                    zamienników)
+                Status 304: Gdy zamienniki nie zmieniły się od wersji rejestru z żądania
+                Status 400: Nieprawidłowy kursor lub rozmiar strony
+                Status 404: Gdy nie znaleziono leku o podanym identyfikatorze
+                Status 500: W przypadku błędu serwera
+
+        Example:
+            >>> response = client.get('/rpl/substitutes/100012345')
+            >>> [medicine['name'] for medicine in response.data['results']]
+            ['Ibum', 'Nurofen']
+        """
+        cursor = request.query_params.get('cursor')
+        page_size = request.query_params.get('page_size')
+        if page_size is not None and not page_size.isdigit():
+            return Response({"error": "Nieprawidłowy rozmiar strony."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            medicine = Medicine.objects.defer('search_document').filter(identifier=identifier).first()
+            if medicine is None:
+                return Response({"error": "Nie znaleziono leku o podanym identyfikatorze."}, status=status.HTTP_404_NOT_FOUND)
+
+            if medicine.equivalence_class:
+                substitutes = Medicine.objects.defer('search_document') \
+                    .filter(equivalence_class=medicine.equivalence_class).exclude(id=medicine.id)
+                page = keyset_page(substitutes, None, cursor, int(page_size) if page_size else None)
+            else:
+                page = SearchPage([], None)
+
+            return Response({
+                "medicine": MedicineSerializer(medicine).data,
+                "equivalence_class": medicine.equivalence_class,
+                "results": MedicineSerializer(page.medicines, many=True).data,
+                "has_more": page.has_more,
+                "next_cursor": page.next_cursor,
+            }, status=status.HTTP_200_OK)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@method_decorator(registry_conditional(lambda request: request.get_full_path()), name='get')
+class MedicineBrowseView(APIView):
+    """
+    Widok API przeglądania rejestru z filtrami (wyszukiwanie fasetowe).
+
+    Filtry i liczby leków według wartości pól pochodzą z indeksu w pamięci
+    procesu (sync_rpl.facets), przebudowywanego po zmianie wersji rejestru,
+    więc żądanie nie wykonuje zapytań COUNT / GROUP BY. Wyniki są
+    uporządkowane według identyfikatora i stronicowane kursorem.
+
+    Endpoints:
+        GET /rpl/browse/?pharmaceutical_form=...&administration_route=...
+            &preparation_type=...&responsible_entity=...&atc=...
+            &cursor=...&page_size=N: Zwraca leki spełniające filtry.
+    """
+    def get(self, request):
+        """
+        Obsługuje żądanie GET przeglądania rejestru.
+
+        Args:
+            request: Obiekt żądania HTTP z opcjonalnymi filtrami pól
+                (pharmaceutical_form, administration_route, preparation_type,
+                responsible_entity - wielkość liter i znaki diakrytyczne nie
+                mają znaczenia), prefiksem kodu ATC 'atc' oraz parametrami
+                'cursor' i 'page_size'.
+
+        Returns:
+            Response: Odpowiedź HTTP zawierająca leki lub komunikat o błędzie.
+                Status 200: {"total": int, "facets": {pole: [{"value": str,
+                    "count": int}, ...]}, "results": [...], "has_more": bool,
+                    "next_cursor": str | null}
+                Status 304: Gdy wyniki nie zmieniły się od wersji rejestru z żądania
+                Status 400: Nieprawidłowy kursor lub rozmiar strony
+                Status 500: W przypadku błędu serwera
+
+        Example:
+            >>> response = client.get('/rpl/browse/?atc=N02BE&pharmaceutical_form=tabletki')
+            >>> response.data['total']
+            87
+        """
+        cursor = request.query_params.get('cursor')
+        page_size = request.query_params.get('page_size')
+        if page_size is not None and not page_size.isdigit():
+            return Response({"error": "Nieprawidłowy rozmiar strony."}, status=status.HTTP_400_BAD_REQUEST)
+        filters = {field: request.query_params[field] for field in FACET_FIELDS if request.query_params.get(field)}
+
+        try:
+            result = browse_medicines(
+                filters, request.query_params.get('atc'), cursor, int(page_size) if page_size else None
+            )
+            serializer = MedicineSerializer(result.page.medicines, many=True)
+            return Response({
+                "total": result.total,
+                "facets": result.facets,
+                "results": serializer.data,
+                "has_more": result.page.has_more,
+                "next_cursor": result.page.next_cursor,
+            }, status=status.HTTP_200_OK)
+        except InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -71,10 +484,12 @@ class MedicineByBarcodeView(APIView):
 
     Umożliwia wyszukiwanie leków na podstawie kodu kreskowego opakowania.
     Zwraca szczegółowe informacje o znalezionym leku wraz z informacjami
-    o konkretnym opakowaniu.
+    o konkretnym opakowaniu. Kod jest wyszukiwany w zmapowanym do pamięci
+    indeksie GTIN (sync_rpl.gtin_index), a gdy indeks nie jest dostępny -
+    zapytaniem punktowym po indeksowanym kodzie GTIN w tabeli opakowań.
 
     Endpoints:
-        GET /api/medicines/barcode/{barcode}/: Wyszukuje lek po kodzie kreskowym.
+        GET /rpl/mbb/{barcode}: Wyszukuje lek po kodzie kreskowym.
     """
     def get(self, request, barcode):
         """
@@ -90,7 +505,7 @@ class MedicineByBarcodeView(APIView):
         Returns:
             Response: Odpowiedź HTTP zawierająca dane znalezionego leku lub komunikat o błędzie.
                 Status 200: Szczegóły znalezionego leku
-                Status 404: Gdy nie znaleziono leku lub opakowania
+                Status 404: Gdy nie znaleziono opakowania o podanym kodzie
                 Status 500: W przypadku błędu serwera
 
         Example:
@@ -99,17 +514,20 @@ class MedicineByBarcodeView(APIView):
             200
         """
         try:
-            medicine = Medicine.objects.filter(packaging__icontains=barcode).first()
-
-            if not medicine:
+            gtin = canonical_gtin(barcode)
+            index = get_gtin_index()
+            if not gtin:
+                package = None
+            elif index is not None:
+                package = index.lookup(gtin)
+            else:
+                package = MedicinePackage.objects.select_related('medicine').filter(gtin=gtin).first()
+
+            if not package:
                 return Response({"error": "Nie znaleziono leku z podanym kodem kreskowym."}, status=status.HTTP_404_NOT_FOUND)
 
-            packaging_details = next(
-                (line for line in medicine.packaging.split("\n") if barcode in line), None
-            )
-
-            if not packaging_details:
-                return Response({"error": "Kod kreskowy nie pasuje do żadnego opakowania."}, status=status.HTTP_404_NOT_FOUND)
+            medicine = package.medicine
+            packaging_details = package.raw_line
 
             response_data = {
                 "name": medicine.name,